@@ -0,0 +1,39 @@
+import pytest
+
+# A ZipVoice small enough to build and run in a unit test
+TINY_MODEL_CONFIG = {
+    "model": {
+        "fm_decoder_downsampling_factor": [1, 2, 1],
+        "fm_decoder_num_layers": [1, 1, 1],
+        "fm_decoder_cnn_module_kernel": [7, 7, 7],
+        "fm_decoder_feedforward_dim": 64,
+        "fm_decoder_num_heads": 2,
+        "fm_decoder_dim": 32,
+        "text_encoder_num_layers": 1,
+        "text_encoder_feedforward_dim": 64,
+        "text_encoder_cnn_module_kernel": 5,
+        "text_encoder_num_heads": 2,
+        "text_encoder_dim": 32,
+        "query_head_dim": 8,
+        "value_head_dim": 4,
+        "pos_head_dim": 4,
+        "pos_dim": 16,
+        "time_embed_dim": 32,
+        "text_embed_dim": 32,
+        "feat_dim": 100,
+    },
+    "feature": {"sampling_rate": 24000, "type": "vocos"},
+}
+
+
+@pytest.fixture
+def token_file(tmp_path):
+    path = tmp_path / "tokens.txt"
+    tokens = ["_"] + list("abcdefghijklmnopqrstuvwxyz ")
+    path.write_text("".join(f"{t}\t{i}\n" for i, t in enumerate(tokens)))
+    return path
+
+
+@pytest.fixture
+def model_config():
+    return TINY_MODEL_CONFIG
@@ -0,0 +1,85 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from zipvoice.utils.checkpoint import (  # noqa: E402
+    average_checkpoints_streaming,
+    average_checkpoints_with_averaged_model,
+    convert_checkpoint_to_safetensors,
+    load_safetensors,
+)
+
+AVERAGE_PERIOD = 200
+
+
+def tiny_state_dict(seed):
+    torch.manual_seed(seed)
+    model = torch.nn.Sequential(
+        torch.nn.Linear(8, 16),
+        torch.nn.BatchNorm1d(16),
+        torch.nn.Linear(16, 4).to(torch.float64),
+    )
+    model[1].num_batches_tracked.fill_(seed)
+    return model.state_dict()
+
+
+def save_training_checkpoint(path, seed, batch_idx_train):
+    torch.save(
+        {
+            "model": tiny_state_dict(seed + 100),
+            "model_avg": tiny_state_dict(seed),
+            "optimizer": {"state": {}},
+            "batch_idx_train": batch_idx_train,
+            "average_period": AVERAGE_PERIOD,
+        },
+        path,
+    )
+    return path
+
+
+@pytest.fixture
+def checkpoints(tmp_path):
+    # batch_idx_train is rounded down to the average period
+    return (
+        save_training_checkpoint(tmp_path / "checkpoint-1000.pt", 0, 1050),
+        save_training_checkpoint(tmp_path / "checkpoint-3000.pt", 1, 3000),
+    )
+
+
+def assert_same_average(out_filename, expected):
+    averaged = load_safetensors(out_filename)
+    assert set(averaged) == set(expected)
+    for name, tensor in expected.items():
+        assert averaged[name].dtype == tensor.dtype, name
+        torch.testing.assert_close(averaged[name], tensor, rtol=0, atol=0)
+
+
+def test_streaming_average_matches_average(checkpoints, tmp_path):
+    start, end = checkpoints
+    expected = average_checkpoints_with_averaged_model(start, end)
+    out_filename = tmp_path / "avg.safetensors"
+    assert average_checkpoints_streaming(start, end, out_filename) == len(expected)
+    assert_same_average(out_filename, expected)
+    # Integer buffers are taken from the end model
+    assert expected["1.num_batches_tracked"].item() == 1
+
+
+def test_streaming_average_of_converted_checkpoints(checkpoints, tmp_path):
+    start, end = checkpoints
+    converted = []
+    for filename in checkpoints:
+        converted.append(filename.with_suffix(".safetensors"))
+        convert_checkpoint_to_safetensors(filename, converted[-1], key="model_avg")
+    out_filename = tmp_path / "avg.safetensors"
+    average_checkpoints_streaming(*converted, out_filename)
+    assert_same_average(
+        out_filename, average_checkpoints_with_averaged_model(start, end)
+    )
+
+
+def test_streaming_average_needs_model_avg_safetensors(checkpoints, tmp_path):
+    start, end = checkpoints
+    model = start.with_suffix(".safetensors")
+    convert_checkpoint_to_safetensors(start, model, key="model")
+    with pytest.raises(ValueError, match="model_avg"):
+        average_checkpoints_streaming(model, end, tmp_path / "avg.safetensors")
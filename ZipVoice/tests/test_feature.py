@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchaudio")
+pytest.importorskip("lhotse")
+
+from zipvoice.utils.feature import VocosFbank  # noqa: E402
+
+SAMPLING_RATE = 24000
+LENGTHS = [24000, 12345, 5000, 600]
+
+
+@pytest.fixture(scope="module")
+def fbank():
+    return VocosFbank()
+
+
+@pytest.fixture(scope="module")
+def waveforms():
+    rng = np.random.default_rng(0)
+    return [(0.1 * rng.standard_normal(n)).astype(np.float32) for n in LENGTHS]
+
+
+def assert_features_equal(batch, single):
+    assert len(batch) == len(single)
+    for feat, expected in zip(batch, single):
+        assert feat.shape == expected.shape
+        np.testing.assert_allclose(feat, expected, atol=1e-4)
+
+
+def test_extract_batch_of_a_list_matches_extract(fbank, waveforms):
+    single = [fbank.extract(w, SAMPLING_RATE) for w in waveforms]
+    batch = fbank.extract_batch(waveforms, SAMPLING_RATE)
+    assert all(isinstance(feat, np.ndarray) for feat in batch)
+    assert_features_equal(batch, single)
+
+
+def test_extract_batch_of_a_padded_tensor_matches_extract(fbank, waveforms):
+    padded = torch.zeros(len(waveforms), max(LENGTHS))
+    for i, w in enumerate(waveforms):
+        padded[i, : len(w)] = torch.from_numpy(w)
+    single = [fbank.extract(torch.from_numpy(w), SAMPLING_RATE) for w in waveforms]
+    batch = fbank.extract_batch(padded, SAMPLING_RATE, lengths=LENGTHS)
+    assert all(isinstance(feat, torch.Tensor) for feat in batch)
+    assert_features_equal([f.numpy() for f in batch], [f.numpy() for f in single])
+
+
+def test_extract_batch_downmixes_stereo(fbank, waveforms):
+    stereo = np.stack([waveforms[1], 0.5 * waveforms[1]])
+    assert_features_equal(
+        fbank.extract_batch([stereo], SAMPLING_RATE),
+        [fbank.extract(stereo, SAMPLING_RATE)],
+    )
+
+
+def test_extract_batch_of_nothing(fbank):
+    assert fbank.extract_batch([], SAMPLING_RATE) == []
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("lhotse")
+
+from lhotse import CutSet, Features, MonoCut  # noqa: E402
+
+from zipvoice.dataset.feature_store import (  # noqa: E402
+    MmapFeaturesWriter,
+    MmapFp16FeaturesWriter,
+    MmapPrecomputedFeatures,
+    open_feature_store,
+)
+
+FRAME_SHIFT = 0.01
+SAMPLING_RATE = 16000
+NUM_FEATURES = 8
+
+
+def random_features(num_frames, seed):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((num_frames, NUM_FEATURES)).astype(np.float32)
+
+
+def stored_cut(writer, cut_id, value):
+    num_frames = value.shape[0]
+    features = Features(
+        type="test",
+        num_frames=num_frames,
+        num_features=NUM_FEATURES,
+        frame_shift=FRAME_SHIFT,
+        sampling_rate=SAMPLING_RATE,
+        start=0,
+        duration=num_frames * FRAME_SHIFT,
+        storage_type=writer.name,
+        storage_path=writer.storage_path,
+        storage_key=writer.write(cut_id, value),
+    )
+    return MonoCut(
+        id=cut_id,
+        start=0,
+        duration=features.duration,
+        channel=0,
+        features=features,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    values = [random_features(n, seed) for seed, n in enumerate([30, 12, 21])]
+    writer = MmapFeaturesWriter(tmp_path / "feats")
+    cuts = [stored_cut(writer, f"cut-{i}", v) for i, v in enumerate(values)]
+    writer.close()
+    return cuts, values
+
+
+def test_round_trip(store):
+    cuts, values = store
+    for cut, value in zip(cuts, values):
+        np.testing.assert_array_equal(cut.load_features(), value)
+    array = open_feature_store(cuts[0].features.storage_path)
+    assert array.shape == (sum(v.shape[0] for v in values), NUM_FEATURES)
+
+
+def test_append_mode_continues_the_store(tmp_path):
+    first, second = random_features(5, 0), random_features(7, 1)
+    writer = MmapFeaturesWriter(tmp_path / "feats")
+    cut_a = stored_cut(writer, "a", first)
+    writer.close()
+    writer = MmapFeaturesWriter(tmp_path / "feats", mode="a")
+    cut_b = stored_cut(writer, "b", second)
+    writer.close()
+    assert cut_b.features.storage_key == "5:7"
+    np.testing.assert_array_equal(cut_a.load_features(), first)
+    np.testing.assert_array_equal(cut_b.load_features(), second)
+
+
+def test_fp16_store(tmp_path):
+    value = random_features(10, 0)
+    writer = MmapFp16FeaturesWriter(tmp_path / "feats")
+    cut = stored_cut(writer, "a", value)
+    writer.close()
+    assert open_feature_store(writer.storage_path).dtype == np.float16
+    loaded = cut.load_features()
+    assert loaded.dtype == np.float32
+    np.testing.assert_allclose(loaded, value, atol=1e-2)
+
+
+def test_batch_matches_load_features(store):
+    cuts, values = store
+    # Truncated cuts read from an offset into their stored frames
+    cuts = cuts + [cuts[0].truncate(offset=0.05, duration=0.1)]
+    features, features_lens = MmapPrecomputedFeatures()(CutSet.from_cuts(cuts))
+    assert features_lens.tolist() == [cut.num_frames for cut in cuts]
+    assert features.shape == (len(cuts), max(features_lens), NUM_FEATURES)
+    for i, cut in enumerate(cuts):
+        n = cut.num_frames
+        np.testing.assert_array_equal(features[i, :n].numpy(), cut.load_features())
+    np.testing.assert_array_equal(features[3, :10].numpy(), values[0][5:15])
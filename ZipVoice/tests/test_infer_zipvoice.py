@@ -0,0 +1,42 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("lhotse")
+safetensors_torch = pytest.importorskip("safetensors.torch")
+
+from zipvoice.bin.infer_zipvoice import build_model, get_model  # noqa: E402
+from zipvoice.tokenizer.tokenizer import SimpleTokenizer  # noqa: E402
+
+
+def sample(model):
+    torch.manual_seed(0)
+    with torch.inference_mode():
+        _, features, _, _ = model.sample(
+            tokens=[[1, 2, 3, 4]],
+            prompt_tokens=[[5, 6]],
+            prompt_features=torch.randn(1, 20, 100),
+            prompt_features_lens=torch.tensor([20]),
+            num_step=2,
+        )
+    return features
+
+
+@pytest.fixture
+def checkpoints(tmp_path, token_file, model_config):
+    tokenizer = SimpleTokenizer(token_file=token_file)
+    model = build_model("zipvoice", model_config, tokenizer)
+    state_dict = {k: v.contiguous() for k, v in model.state_dict().items()}
+    torch.save({"model": state_dict}, tmp_path / "model.pt")
+    safetensors_torch.save_file(state_dict, tmp_path / "model.safetensors")
+    return tokenizer, tmp_path / "model.pt", tmp_path / "model.safetensors"
+
+
+def test_safetensors_model_runs_like_pt_model(checkpoints, model_config):
+    tokenizer, pt_path, safetensors_path = checkpoints
+    expected = sample(get_model("zipvoice", model_config, pt_path, tokenizer).eval())
+    model = get_model("zipvoice", model_config, safetensors_path, tokenizer).eval()
+
+    for module in model.modules():
+        for value in vars(module).values():
+            assert not (isinstance(value, torch.Tensor) and value.is_meta)
+    torch.testing.assert_close(sample(model), expected)
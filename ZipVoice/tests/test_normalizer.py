@@ -0,0 +1,56 @@
+import pytest
+
+from zipvoice.tokenizer.normalizer import VietnameseTextNormalizer
+
+CASES = [
+    # Numbers, with Vietnamese thousands and decimal separators
+    ("Có 21 người", "Có hai mươi mốt người"),
+    ("1.000.000", "một triệu"),
+    ("3,5", "ba phẩy năm"),
+    ("1005", "một nghìn không trăm linh năm"),
+    ("0912345678", "không chín một hai ba bốn năm sáu bảy tám"),
+    ("-5", "âm năm"),
+    ("Nhiệt độ -5 độ C", "Nhiệt độ âm năm độ C"),
+    ("3.1.2", "ba chấm một chấm hai"),
+    ("Mục 3.1.2.", "Mục ba chấm một chấm hai."),
+    # Units and currencies
+    ("50%", "năm mươi phần trăm"),
+    ("Giá 20.000đ", "Giá hai mươi nghìn đồng"),
+    ("$5", "năm đô la"),
+    ("5 km", "năm ki lô mét"),
+    ("Căn hộ 50m2", "Căn hộ năm mươi mét vuông"),
+    ("120m2.", "một trăm hai mươi mét vuông."),
+    ("50m²", "năm mươi mét vuông"),
+    ("cao 1m75", "cao một mét bảy mươi lăm"),
+    ("dài 5m", "dài năm mét"),
+    # Dates and times
+    (
+        "Ngày 2/9/1945 tại HN.",
+        "Ngày hai tháng chín năm một nghìn chín trăm bốn mươi lăm tại Hà Nội.",
+    ),
+    ("Tháng 4/2023", "Tháng tư năm hai nghìn không trăm hai mươi ba"),
+    ("vào ngày 20/11", "vào ngày hai mươi tháng mười một"),
+    ("hôm nay 2/9", "hôm nay ngày hai tháng chín"),
+    ("lúc 7:30", "lúc bảy giờ ba mươi phút"),
+    ("9h00", "chín giờ"),
+    # Abbreviations, annotations and spacing
+    ("UBND TP.HCM", "ủy ban nhân dân thành phố Hồ Chí Minh"),
+    ("Xin chào (ghi chú) bạn", "Xin chào bạn"),
+    ("Xin chào  ,bạn!Tạm biệt", "Xin chào, bạn! Tạm biệt"),
+]
+
+
+@pytest.fixture(scope="module")
+def normalizer():
+    return VietnameseTextNormalizer()
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_normalize(normalizer, text, expected):
+    assert normalizer.normalize(text) == expected
+
+
+@pytest.mark.parametrize("text", [text for text, _ in CASES])
+def test_normalize_is_idempotent(normalizer, text):
+    once = normalizer.normalize(text)
+    assert normalizer.normalize(once) == once
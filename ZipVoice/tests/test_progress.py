@@ -0,0 +1,91 @@
+import pytest
+
+from zipvoice.utils import progress as progress_module
+from zipvoice.utils.progress import RenderProgress
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(progress_module.time, "time", clock)
+    return clock
+
+
+def run_batch(progress, clock, indices, num_step=4, step_time=1.0, vocoder_time=1.0):
+    for index in indices:
+        progress("sentence_start", index=index)
+    for step in range(1, num_step + 1):
+        clock.now += step_time
+        progress("solver_step", step=step, num_step=num_step)
+    for index in indices:
+        progress("vocoder", index=index)
+    clock.now += vocoder_time
+    for index in indices:
+        progress("sentence_end", index=index, metrics={})
+
+
+def test_eta_uses_throughput_of_batched_sentences(clock):
+    progress = RenderProgress()
+    progress("start", total=6, num_step=4)
+    run_batch(progress, clock, [0, 1])
+    # 2 sentences in 5s, 4 left
+    assert progress.estimate_time_remaining() == pytest.approx(10.0)
+    clock.now += 4.0
+    assert progress.estimate_time_remaining() == pytest.approx(6.0)
+    run_batch(progress, clock, [2, 3])
+    # 4 sentences in 14s, 2 left
+    assert progress.estimate_time_remaining() == pytest.approx(7.0)
+    run_batch(progress, clock, [4, 5])
+    assert progress.estimate_time_remaining() == 0.0
+
+
+def test_eta_before_first_sentence_counts_rounds_of_the_batch_size(clock):
+    progress = RenderProgress()
+    progress("start", total=6, num_step=4)
+    assert progress.estimate_time_remaining() is None
+    for index in (0, 1, 2):
+        progress("sentence_start", index=index)
+    for step in (1, 2):
+        clock.now += 1.0
+        progress("solver_step", step=step, num_step=4)
+    # 2 steps + vocoder for this batch, then one more batch of 3 (4 steps + vocoder)
+    assert progress.estimate_time_remaining() == pytest.approx(3.0 + 5.0)
+
+
+def test_eta_of_sequential_sentences(clock):
+    progress = RenderProgress()
+    progress("start", total=3, num_step=4)
+    progress("sentence_start", index=0)
+    clock.now += 1.0
+    progress("solver_step", step=1, num_step=4)
+    # 3 steps + vocoder for this sentence, then 2 sentences of 5s
+    assert progress.estimate_time_remaining() == pytest.approx(4.0 + 10.0)
+
+
+def test_snapshot_of_a_finished_render(clock):
+    progress = RenderProgress()
+    progress("start", total=2, num_step=4)
+    run_batch(progress, clock, [0, 1])
+    progress("finish")
+    snapshot = progress.snapshot()
+    assert snapshot["estimated_time_remaining"] == 0.0
+    assert snapshot["completed_sentences"] == 2
+    assert snapshot["current_sentence"] == 2
+    assert snapshot["elapsed_time"] == pytest.approx(5.0)
+    assert [timing["index"] for timing in snapshot["sentence_timings"]] == [0, 1]
+
+
+def test_snapshot_is_published_to_a_file(clock, tmp_path):
+    path = str(tmp_path / "progress.json")
+    progress = RenderProgress(path=path)
+    progress("start", total=1, num_step=4)
+    assert RenderProgress.read_snapshot(path)["total_sentences"] == 1
+    assert RenderProgress.read_snapshot(str(tmp_path / "missing.json")) is None
@@ -0,0 +1,99 @@
+import pytest
+
+pytest.importorskip("lhotse")
+
+from lhotse import CutSet, MonoCut, SupervisionSegment  # noqa: E402
+
+from zipvoice.dataset.sampler import (  # noqa: E402
+    FRAME_SHIFT,
+    TokenAwareBucketingSampler,
+    TokenFrameConstraint,
+)
+
+
+def make_cut(i, num_frames, num_tokens):
+    duration = num_frames * FRAME_SHIFT
+    supervision = SupervisionSegment(
+        id=f"sup-{i}",
+        recording_id=f"rec-{i}",
+        start=0,
+        duration=duration,
+        text="a" * num_tokens,
+        custom={"tokens": list(range(num_tokens))},
+    )
+    return MonoCut(
+        id=f"cut-{i}",
+        start=0,
+        duration=duration,
+        channel=0,
+        supervisions=[supervision],
+    )
+
+
+@pytest.fixture
+def cuts():
+    return CutSet.from_cuts(
+        make_cut(i, num_frames=100 + 37 * i, num_tokens=20 + 3 * (i % 7))
+        for i in range(40)
+    )
+
+
+def batch_cost(constraint, batch):
+    return constraint.cost(
+        len(batch),
+        max(constraint.num_frames(cut) for cut in batch),
+        max(constraint.num_tokens(cut) for cut in batch),
+    )
+
+
+def test_cost_of_a_cut():
+    constraint = TokenFrameConstraint(max_cost=1e6, quadratic_frames=1000)
+    cut = make_cut(0, num_frames=500, num_tokens=40)
+    assert constraint.num_frames(cut) == 500
+    assert constraint.num_tokens(cut) == 40
+    assert constraint.measure_length(cut) == pytest.approx(500 + 250 + 0.1 * 40)
+
+
+def test_tokens_fall_back_to_the_text_length():
+    cut = make_cut(0, num_frames=10, num_tokens=5)
+    cut.supervisions[0].custom = None
+    assert TokenFrameConstraint.num_tokens(cut) == 5
+
+
+def test_batches_stay_within_the_budget(cuts):
+    sampler = TokenAwareBucketingSampler(
+        cuts, max_cost=6000, num_buckets=4, shuffle=True, seed=0
+    )
+    constraint = TokenFrameConstraint(max_cost=6000)
+    batches = [list(batch) for batch in sampler]
+    assert sorted(cut.id for batch in batches for cut in batch) == sorted(
+        cut.id for cut in cuts
+    )
+    # lhotse closes a batch once another cut as long as the longest one would
+    # exceed the budget, so only the last cut added can overshoot it
+    for batch in batches:
+        assert len(batch) == 1 or batch_cost(constraint, batch[:-1]) <= 6000
+
+
+def test_max_cuts(cuts):
+    sampler = TokenAwareBucketingSampler(cuts, max_cost=1e9, max_cuts=3, num_buckets=2)
+    assert max(len(batch) for batch in sampler) == 3
+
+
+def test_state_dict_resumes_the_epoch(cuts):
+    kwargs = dict(max_cost=6000, num_buckets=4, shuffle=True, seed=0)
+    epoch = [
+        [cut.id for cut in batch]
+        for batch in TokenAwareBucketingSampler(cuts, **kwargs)
+    ]
+
+    sampler = TokenAwareBucketingSampler(cuts, **kwargs)
+    iterator = iter(sampler)
+    for _ in range(2):
+        next(iterator)
+    state_dict = sampler.state_dict()
+
+    restored = TokenAwareBucketingSampler(cuts, **kwargs)
+    restored.load_state_dict(state_dict)
+    assert restored.constraint == sampler.constraint
+    assert [[cut.id for cut in batch] for batch in restored] == epoch[2:]
@@ -0,0 +1,114 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+pytest.importorskip("lhotse")
+
+from lhotse import MonoCut  # noqa: E402
+
+from zipvoice.dataset.token_store import (  # noqa: E402
+    META_FILENAME,
+    TokenStore,
+    write_token_store,
+)
+
+TOKENS = {"a": [1, 2, 3], "b": [], "c": [4, 5]}
+
+
+def make_cut(cut_id):
+    return MonoCut(id=cut_id, start=0, duration=1.0, channel=0)
+
+
+@pytest.fixture
+def store_dir(tmp_path, token_file):
+    store_dir = tmp_path / "tokens"
+    cuts = [make_cut(cut_id) for cut_id in ["a", "b", "c", "a"]]
+    num_cuts = write_token_store(
+        cuts,
+        lambda cut: TOKENS[cut.id],
+        store_dir,
+        vocab_size=100,
+        tokenizer="espeak",
+        lang="vi",
+        token_file=token_file,
+    )
+    assert num_cuts == 3
+    return store_dir
+
+
+def test_round_trip(store_dir):
+    store = TokenStore(store_dir)
+    assert len(store) == 3
+    assert "a" in store and "d" not in store
+    assert {cut_id: store[cut_id] for cut_id in TOKENS} == TOKENS
+    assert store.tokens.dtype == np.int16
+
+
+def test_large_vocabularies_use_int32(tmp_path, token_file):
+    write_token_store(
+        [make_cut("a")],
+        lambda cut: [40000],
+        tmp_path / "store",
+        vocab_size=40001,
+        tokenizer="simple",
+        lang="en-us",
+        token_file=token_file,
+    )
+    store = TokenStore(tmp_path / "store")
+    assert store.tokens.dtype == np.int32
+    assert store["a"] == [40000]
+
+
+@pytest.mark.parametrize("tokens", [None, []])
+def test_store_without_tokens(tmp_path, token_file, tokens):
+    cuts = [] if tokens is None else [make_cut("a")]
+    write_token_store(
+        cuts,
+        lambda cut: tokens,
+        tmp_path / "store",
+        vocab_size=100,
+        tokenizer="simple",
+        lang="en-us",
+        token_file=token_file,
+    )
+    store = TokenStore(tmp_path / "store")
+    assert len(store) == len(cuts)
+    if cuts:
+        assert store["a"] == []
+
+
+def test_matching_tokenizer(store_dir, token_file):
+    store = TokenStore(store_dir, tokenizer="espeak", lang="vi", token_file=token_file)
+    assert store["c"] == [4, 5]
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"tokenizer": "emilia"}, {"lang": "en-us"}, {"token_file": "other"}]
+)
+def test_tokenizer_mismatch(store_dir, tmp_path, kwargs):
+    if "token_file" in kwargs:
+        other = tmp_path / "other_tokens.txt"
+        other.write_text("_\t0\n", encoding="utf-8")
+        kwargs = {"token_file": other}
+    with pytest.raises(ValueError, match="was written with"):
+        TokenStore(store_dir, **kwargs)
+
+
+def test_store_without_tokenizer_metadata(store_dir):
+    meta_path = store_dir / META_FILENAME
+    meta = json.loads(meta_path.read_text())
+    del meta["tokenizer"]
+    meta_path.write_text(json.dumps(meta))
+    TokenStore(store_dir)
+    with pytest.raises(ValueError, match="does not record its tokenizer"):
+        TokenStore(store_dir, tokenizer="espeak")
+
+
+def test_pickling_sends_the_path_only(store_dir):
+    store = TokenStore(store_dir)
+    state = pickle.dumps(store)
+    assert len(state) < 1000
+    restored = pickle.loads(state)
+    assert restored["a"] == [1, 2, 3]
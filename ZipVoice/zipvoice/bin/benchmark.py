@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+Usage:
+This script benchmarks the inference stack on CPU with a fixed Vietnamese
+corpus and writes the results as JSON, so that runs of different versions
+can be compared.
+
+python3 -m zipvoice.bin.benchmark \
+    --model-dir exp/zipvoice_vi \
+    --checkpoint-name epoch-11-avg-4.safetensors \
+    --prompt-wav prompt.wav \
+    --prompt-text "Xin chào, tôi là giọng đọc mẫu." \
+    --tag v1.2.0 \
+    --output bench.json
+
+It reports:
+  - cold start: loading the tokenizer, model and vocoder, preparing the
+    prompt and synthesizing the first sentence, in a fresh process;
+  - warm latency per sentence length: tokenizer, text encoder, per-step
+    fm_decoder, vocoder, merge (concatenating the sentence waveforms with
+    pauses and writing the wav file) and end-to-end time, with the RTF;
+  - throughput for each thread count and batch size;
+  - peak RSS after loading and at the end.
+
+Times are in milliseconds unless the key ends with `_s`.
+"""
+
+import argparse
+import datetime as dt
+import json
+import logging
+import os
+import platform
+import resource
+import tempfile
+import time
+from collections import defaultdict
+from functools import partial
+from itertools import cycle, islice
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import torch
+import torchaudio
+from lhotse.utils import fix_random_seed
+
+from zipvoice.bin.infer_zipvoice import (
+    MODEL_DEFAULTS,
+    generate_batch_wav,
+    get_model,
+    get_tokenizer,
+    get_vocoder,
+    prepare_prompt,
+)
+from zipvoice.utils.common import AttributeDict
+from zipvoice.utils.feature import VocosFbank
+
+# Fixed so that results are comparable across versions; do not edit in place,
+# add a new length instead.
+CORPUS = {
+    "short": [
+        "Xin chào các bạn.",
+        "Hôm nay trời đẹp quá.",
+        "Cảm ơn bạn rất nhiều.",
+    ],
+    "medium": [
+        "Mỗi sáng cô dậy sớm, quét sân, cho gà ăn rồi mới đi học.",
+        "Thầy giáo khen cô là học sinh ngoan nhất lớp, ai cũng quý mến cô.",
+        "Chuyến tàu đêm chậm rãi rời ga, mang theo những người con xa quê.",
+    ],
+    "long": [
+        "Ngày xửa ngày xưa, ở một ngôi làng nhỏ ven sông, có một cô bé rất chăm "
+        "chỉ, ngày nào cũng giúp mẹ làm việc nhà rồi mới cắp sách đến trường, "
+        "và tối nào cũng học bài đến khuya dưới ánh đèn dầu.",
+        "Trên đường đến trường, cô thường dừng lại ngắm những cánh đồng lúa xanh "
+        "mướt trải dài đến tận chân trời, nghe tiếng chim hót líu lo và mơ về "
+        "một ngày được đi khắp mọi miền đất nước.",
+        "Buổi chiều, khi mặt trời vừa lặn sau rặng tre đầu làng, cả nhà quây quần "
+        "bên mâm cơm đạm bạc, kể cho nhau nghe những chuyện vui buồn trong ngày "
+        "rồi cùng nhau ra hiên ngồi hóng mát.",
+    ],
+}
+
+# Pause inserted between sentences by the merge stage
+MERGE_PAUSE_SECONDS = 0.3
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument(
+        "--model-name",
+        type=str,
+        default="zipvoice",
+        choices=["zipvoice", "zipvoice_distill"],
+        help="The model to benchmark",
+    )
+
+    parser.add_argument(
+        "--model-dir",
+        type=str,
+        required=True,
+        help="The model directory that contains model checkpoint, configuration "
+        "file model.json, and tokens file tokens.txt.",
+    )
+
+    parser.add_argument(
+        "--checkpoint-name",
+        type=str,
+        default="model.pt",
+        help="The name of model checkpoint.",
+    )
+
+    parser.add_argument(
+        "--vocoder-path",
+        type=str,
+        default=None,
+        help="The vocoder checkpoint. "
+        "Will download pre-trained vocoder from huggingface if not specified.",
+    )
+
+    parser.add_argument(
+        "--tokenizer",
+        type=str,
+        default="espeak",
+        choices=["emilia", "libritts", "espeak", "simple"],
+        help="Tokenizer type.",
+    )
+
+    parser.add_argument(
+        "--lang",
+        type=str,
+        default="vi",
+        help="Language identifier, used when tokenizer type is espeak.",
+    )
+
+    parser.add_argument(
+        "--prompt-wav",
+        type=str,
+        required=True,
+        help="The prompt wav to mimic",
+    )
+
+    parser.add_argument(
+        "--prompt-text",
+        type=str,
+        required=True,
+        help="The transcription of the prompt wav",
+    )
+
+    parser.add_argument(
+        "--num-step",
+        type=int,
+        default=None,
+        help="The number of sampling steps. Defaults to the model default.",
+    )
+
+    parser.add_argument(
+        "--guidance-scale",
+        type=float,
+        default=None,
+        help="The scale of classifier-free guidance. "
+        "Defaults to the model default.",
+    )
+
+    parser.add_argument(
+        "--t-shift",
+        type=float,
+        default=0.5,
+        help="Shift t to smaller ones if t_shift < 1.0",
+    )
+
+    parser.add_argument(
+        "--num-repeats",
+        type=int,
+        default=3,
+        help="Warm runs per sentence for the latency measurements.",
+    )
+
+    parser.add_argument(
+        "--num-threads",
+        type=str,
+        default="1,2,4",
+        help="Comma-separated torch thread counts for the throughput runs. "
+        "Latencies are measured with the first one.",
+    )
+
+    parser.add_argument(
+        "--batch-sizes",
+        type=str,
+        default="1,2,4,8",
+        help="Comma-separated batch sizes for the throughput runs.",
+    )
+
+    parser.add_argument(
+        "--throughput-batches",
+        type=int,
+        default=2,
+        help="Batches per throughput run, after one warm-up batch.",
+    )
+
+    parser.add_argument(
+        "--tag",
+        type=str,
+        default="",
+        help="Free-form label stored in the results, e.g. a version or commit.",
+    )
+
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="The JSON file to write. Printed to stdout if not specified.",
+    )
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=666,
+        help="Random seed",
+    )
+
+    return parser
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / 1024**2 if platform.system() == "Darwin" else peak / 1024
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """Summary statistics of durations, in milliseconds."""
+    ms = np.asarray(seconds, dtype=np.float64) * 1000
+    return {
+        "count": int(ms.size),
+        "mean": float(ms.mean()),
+        "median": float(np.median(ms)),
+        "p90": float(np.percentile(ms, 90)),
+        "min": float(ms.min()),
+        "max": float(ms.max()),
+    }
+
+
+class StageTimer:
+    """Records the wall time of every forward call of the given submodules
+    with forward hooks, so the model code is timed unmodified.
+
+    Only meaningful on CPU, where modules run synchronously.
+
+    Args:
+      modules:
+        The modules to time, by stage name.
+    """
+
+    def __init__(self, modules: Dict[str, torch.nn.Module]):
+        self.times: Dict[str, List[float]] = defaultdict(list)
+        self.start: Dict[str, float] = {}
+        self.handles = []
+        for name, module in modules.items():
+            self.handles.append(
+                module.register_forward_pre_hook(partial(self._pre_hook, name))
+            )
+            self.handles.append(
+                module.register_forward_hook(partial(self._post_hook, name))
+            )
+
+    def _pre_hook(self, name, module, args):
+        self.start[name] = time.perf_counter()
+
+    def _post_hook(self, name, module, args, output):
+        self.times[name].append(time.perf_counter() - self.start[name])
+
+    def pop(self) -> Dict[str, List[float]]:
+        """Return the times recorded since the last call and clear them."""
+        times, self.times = self.times, defaultdict(list)
+        return times
+
+    def remove(self):
+        for handle in self.handles:
+            handle.remove()
+
+
+def synthesize(
+    texts: List[str],
+    prompt: dict,
+    model: torch.nn.Module,
+    vocoder: torch.nn.Module,
+    tokenizer,
+    params: AttributeDict,
+) -> Dict[str, object]:
+    """Synthesize texts as one batch and time each stage.
+
+    Returns:
+      A dict with the waveforms ("wavs") and the durations in seconds of
+      tokenization ("tokenizer"), sampling ("sample", including the text
+      encoder and solver steps), vocoding ("vocoder") and in total ("total").
+    """
+    start_t = time.perf_counter()
+    tokens = tokenizer.texts_to_token_ids(texts)
+    tokenized_t = time.perf_counter()
+
+    vocoder_start = []
+    wavs = generate_batch_wav(
+        tokens=tokens,
+        prompts=[prompt] * len(texts),
+        model=model,
+        vocoder=vocoder,
+        num_step=params.num_step,
+        guidance_scale=params.guidance_scale,
+        t_shift=params.t_shift,
+        vocoder_callback=lambda: vocoder_start.append(time.perf_counter()),
+    )
+    end_t = time.perf_counter()
+
+    return {
+        "wavs": wavs,
+        "tokenizer": tokenized_t - start_t,
+        "sample": vocoder_start[0] - tokenized_t,
+        "vocoder": end_t - vocoder_start[0],
+        "total": end_t - start_t,
+    }
+
+
+def merge_wavs(wavs: List[torch.Tensor], sampling_rate: int, path: str):
+    """Concatenate sentence waveforms with pauses and write them to a wav file."""
+    pause = torch.zeros(1, int(MERGE_PAUSE_SECONDS * sampling_rate))
+    pieces = []
+    for i, wav in enumerate(wavs):
+        if i > 0:
+            pieces.append(pause)
+        pieces.append(wav)
+    torchaudio.save(path, torch.cat(pieces, dim=-1), sample_rate=sampling_rate)
+
+
+def benchmark_latency(
+    model: torch.nn.Module,
+    vocoder: torch.nn.Module,
+    tokenizer,
+    prompt: dict,
+    timer: StageTimer,
+    params: AttributeDict,
+) -> Dict[str, dict]:
+    """Warm single-sentence latencies per stage, for each corpus length."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for length, sentences in CORPUS.items():
+            stages = defaultdict(list)
+            wav_seconds = []
+            num_tokens = [len(t) for t in tokenizer.texts_to_token_ids(sentences)]
+            for _ in range(params.num_repeats):
+                wavs = []
+                for text in sentences:
+                    timer.pop()
+                    res = synthesize([text], prompt, model, vocoder, tokenizer, params)
+                    times = timer.pop()
+                    stages["tokenizer"].append(res["tokenizer"])
+                    stages["text_encoder"].extend(times["text_encoder"])
+                    stages["fm_decoder_step"].extend(times["fm_decoder"])
+                    stages["vocoder"].append(res["vocoder"])
+                    stages["total"].append(res["total"])
+                    wav = res["wavs"][0]
+                    wavs.append(wav)
+                    wav_seconds.append(wav.shape[-1] / params.sampling_rate)
+
+                start_t = time.perf_counter()
+                merge_wavs(wavs, params.sampling_rate, f"{tmp_dir}/{length}.wav")
+                stages["merge"].append(time.perf_counter() - start_t)
+
+            results[length] = {
+                "num_sentences": len(sentences),
+                "mean_num_chars": float(np.mean([len(s) for s in sentences])),
+                "mean_num_tokens": float(np.mean(num_tokens)),
+                "mean_wav_seconds": float(np.mean(wav_seconds)),
+                "rtf": float(np.sum(stages["total"]) / np.sum(wav_seconds)),
+                "stages": {name: summarize(t) for name, t in stages.items()},
+            }
+            logging.info(
+                f"[{length}] median total "
+                f"{results[length]['stages']['total']['median']:.1f}ms, "
+                f"RTF {results[length]['rtf']:.4f}"
+            )
+    return results
+
+
+def benchmark_throughput(
+    model: torch.nn.Module,
+    vocoder: torch.nn.Module,
+    tokenizer,
+    prompt: dict,
+    params: AttributeDict,
+) -> List[dict]:
+    """Batched throughput over the whole corpus for every thread count and
+    batch size."""
+    sentences = [text for texts in CORPUS.values() for text in texts]
+    results = []
+    for num_threads in params.num_threads:
+        torch.set_num_threads(num_threads)
+        for batch_size in params.batch_sizes:
+            texts = list(
+                islice(cycle(sentences), batch_size * (params.throughput_batches + 1))
+            )
+            batches = [
+                texts[i : i + batch_size] for i in range(0, len(texts), batch_size)
+            ]
+            # The first batch warms up the allocator for this shape
+            synthesize(batches[0], prompt, model, vocoder, tokenizer, params)
+
+            elapsed = 0.0
+            wav_seconds = 0.0
+            for batch in batches[1:]:
+                res = synthesize(batch, prompt, model, vocoder, tokenizer, params)
+                elapsed += res["total"]
+                wav_seconds += sum(
+                    wav.shape[-1] / params.sampling_rate for wav in res["wavs"]
+                )
+            num_sentences = batch_size * params.throughput_batches
+            results.append(
+                {
+                    "num_threads": num_threads,
+                    "batch_size": batch_size,
+                    "num_sentences": num_sentences,
+                    "elapsed_s": elapsed,
+                    "sentences_per_second": num_sentences / elapsed,
+                    "audio_seconds_per_second": wav_seconds / elapsed,
+                    "rtf": elapsed / wav_seconds,
+                    "peak_rss_mb": peak_rss_mb(),
+                }
+            )
+            logging.info(
+                f"[threads {num_threads}, batch {batch_size}] "
+                f"{num_sentences / elapsed:.2f} sentences/s, "
+                f"RTF {elapsed / wav_seconds:.4f}"
+            )
+    return results
+
+
+@torch.inference_mode()
+def main():
+    parser = get_parser()
+    args = parser.parse_args()
+
+    params = AttributeDict()
+    params.update(vars(args))
+    params.num_threads = [int(n) for n in params.num_threads.split(",")]
+    params.batch_sizes = [int(n) for n in params.batch_sizes.split(",")]
+    fix_random_seed(params.seed)
+    for param, value in MODEL_DEFAULTS[params.model_name].items():
+        if getattr(params, param) is None:
+            setattr(params, param, value)
+
+    model_dir = Path(params.model_dir)
+    torch.set_num_threads(params.num_threads[0])
+
+    # Cold start, in the order of a fresh server process
+    cold_start = {}
+    start_t = time.perf_counter()
+    tokenizer = get_tokenizer(
+        params.tokenizer, str(model_dir / "tokens.txt"), lang=params.lang
+    )
+    cold_start["tokenizer_load_s"] = time.perf_counter() - start_t
+
+    t = time.perf_counter()
+    with open(model_dir / "model.json", "r") as f:
+        model_config = json.load(f)
+    model = get_model(
+        params.model_name,
+        model_config,
+        str(model_dir / params.checkpoint_name),
+        tokenizer,
+    )
+    model.eval()
+    cold_start["model_load_s"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    vocoder = get_vocoder(params.vocoder_path)
+    vocoder.eval()
+    cold_start["vocoder_load_s"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if model_config["feature"]["type"] != "vocos":
+        raise NotImplementedError(
+            f"Unsupported feature type: {model_config['feature']['type']}"
+        )
+    params.sampling_rate = model_config["feature"]["sampling_rate"]
+    prompt = prepare_prompt(
+        prompt_text=params.prompt_text,
+        prompt_wav=params.prompt_wav,
+        tokenizer=tokenizer,
+        feature_extractor=VocosFbank(),
+        device=torch.device("cpu"),
+        sampling_rate=params.sampling_rate,
+    )
+    cold_start["prompt_s"] = time.perf_counter() - t
+
+    first_sentence = CORPUS["short"][0]
+    res = synthesize([first_sentence], prompt, model, vocoder, tokenizer, params)
+    cold_start["first_sentence_s"] = res["total"]
+    cold_start["total_s"] = time.perf_counter() - start_t
+    cold_start["peak_rss_mb"] = peak_rss_mb()
+    logging.info(f"Cold start: {cold_start}")
+
+    warm = []
+    for _ in range(params.num_repeats):
+        res = synthesize([first_sentence], prompt, model, vocoder, tokenizer, params)
+        warm.append(res["total"])
+
+    timer = StageTimer(
+        {"text_encoder": model.text_encoder, "fm_decoder": model.fm_decoder}
+    )
+    try:
+        latency = benchmark_latency(model, vocoder, tokenizer, prompt, timer, params)
+    finally:
+        timer.remove()
+    throughput = benchmark_throughput(model, vocoder, tokenizer, prompt, params)
+
+    results = {
+        "tag": params.tag,
+        "date": dt.datetime.now().isoformat(timespec="seconds"),
+        "system": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+        },
+        "config": {
+            "model_name": params.model_name,
+            "checkpoint_name": params.checkpoint_name,
+            "tokenizer": params.tokenizer,
+            "lang": params.lang,
+            "num_step": params.num_step,
+            "guidance_scale": params.guidance_scale,
+            "t_shift": params.t_shift,
+            "num_repeats": params.num_repeats,
+            "latency_num_threads": params.num_threads[0],
+        },
+        "cold_start": cold_start,
+        "warm_start": {"first_sentence": summarize(warm)},
+        "latency": latency,
+        "throughput": throughput,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if params.output:
+        with open(params.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        logging.info(f"Results written to {params.output}")
+    else:
+        print(output)
+
+    logging.info("Done!")
+
+
+if __name__ == "__main__":
+    torch.set_num_interop_threads(1)
+
+    formatter = "%(asctime)s %(levelname)s [%(filename)s:%(lineno)d] %(message)s"
+    logging.basicConfig(format=formatter, level=logging.INFO, force=True)
+
+    main()
@@ -29,6 +29,10 @@ The input would be data/manifests/libritts-cuts_dev-other.jsonl.gz or
     (libritts_supervisions_dev-other.jsonl.gz and librittsrecordings_dev-other.jsonl.gz)
 
 The output would be data/fbank/libritts-cuts_dev-other.jsonl.gz
+
+With `--storage-type mmap` (or `mmap-fp16`), features are written
+    uncompressed into one array per output that training dataloaders
+    memory-map, instead of lilcom-compressed archives.
 """
 
 
@@ -41,6 +45,7 @@ import lhotse
 import torch
 from lhotse import CutSet, LilcomChunkyWriter, load_manifest_lazy
 
+from zipvoice.dataset.feature_store import MmapFeaturesWriter, MmapFp16FeaturesWriter
 from zipvoice.utils.common import str2bool
 from zipvoice.utils.feature import VocosFbank
 
@@ -53,6 +58,12 @@ torch.set_num_interop_threads(1)
 
 lhotse.set_audio_duration_mismatch_tolerance(0.1)
 
+STORAGE_TYPES = {
+    "lilcom": LilcomChunkyWriter,
+    "mmap": MmapFeaturesWriter,
+    "mmap-fp16": MmapFp16FeaturesWriter,
+}
+
 
 def get_args():
     parser = argparse.ArgumentParser()
@@ -71,6 +82,15 @@ def get_args():
         help="fbank type",
     )
 
+    parser.add_argument(
+        "--storage-type",
+        type=str,
+        default="lilcom",
+        choices=list(STORAGE_TYPES),
+        help="lilcom: compressed archives, mmap/mmap-fp16: uncompressed "
+        "float32/float16 arrays that are memory-mapped at training time.",
+    )
+
     parser.add_argument(
         "--dataset",
         type=str,
@@ -182,7 +202,7 @@ def compute_fbank_split_single(params, idx):
         storage_path=f"{output_dir}/{prefix}_feats_{subset}_{idx}",
         num_workers=4,
         batch_duration=params.batch_duration,
-        storage_type=LilcomChunkyWriter,
+        storage_type=STORAGE_TYPES[params.storage_type],
         overwrite=True,
     )
     logging.info(f"Saving file to {output_dir / cuts_filename}")
@@ -253,7 +273,7 @@ def compute_fbank(params):
         extractor=extractor,
         storage_path=f"{output_dir}/{prefix}_feats_{subset}",
         num_jobs=num_jobs,
-        storage_type=LilcomChunkyWriter,
+        storage_type=STORAGE_TYPES[params.storage_type],
     )
     logging.info(f"Saving file to {output_dir / cuts_filename}")
     cut_set.to_file(output_dir / cuts_filename)
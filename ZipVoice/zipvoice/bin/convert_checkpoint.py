@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Usage:
+This script extracts the inference weights of a training checkpoint
+into a safetensors file.
+
+python3 -m zipvoice.bin.convert_checkpoint \
+    --checkpoint exp/zipvoice/epoch-11-avg-4.pt \
+    --output exp/zipvoice/model.safetensors
+
+`--key` selects which weights to extract: `model` (default),
+    `model_avg` or `model_ema`.
+
+The result can be passed to the inference scripts instead of the .pt file
+(e.g. `--checkpoint-name model.safetensors`). It is loaded memory-mapped,
+so the optimizer state and other training entries are never read.
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+from zipvoice.utils.checkpoint import convert_checkpoint_to_safetensors
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        required=True,
+        help="Path to the training checkpoint (.pt).",
+    )
+
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Path to the output safetensors file. "
+        "Defaults to the checkpoint path with a .safetensors suffix.",
+    )
+
+    parser.add_argument(
+        "--key",
+        type=str,
+        default="model",
+        choices=["model", "model_avg", "model_ema"],
+        help="Which weights in the checkpoint to extract.",
+    )
+
+    return parser
+
+
+def main():
+    parser = get_parser()
+    args = parser.parse_args()
+
+    checkpoint = Path(args.checkpoint)
+    output = (
+        Path(args.output)
+        if args.output is not None
+        else checkpoint.with_suffix(".safetensors")
+    )
+
+    num_tensors = convert_checkpoint_to_safetensors(
+        filename=checkpoint, out_filename=output, key=args.key
+    )
+    logging.info(f"Wrote {num_tensors} tensors to {output}")
+
+    logging.info("Done!")
+
+
+if __name__ == "__main__":
+    formatter = "%(asctime)s %(levelname)s [%(filename)s:%(lineno)d] %(message)s"
+    logging.basicConfig(format=formatter, level=logging.INFO, force=True)
+
+    main()
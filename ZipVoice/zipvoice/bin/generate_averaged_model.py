@@ -27,6 +27,11 @@ python3 -m zipvoice.bin.generate_averaged_model  \
 
 It will generate a file `epoch-11-avg-14.pt` in the given `exp_dir`.
 You can later load it by `torch.load("epoch-11-avg-4.pt")`.
+
+With `--output-format safetensors`, the model is not built: the checkpoints
+are memory-mapped and averaged tensor by tensor into `epoch-11-avg-4.safetensors`,
+which needs little memory even for large models. It can be used for inference
+directly, e.g. with `--checkpoint-name epoch-11-avg-4.safetensors`.
 """
 
 import argparse
@@ -41,6 +46,7 @@ from zipvoice.models.zipvoice_dialog import ZipVoiceDialog, ZipVoiceDialogStereo
 from zipvoice.models.zipvoice_distill import ZipVoiceDistill
 from zipvoice.tokenizer.tokenizer import SimpleTokenizer
 from zipvoice.utils.checkpoint import (
+    average_checkpoints_streaming,
     average_checkpoints_with_averaged_model,
     find_checkpoints,
 )
@@ -100,6 +106,16 @@ def get_parser():
         help="The model type to be averaged. ",
     )
 
+    parser.add_argument(
+        "--output-format",
+        type=str,
+        default="pt",
+        choices=["pt", "safetensors"],
+        help="pt: build the model, load the averaged weights and save them with "
+        "torch.save. safetensors: stream the average tensor by tensor from the "
+        "memory-mapped checkpoints into a safetensors file, with bounded memory.",
+    )
+
     return parser
 
 
@@ -134,33 +150,6 @@ def main():
 
     logging.info("Script started")
 
-    params.device = torch.device("cpu")
-    logging.info(f"Device: {params.device}")
-
-    logging.info("About to create model")
-    if params.model_name == "zipvoice":
-        model = ZipVoice(
-            **model_config["model"],
-            **tokenizer_config,
-        )
-    elif params.model_name == "zipvoice_distill":
-        model = ZipVoiceDistill(
-            **model_config["model"],
-            **tokenizer_config,
-        )
-    elif params.model_name == "zipvoice_dialog":
-        model = ZipVoiceDialog(
-            **model_config["model"],
-            **tokenizer_config,
-        )
-    elif params.model_name == "zipvoice_dialog_stereo":
-        model = ZipVoiceDialogStereo(
-            **model_config["model"],
-            **tokenizer_config,
-        )
-    else:
-        raise ValueError(f"Unknown model name: {params.model_name}")
-
     if params.iter > 0:
         filenames = find_checkpoints(params.exp_dir, iteration=-params.iter)[
             : params.avg + 1
@@ -180,15 +169,7 @@ def main():
             "Calculating the averaged model over iteration checkpoints"
             f" from {filename_start} (excluded) to {filename_end}"
         )
-        model.to(params.device)
-        model.load_state_dict(
-            average_checkpoints_with_averaged_model(
-                filename_start=filename_start,
-                filename_end=filename_end,
-                device=params.device,
-            ),
-            strict=True,
-        )
+        filename = params.exp_dir / f"iter-{params.iter}-avg-{params.avg}"
     else:
         assert params.avg > 0, params.avg
         start = params.epoch - params.avg
@@ -199,19 +180,56 @@ def main():
             f"Calculating the averaged model over epoch range from "
             f"{start} (excluded) to {params.epoch}"
         )
-        model.to(params.device)
-        model.load_state_dict(
-            average_checkpoints_with_averaged_model(
-                filename_start=filename_start,
-                filename_end=filename_end,
-                device=params.device,
-            ),
-            strict=True,
+        filename = params.exp_dir / f"epoch-{params.epoch}-avg-{params.avg}"
+
+    if params.output_format == "safetensors":
+        filename = filename.with_suffix(".safetensors")
+        num_tensors = average_checkpoints_streaming(
+            filename_start=filename_start,
+            filename_end=filename_end,
+            out_filename=filename,
+        )
+        logging.info(f"Saved {num_tensors} averaged tensors to {filename}")
+        logging.info("Done!")
+        return
+    filename = filename.with_suffix(".pt")
+
+    params.device = torch.device("cpu")
+    logging.info(f"Device: {params.device}")
+
+    logging.info("About to create model")
+    if params.model_name == "zipvoice":
+        model = ZipVoice(
+            **model_config["model"],
+            **tokenizer_config,
+        )
+    elif params.model_name == "zipvoice_distill":
+        model = ZipVoiceDistill(
+            **model_config["model"],
+            **tokenizer_config,
+        )
+    elif params.model_name == "zipvoice_dialog":
+        model = ZipVoiceDialog(
+            **model_config["model"],
+            **tokenizer_config,
+        )
+    elif params.model_name == "zipvoice_dialog_stereo":
+        model = ZipVoiceDialogStereo(
+            **model_config["model"],
+            **tokenizer_config,
         )
-    if params.iter > 0:
-        filename = params.exp_dir / f"iter-{params.iter}-avg-{params.avg}.pt"
     else:
-        filename = params.exp_dir / f"epoch-{params.epoch}-avg-{params.avg}.pt"
+        raise ValueError(f"Unknown model name: {params.model_name}")
+
+    model.to(params.device)
+    model.load_state_dict(
+        average_checkpoints_with_averaged_model(
+            filename_start=filename_start,
+            filename_end=filename_end,
+            device=params.device,
+        ),
+        strict=True,
+    )
 
     logging.info(f"Saving the averaged checkpoint to {filename}")
     torch.save({"model": model.state_dict()}, filename)
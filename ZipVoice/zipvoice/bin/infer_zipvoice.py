@@ -55,33 +55,40 @@ import json
 import logging
 import os
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, List, Optional
 
 import numpy as np
-import safetensors.torch
-import torch
-import torchaudio
-from huggingface_hub import hf_hub_download
-from lhotse.utils import fix_random_seed
-from vocos import Vocos
-
-from zipvoice.models.zipvoice import ZipVoice
-from zipvoice.models.zipvoice_distill import ZipVoiceDistill
+
 from zipvoice.tokenizer.tokenizer import (
     EmiliaTokenizer,
     EspeakTokenizer,
     LibriTTSTokenizer,
     SimpleTokenizer,
 )
-from zipvoice.utils.checkpoint import load_checkpoint
-from zipvoice.utils.common import AttributeDict
-from zipvoice.utils.feature import VocosFbank
+from zipvoice.utils.progress import RenderProgress
+
+if TYPE_CHECKING:
+    # torch, torchaudio and lhotse are imported where they are used, so that
+    # importing this module (e.g. by the API server or for --help) stays cheap.
+    import torch
+
+    from zipvoice.utils.feature import VocosFbank
 
 HUGGINGFACE_REPO = "k2-fsa/ZipVoice"
 MODEL_DIR = {
     "zipvoice": "zipvoice",
     "zipvoice_distill": "zipvoice_distill",
 }
+MODEL_DEFAULTS = {
+    "zipvoice": {
+        "num_step": 16,
+        "guidance_scale": 1.0,
+    },
+    "zipvoice_distill": {
+        "num_step": 8,
+        "guidance_scale": 3.0,
+    },
+}
 
 
 def get_parser():
@@ -137,6 +144,14 @@ def get_parser():
         "https://github.com/rhasspy/espeak-ng/blob/master/docs/languages.md",
     )
 
+    parser.add_argument(
+        "--normalize-text",
+        action="store_true",
+        help="Spell out numbers, dates, units and abbreviations of Vietnamese "
+        "texts before g2p, used when tokenizer type is espeak and lang is vi. "
+        "Only enable it if the model was trained on normalized texts.",
+    )
+
     parser.add_argument(
         "--test-list",
         type=str,
@@ -236,10 +251,21 @@ def get_parser():
         help="Random seed",
     )
 
+    parser.add_argument(
+        "--progress-file",
+        type=str,
+        default=None,
+        help="If given, the generation progress (current sentence, solver step, "
+        "stage and estimated remaining time) is published to this JSON file.",
+    )
+
     return parser
 
 
 def get_vocoder(vocos_local_path: Optional[str] = None):
+    import torch
+    from vocos import Vocos
+
     if vocos_local_path:
         vocoder = Vocos.from_hparams(f"{vocos_local_path}/config.yaml")
         state_dict = torch.load(
@@ -253,44 +279,139 @@ def get_vocoder(vocos_local_path: Optional[str] = None):
     return vocoder
 
 
-def generate_sentence(
-    save_path: str,
+def get_tokenizer(
+    tokenizer_type: str,
+    token_file: str,
+    lang: str = "en-us",
+    normalize_text: bool = False,
+):
+    if tokenizer_type == "emilia":
+        return EmiliaTokenizer(token_file=token_file)
+    elif tokenizer_type == "libritts":
+        return LibriTTSTokenizer(token_file=token_file)
+    elif tokenizer_type == "espeak":
+        return EspeakTokenizer(
+            token_file=token_file, lang=lang, normalize=normalize_text
+        )
+    else:
+        assert tokenizer_type == "simple", tokenizer_type
+        return SimpleTokenizer(token_file=token_file)
+
+
+def build_model(
+    model_name: str,
+    model_config: dict,
+    tokenizer: EmiliaTokenizer,
+) -> "torch.nn.Module":
+    """Build the model from its configuration, without loading any weights."""
+    # Imported here so that importing this module (e.g. by the API server or for
+    # --help) does not load the model code.
+    from zipvoice.models.zipvoice import ZipVoice
+    from zipvoice.models.zipvoice_distill import ZipVoiceDistill
+
+    tokenizer_config = {"vocab_size": tokenizer.vocab_size, "pad_id": tokenizer.pad_id}
+
+    if model_name == "zipvoice":
+        return ZipVoice(
+            **model_config["model"],
+            **tokenizer_config,
+        )
+    else:
+        assert model_name == "zipvoice_distill"
+        return ZipVoiceDistill(
+            **model_config["model"],
+            **tokenizer_config,
+        )
+
+
+def rebuild_positional_encodings(model: "torch.nn.Module") -> None:
+    """
+    Recompute the positional encodings of a model built on the meta device.
+
+    They are plain tensor attributes rather than parameters or buffers, so
+    neither loading a state dict nor ``model.to()`` replaces them; they are
+    rebuilt on CPU and moved to the input device on the first forward.
+
+    Args:
+        model (torch.nn.Module): The model, with its weights already loaded.
+    """
+    import torch
+
+    from zipvoice.models.modules.zipformer import CompactRelPositionalEncoding
+
+    for name, module in model.named_modules():
+        if isinstance(module, CompactRelPositionalEncoding) and module.pe.is_meta:
+            # self.pe covers relative positions -(T - 1) .. T - 1
+            max_len = (module.pe.size(0) + 1) // 2
+            module.pe = None
+            module.extend_pe(torch.tensor(0.0).expand(max_len))
+        for attr, value in vars(module).items():
+            if isinstance(value, torch.Tensor) and value.is_meta:
+                raise RuntimeError(
+                    f"{name}.{attr} is still on the meta device after loading"
+                )
+
+
+def get_model(
+    model_name: str,
+    model_config: dict,
+    model_ckpt: str,
+    tokenizer: EmiliaTokenizer,
+) -> "torch.nn.Module":
+    """Build the model from its configuration and load the checkpoint."""
+    import torch
+
+    from zipvoice.utils.checkpoint import load_checkpoint, load_safetensors
+
+    if str(model_ckpt).endswith(".safetensors"):
+        # Build without allocating and adopt the memory-mapped tensors as parameters
+        with torch.device("meta"):
+            model = build_model(model_name, model_config, tokenizer)
+        load_safetensors(model_ckpt, model=model, strict=True)
+        rebuild_positional_encodings(model)
+        return model
+
+    model = build_model(model_name, model_config, tokenizer)
+    if str(model_ckpt).endswith(".pt"):
+        load_checkpoint(filename=model_ckpt, model=model, strict=True)
+    else:
+        raise NotImplementedError(f"Unsupported model checkpoint format: {model_ckpt}")
+    return model
+
+
+def get_device() -> "torch.device":
+    import torch
+
+    if torch.cuda.is_available():
+        return torch.device("cuda", 0)
+    elif torch.backends.mps.is_available():
+        return torch.device("mps")
+    return torch.device("cpu")
+
+
+def prepare_prompt(
     prompt_text: str,
     prompt_wav: str,
-    text: str,
-    model: torch.nn.Module,
-    vocoder: torch.nn.Module,
     tokenizer: EmiliaTokenizer,
-    feature_extractor: VocosFbank,
-    device: torch.device,
-    num_step: int = 16,
-    guidance_scale: float = 1.0,
-    speed: float = 1.0,
-    t_shift: float = 0.5,
+    feature_extractor: "VocosFbank",
+    device: "torch.device",
     target_rms: float = 0.1,
     feat_scale: float = 0.1,
     sampling_rate: int = 24000,
-):
+) -> dict:
     """
-    Generate waveform of a text based on a given prompt
-        waveform and its transcription.
+    Tokenize the prompt transcription and extract the prompt features.
+
+    The result only depends on the prompt, so it can be computed once and
+    reused for every sentence synthesized with the same prompt.
 
     Args:
-        save_path (str): Path to save the generated wav.
         prompt_text (str): Transcription of the prompt wav.
         prompt_wav (str): Path to the prompt wav file.
-        text (str): Text to be synthesized into a waveform.
-        model (torch.nn.Module): The model used for generation.
-        vocoder (torch.nn.Module): The vocoder used to convert features to waveforms.
         tokenizer (EmiliaTokenizer): The tokenizer used to convert text to tokens.
         feature_extractor (VocosFbank): The feature extractor used to
             extract acoustic features.
         device (torch.device): The device on which computations are performed.
-        num_step (int, optional): Number of steps for decoding. Defaults to 16.
-        guidance_scale (float, optional): Scale for classifier-free guidance.
-            Defaults to 1.0.
-        speed (float, optional): Speed control. Defaults to 1.0.
-        t_shift (float, optional): Time shift. Defaults to 0.5.
         target_rms (float, optional): Target RMS for waveform normalization.
             Defaults to 0.1.
         feat_scale (float, optional): Scale for features.
@@ -298,11 +419,12 @@ def generate_sentence(
         sampling_rate (int, optional): Sampling rate for the waveform.
             Defaults to 24000.
     Returns:
-        metrics (dict): Dictionary containing time and real-time
-            factor metrics for processing.
+        prompt (dict): Dictionary with "prompt_tokens", "prompt_features",
+            "prompt_features_lens" and "prompt_rms".
     """
-    # Convert text to tokens
-    tokens = tokenizer.texts_to_token_ids([text])
+    import torch
+    import torchaudio
+
     prompt_tokens = tokenizer.texts_to_token_ids([prompt_text])
 
     # Load and preprocess prompt wav
@@ -326,6 +448,58 @@ def generate_sentence(
     prompt_features = prompt_features.unsqueeze(0) * feat_scale
     prompt_features_lens = torch.tensor([prompt_features.size(1)], device=device)
 
+    return {
+        "prompt_tokens": prompt_tokens,
+        "prompt_features": prompt_features,
+        "prompt_features_lens": prompt_features_lens,
+        "prompt_rms": prompt_rms,
+    }
+
+
+def generate_sentence_wav(
+    text: str,
+    prompt: dict,
+    model: "torch.nn.Module",
+    vocoder: "torch.nn.Module",
+    tokenizer: EmiliaTokenizer,
+    num_step: int = 16,
+    guidance_scale: float = 1.0,
+    speed: float = 1.0,
+    t_shift: float = 0.5,
+    target_rms: float = 0.1,
+    feat_scale: float = 0.1,
+    sampling_rate: int = 24000,
+    progress_callback: Optional[Callable] = None,
+    sentence_index: int = 0,
+):
+    """
+    Generate the waveform of a text in memory, based on a prompt prepared
+        by :func:`prepare_prompt`.
+
+    Args:
+        text (str): Text to be synthesized into a waveform.
+        prompt (dict): The prompt returned by :func:`prepare_prompt`.
+        model (torch.nn.Module): The model used for generation.
+        vocoder (torch.nn.Module): The vocoder used to convert features to waveforms.
+        tokenizer (EmiliaTokenizer): The tokenizer used to convert text to tokens.
+        The remaining arguments are the same as in :func:`generate_sentence`.
+    Returns:
+        wav (torch.Tensor): The generated waveform on CPU, with the shape (1, T).
+        metrics (dict): Dictionary containing time and real-time
+            factor metrics for processing.
+    """
+    if progress_callback is not None:
+        progress_callback("sentence_start", index=sentence_index)
+
+        def step_callback(step: int, num_step: int):
+            progress_callback("solver_step", step=step, num_step=num_step)
+
+    else:
+        step_callback = None
+
+    # Convert text to tokens
+    tokens = tokenizer.texts_to_token_ids([text])
+
     # Start timing
     start_t = dt.datetime.now()
 
@@ -337,20 +511,23 @@ def generate_sentence(
         pred_prompt_features_lens,
     ) = model.sample(
         tokens=tokens,
-        prompt_tokens=prompt_tokens,
-        prompt_features=prompt_features,
-        prompt_features_lens=prompt_features_lens,
+        prompt_tokens=prompt["prompt_tokens"],
+        prompt_features=prompt["prompt_features"],
+        prompt_features_lens=prompt["prompt_features_lens"],
         speed=speed,
         t_shift=t_shift,
         duration="predict",
         num_step=num_step,
         guidance_scale=guidance_scale,
+        progress_callback=step_callback,
     )
 
     # Postprocess predicted features
     pred_features = pred_features.permute(0, 2, 1) / feat_scale  # (B, C, T)
 
     # Start vocoder processing
+    if progress_callback is not None:
+        progress_callback("vocoder", index=sentence_index)
     start_vocoder_t = dt.datetime.now()
     wav = vocoder.decode(pred_features).squeeze(1).clamp(-1, 1)
 
@@ -373,9 +550,172 @@ def generate_sentence(
     }
 
     # Adjust wav volume if necessary
+    prompt_rms = prompt["prompt_rms"]
     if prompt_rms < target_rms:
         wav = wav * prompt_rms / target_rms
-    torchaudio.save(save_path, wav.cpu(), sample_rate=sampling_rate)
+
+    if progress_callback is not None:
+        progress_callback("sentence_end", index=sentence_index, metrics=metrics)
+
+    return wav.cpu(), metrics
+
+
+def generate_batch_wav(
+    tokens: List[List[int]],
+    prompts: List[dict],
+    model: "torch.nn.Module",
+    vocoder: "torch.nn.Module",
+    num_step: int = 16,
+    guidance_scale: float = 1.0,
+    speed: float = 1.0,
+    t_shift: float = 0.5,
+    target_rms: float = 0.1,
+    feat_scale: float = 0.1,
+    step_callback: Optional[Callable[[int, int], None]] = None,
+    vocoder_callback: Optional[Callable[[], None]] = None,
+) -> List["torch.Tensor"]:
+    """
+    Generate the waveforms of several texts with one batched pass of the
+        ODE solver. Each text may have its own prompt; prompt features are
+        padded to the longest one and masked by their lengths.
+
+    Args:
+        tokens (List[List[int]]): Token ids of each text.
+        prompts (List[dict]): The prompt of each text, as returned by
+            :func:`prepare_prompt`. All prompts must be on the same device.
+        model (torch.nn.Module): The model used for generation.
+        vocoder (torch.nn.Module): The vocoder used to convert features to waveforms.
+        step_callback (Callable, optional): Called as `step_callback(step, num_step)`
+            after each solver step.
+        vocoder_callback (Callable, optional): Called once before vocoding.
+        The remaining arguments are the same as in :func:`generate_sentence`.
+    Returns:
+        wavs (List[torch.Tensor]): The generated waveform of each text on CPU,
+            with the shape (1, T), trimmed to its own length.
+    """
+    import torch
+
+    prompt_features = torch.nn.utils.rnn.pad_sequence(
+        [prompt["prompt_features"][0] for prompt in prompts], batch_first=True
+    )
+    prompt_features_lens = torch.cat(
+        [prompt["prompt_features_lens"] for prompt in prompts]
+    )
+
+    pred_features, pred_features_lens, _, _ = model.sample(
+        tokens=tokens,
+        prompt_tokens=[prompt["prompt_tokens"][0] for prompt in prompts],
+        prompt_features=prompt_features,
+        prompt_features_lens=prompt_features_lens,
+        speed=speed,
+        t_shift=t_shift,
+        duration="predict",
+        num_step=num_step,
+        guidance_scale=guidance_scale,
+        progress_callback=step_callback,
+    )
+    pred_features = pred_features.permute(0, 2, 1) / feat_scale  # (B, C, T)
+
+    if vocoder_callback is not None:
+        vocoder_callback()
+    wavs = []
+    for i, prompt in enumerate(prompts):
+        # Vocode each item alone so padded frames never reach the vocoder
+        features = pred_features[i : i + 1, :, : pred_features_lens[i]]
+        wav = vocoder.decode(features).squeeze(1).clamp(-1, 1)
+        prompt_rms = prompt["prompt_rms"]
+        if prompt_rms < target_rms:
+            wav = wav * prompt_rms / target_rms
+        wavs.append(wav.cpu())
+    return wavs
+
+
+def generate_sentence(
+    save_path: str,
+    prompt_text: str,
+    prompt_wav: str,
+    text: str,
+    model: "torch.nn.Module",
+    vocoder: "torch.nn.Module",
+    tokenizer: EmiliaTokenizer,
+    feature_extractor: "VocosFbank",
+    device: "torch.device",
+    num_step: int = 16,
+    guidance_scale: float = 1.0,
+    speed: float = 1.0,
+    t_shift: float = 0.5,
+    target_rms: float = 0.1,
+    feat_scale: float = 0.1,
+    sampling_rate: int = 24000,
+    progress_callback: Optional[Callable] = None,
+    sentence_index: int = 0,
+):
+    """
+    Generate waveform of a text based on a given prompt
+        waveform and its transcription.
+
+    Args:
+        save_path (str): Path to save the generated wav.
+        prompt_text (str): Transcription of the prompt wav.
+        prompt_wav (str): Path to the prompt wav file.
+        text (str): Text to be synthesized into a waveform.
+        model (torch.nn.Module): The model used for generation.
+        vocoder (torch.nn.Module): The vocoder used to convert features to waveforms.
+        tokenizer (EmiliaTokenizer): The tokenizer used to convert text to tokens.
+        feature_extractor (VocosFbank): The feature extractor used to
+            extract acoustic features.
+        device (torch.device): The device on which computations are performed.
+        num_step (int, optional): Number of steps for decoding. Defaults to 16.
+        guidance_scale (float, optional): Scale for classifier-free guidance.
+            Defaults to 1.0.
+        speed (float, optional): Speed control. Defaults to 1.0.
+        t_shift (float, optional): Time shift. Defaults to 0.5.
+        target_rms (float, optional): Target RMS for waveform normalization.
+            Defaults to 0.1.
+        feat_scale (float, optional): Scale for features.
+            Defaults to 0.1.
+        sampling_rate (int, optional): Sampling rate for the waveform.
+            Defaults to 24000.
+        progress_callback (Callable, optional): Called as
+            `progress_callback(event, **info)` with the events "sentence_start",
+            "solver_step", "vocoder" and "sentence_end",
+            see :class:`zipvoice.utils.progress.RenderProgress`.
+        sentence_index (int, optional): Index of the sentence reported to
+            `progress_callback`. Defaults to 0.
+    Returns:
+        metrics (dict): Dictionary containing time and real-time
+            factor metrics for processing.
+    """
+    import torchaudio
+
+    prompt = prepare_prompt(
+        prompt_text=prompt_text,
+        prompt_wav=prompt_wav,
+        tokenizer=tokenizer,
+        feature_extractor=feature_extractor,
+        device=device,
+        target_rms=target_rms,
+        feat_scale=feat_scale,
+        sampling_rate=sampling_rate,
+    )
+
+    wav, metrics = generate_sentence_wav(
+        text=text,
+        prompt=prompt,
+        model=model,
+        vocoder=vocoder,
+        tokenizer=tokenizer,
+        num_step=num_step,
+        guidance_scale=guidance_scale,
+        speed=speed,
+        t_shift=t_shift,
+        target_rms=target_rms,
+        feat_scale=feat_scale,
+        sampling_rate=sampling_rate,
+        progress_callback=progress_callback,
+        sentence_index=sentence_index,
+    )
+    torchaudio.save(save_path, wav, sample_rate=sampling_rate)
 
     return metrics
 
@@ -383,11 +723,11 @@ def generate_sentence(
 def generate_list(
     res_dir: str,
     test_list: str,
-    model: torch.nn.Module,
-    vocoder: torch.nn.Module,
+    model: "torch.nn.Module",
+    vocoder: "torch.nn.Module",
     tokenizer: EmiliaTokenizer,
-    feature_extractor: VocosFbank,
-    device: torch.device,
+    feature_extractor: "VocosFbank",
+    device: "torch.device",
     num_step: int = 16,
     guidance_scale: float = 1.0,
     speed: float = 1.0,
@@ -395,7 +735,10 @@ def generate_list(
     target_rms: float = 0.1,
     feat_scale: float = 0.1,
     sampling_rate: int = 24000,
+    progress_callback: Optional[Callable] = None,
 ):
+    import torchaudio
+
     total_t = []
     total_t_no_vocoder = []
     total_t_vocoder = []
@@ -404,19 +747,32 @@ def generate_list(
     with open(test_list, "r") as fr:
         lines = fr.readlines()
 
+    if progress_callback is not None:
+        progress_callback("start", total=len(lines), num_step=num_step)
+
+    # Lines usually share a prompt, only prepare it again when it changes
+    prompt_key, prompt = None, None
     for i, line in enumerate(lines):
         wav_name, prompt_text, prompt_wav, text = line.strip().split("\t")
         save_path = f"{res_dir}/{wav_name}.wav"
-        metrics = generate_sentence(
-            save_path=save_path,
-            prompt_text=prompt_text,
-            prompt_wav=prompt_wav,
+        if (prompt_text, prompt_wav) != prompt_key:
+            prompt_key = (prompt_text, prompt_wav)
+            prompt = prepare_prompt(
+                prompt_text=prompt_text,
+                prompt_wav=prompt_wav,
+                tokenizer=tokenizer,
+                feature_extractor=feature_extractor,
+                device=device,
+                target_rms=target_rms,
+                feat_scale=feat_scale,
+                sampling_rate=sampling_rate,
+            )
+        wav, metrics = generate_sentence_wav(
             text=text,
+            prompt=prompt,
             model=model,
             vocoder=vocoder,
             tokenizer=tokenizer,
-            feature_extractor=feature_extractor,
-            device=device,
             num_step=num_step,
             guidance_scale=guidance_scale,
             speed=speed,
@@ -424,13 +780,19 @@ def generate_list(
             target_rms=target_rms,
             feat_scale=feat_scale,
             sampling_rate=sampling_rate,
+            progress_callback=progress_callback,
+            sentence_index=i,
         )
+        torchaudio.save(save_path, wav, sample_rate=sampling_rate)
         logging.info(f"[Sentence: {i}] RTF: {metrics['rtf']:.4f}")
         total_t.append(metrics["t"])
         total_t_no_vocoder.append(metrics["t_no_vocoder"])
         total_t_vocoder.append(metrics["t_vocoder"])
         total_wav_seconds.append(metrics["wav_seconds"])
 
+    if progress_callback is not None:
+        progress_callback("finish")
+
     logging.info(f"Average RTF: {np.sum(total_t) / np.sum(total_wav_seconds):.4f}")
     logging.info(
         f"Average RTF w/o vocoder: "
@@ -442,27 +804,21 @@ def generate_list(
     )
 
 
-@torch.inference_mode()
 def main():
     parser = get_parser()
     args = parser.parse_args()
 
+    import torch
+    from lhotse.utils import fix_random_seed
+
+    from zipvoice.utils.common import AttributeDict
+    from zipvoice.utils.feature import VocosFbank
+
     params = AttributeDict()
     params.update(vars(args))
     fix_random_seed(params.seed)
 
-    model_defaults = {
-        "zipvoice": {
-            "num_step": 16,
-            "guidance_scale": 1.0,
-        },
-        "zipvoice_distill": {
-            "num_step": 8,
-            "guidance_scale": 3.0,
-        },
-    }
-
-    model_specific_defaults = model_defaults.get(params.model_name, {})
+    model_specific_defaults = MODEL_DEFAULTS.get(params.model_name, {})
 
     for param, value in model_specific_defaults.items():
         if getattr(params, param) is None:
@@ -493,6 +849,8 @@ def main():
     else:
         logging.info("Using pretrained model from the huggingface")
         logging.info("Downloading the requires files from HuggingFace")
+        from huggingface_hub import hf_hub_download
+
         model_ckpt = hf_hub_download(
             HUGGINGFACE_REPO, filename=f"{MODEL_DIR[params.model_name]}/model.pt"
         )
@@ -506,46 +864,19 @@ def main():
 
     logging.info("Loading model...")
 
-    if params.tokenizer == "emilia":
-        tokenizer = EmiliaTokenizer(token_file=token_file)
-    elif params.tokenizer == "libritts":
-        tokenizer = LibriTTSTokenizer(token_file=token_file)
-    elif params.tokenizer == "espeak":
-        tokenizer = EspeakTokenizer(token_file=token_file, lang=params.lang)
-    else:
-        assert params.tokenizer == "simple"
-        tokenizer = SimpleTokenizer(token_file=token_file)
-
-    tokenizer_config = {"vocab_size": tokenizer.vocab_size, "pad_id": tokenizer.pad_id}
+    tokenizer = get_tokenizer(
+        params.tokenizer,
+        token_file,
+        lang=params.lang,
+        normalize_text=params.normalize_text,
+    )
 
     with open(model_config, "r") as f:
         model_config = json.load(f)
 
-    if params.model_name == "zipvoice":
-        model = ZipVoice(
-            **model_config["model"],
-            **tokenizer_config,
-        )
-    else:
-        assert params.model_name == "zipvoice_distill"
-        model = ZipVoiceDistill(
-            **model_config["model"],
-            **tokenizer_config,
-        )
+    model = get_model(params.model_name, model_config, model_ckpt, tokenizer)
 
-    if str(model_ckpt).endswith(".safetensors"):
-        safetensors.torch.load_model(model, model_ckpt)
-    elif str(model_ckpt).endswith(".pt"):
-        load_checkpoint(filename=model_ckpt, model=model, strict=True)
-    else:
-        raise NotImplementedError(f"Unsupported model checkpoint format: {model_ckpt}")
-
-    if torch.cuda.is_available():
-        params.device = torch.device("cuda", 0)
-    elif torch.backends.mps.is_available():
-        params.device = torch.device("mps")
-    else:
-        params.device = torch.device("cpu")
+    params.device = get_device()
     logging.info(f"Device: {params.device}")
 
     model = model.to(params.device)
@@ -563,48 +894,61 @@ def main():
         )
     params.sampling_rate = model_config["feature"]["sampling_rate"]
 
-    logging.info("Start generating...")
-    if params.test_list:
-        os.makedirs(params.res_dir, exist_ok=True)
-        generate_list(
-            res_dir=params.res_dir,
-            test_list=params.test_list,
-            model=model,
-            vocoder=vocoder,
-            tokenizer=tokenizer,
-            feature_extractor=feature_extractor,
-            device=params.device,
-            num_step=params.num_step,
-            guidance_scale=params.guidance_scale,
-            speed=params.speed,
-            t_shift=params.t_shift,
-            target_rms=params.target_rms,
-            feat_scale=params.feat_scale,
-            sampling_rate=params.sampling_rate,
-        )
-    else:
-        generate_sentence(
-            save_path=params.res_wav_path,
-            prompt_text=params.prompt_text,
-            prompt_wav=params.prompt_wav,
-            text=params.text,
-            model=model,
-            vocoder=vocoder,
-            tokenizer=tokenizer,
-            feature_extractor=feature_extractor,
-            device=params.device,
-            num_step=params.num_step,
-            guidance_scale=params.guidance_scale,
-            speed=params.speed,
-            t_shift=params.t_shift,
-            target_rms=params.target_rms,
-            feat_scale=params.feat_scale,
-            sampling_rate=params.sampling_rate,
-        )
+    progress = (
+        RenderProgress(path=params.progress_file) if params.progress_file else None
+    )
+
+    with torch.inference_mode():
+        logging.info("Start generating...")
+        if params.test_list:
+            os.makedirs(params.res_dir, exist_ok=True)
+            generate_list(
+                res_dir=params.res_dir,
+                test_list=params.test_list,
+                model=model,
+                vocoder=vocoder,
+                tokenizer=tokenizer,
+                feature_extractor=feature_extractor,
+                device=params.device,
+                num_step=params.num_step,
+                guidance_scale=params.guidance_scale,
+                speed=params.speed,
+                t_shift=params.t_shift,
+                target_rms=params.target_rms,
+                feat_scale=params.feat_scale,
+                sampling_rate=params.sampling_rate,
+                progress_callback=progress,
+            )
+        else:
+            if progress is not None:
+                progress("start", total=1, num_step=params.num_step)
+            generate_sentence(
+                save_path=params.res_wav_path,
+                prompt_text=params.prompt_text,
+                prompt_wav=params.prompt_wav,
+                text=params.text,
+                model=model,
+                vocoder=vocoder,
+                tokenizer=tokenizer,
+                feature_extractor=feature_extractor,
+                device=params.device,
+                num_step=params.num_step,
+                guidance_scale=params.guidance_scale,
+                speed=params.speed,
+                t_shift=params.t_shift,
+                target_rms=params.target_rms,
+                feat_scale=params.feat_scale,
+                sampling_rate=params.sampling_rate,
+                progress_callback=progress,
+            )
+            if progress is not None:
+                progress("finish")
     logging.info("Done")
 
 
 if __name__ == "__main__":
+    import torch
+
     torch.set_num_threads(1)
     torch.set_num_interop_threads(1)
 
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Usage:
+This script tokenizes the cuts of the given manifests once and writes their
+token ids to a token store, which training scripts memory-map instead of
+running the tokenizer over every cut at each start.
+
+python3 -m zipvoice.bin.prepare_token_store \
+    --manifests data/fbank/emilia_cuts_EN.jsonl.gz \
+        data/fbank/emilia_cuts_EN-dev.jsonl.gz \
+    --tokenizer emilia \
+    --token-file data/tokens_emilia.txt \
+    --output-dir data/token_store_emilia
+
+Then pass `--token-store data/token_store_emilia` to the training script,
+with the same tokenizer and token file. Cuts that are not in the store are
+still tokenized on the fly.
+"""
+
+import argparse
+import itertools
+import logging
+from pathlib import Path
+
+from lhotse import load_manifest_lazy
+
+from zipvoice.bin.infer_zipvoice import get_tokenizer
+from zipvoice.bin.train_zipvoice import tokenize_text
+from zipvoice.dataset.token_store import write_token_store
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument(
+        "--manifests",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Cut manifests to tokenize (e.g. the train and dev cuts).",
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        required=True,
+        help="The token store directory.",
+    )
+
+    parser.add_argument(
+        "--tokenizer",
+        type=str,
+        default="emilia",
+        choices=["emilia", "libritts", "espeak", "simple"],
+        help="Tokenizer type.",
+    )
+
+    parser.add_argument(
+        "--lang",
+        type=str,
+        default="en-us",
+        help="Language identifier, used when tokenizer type is espeak. see"
+        "https://github.com/rhasspy/espeak-ng/blob/master/docs/languages.md",
+    )
+
+    parser.add_argument(
+        "--token-file",
+        type=str,
+        default="data/tokens_emilia.txt",
+        help="The file that contains information that maps tokens to ids,"
+        "which is a text file with '{token}\t{token_id}' per line.",
+    )
+
+    return parser
+
+
+def main():
+    parser = get_parser()
+    args = parser.parse_args()
+
+    tokenizer = get_tokenizer(args.tokenizer, args.token_file, lang=args.lang)
+    cuts = itertools.chain.from_iterable(
+        load_manifest_lazy(manifest) for manifest in args.manifests
+    )
+
+    num_cuts = write_token_store(
+        cuts=cuts,
+        tokenize=lambda cut: tokenize_text(cut, tokenizer).supervisions[0].tokens,
+        store_dir=Path(args.output_dir),
+        vocab_size=tokenizer.vocab_size,
+        tokenizer=args.tokenizer,
+        lang=args.lang,
+        token_file=args.token_file,
+    )
+    logging.info(f"Wrote the token ids of {num_cuts} cuts to {args.output_dir}")
+
+    logging.info("Done!")
+
+
+if __name__ == "__main__":
+    formatter = "%(asctime)s %(levelname)s [%(filename)s:%(lineno)d] %(message)s"
+    logging.basicConfig(format=formatter, level=logging.INFO, force=True)
+
+    main()
@@ -84,6 +84,7 @@ from zipvoice.bin.train_zipvoice import (
     tokenize_text,
 )
 from zipvoice.dataset.datamodule import TtsDataModule
+from zipvoice.dataset.token_store import TokenStore
 from zipvoice.models.zipvoice import ZipVoice
 from zipvoice.models.zipvoice_distill import ZipVoiceDistill
 from zipvoice.tokenizer.tokenizer import (
@@ -359,6 +360,15 @@ def get_parser():
         "which is a text file with '{token}\t{token_id}' per line.",
     )
 
+    parser.add_argument(
+        "--token-store",
+        type=str,
+        default=None,
+        help="A token store built by zipvoice.bin.prepare_token_store. "
+        "Token ids of the cuts found in it are read from the store instead of "
+        "being computed by the tokenizer.",
+    )
+
     return parser
 
 
@@ -1048,15 +1058,36 @@ def run(rank, world_size, args):
         # To avoid OOM issues due to too long dev cuts
         dev_cuts = dev_cuts.filter(_remove_short_and_long_utt)
 
+    token_store = None
+    if params.token_store is not None:
+        token_store = TokenStore(
+            params.token_store,
+            tokenizer=params.tokenizer,
+            lang=params.lang,
+            token_file=params.token_file,
+        )
+        logging.info(f"Loaded token ids of {len(token_store)} cuts")
+        num_missing = sum(1 for c in train_cuts if c.id not in token_store)
+        if num_missing > 0:
+            logging.warning(
+                f"{num_missing} train cuts are not in the token store "
+                f"{params.token_store}, they will be tokenized on-the-fly"
+            )
+
+    def _has_tokens(c: Cut) -> bool:
+        return hasattr(c.supervisions[0], "tokens") or (
+            token_store is not None and c.id in token_store
+        )
+
     if params.tokenizer in ["emilia", "espeak", "dialog"]:
-        if not hasattr(train_cuts[0].supervisions[0], "tokens") or not hasattr(
-            dev_cuts[0].supervisions[0], "tokens"
-        ):
+        if not _has_tokens(train_cuts[0]) or not _has_tokens(dev_cuts[0]):
             logging.warning(
                 f"Using {params.tokenizer} tokenizer but tokens are not prepared,"
                 f"will tokenize on-the-fly, which can slow down training significantly."
             )
-    _tokenize_text = partial(tokenize_text, tokenizer=tokenizer)
+    _tokenize_text = partial(
+        tokenize_text, tokenizer=tokenizer, token_store=token_store
+    )
     train_cuts = train_cuts.map(_tokenize_text)
     dev_cuts = dev_cuts.map(_tokenize_text)
 
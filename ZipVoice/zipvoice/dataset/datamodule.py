@@ -34,6 +34,9 @@ from lhotse.utils import fix_random_seed
 from torch.utils.data import DataLoader
 
 from zipvoice.dataset.dataset import SpeechSynthesisDataset
+from zipvoice.dataset.feature_cache import CachedOnTheFlyFeatures
+from zipvoice.dataset.feature_store import MmapPrecomputedFeatures
+from zipvoice.dataset.sampler import TokenAwareBucketingSampler
 from zipvoice.utils.common import str2bool
 from zipvoice.utils.feature import VocosFbank
 
@@ -106,6 +109,23 @@ class TtsDataModule:
             "(you might want to increase it for larger datasets).",
         )
 
+        group.add_argument(
+            "--max-batch-cost",
+            type=float,
+            default=0,
+            help="When positive, training batches are bucketed on frames and "
+            "tokens and built up to this estimated padded compute (in decoder "
+            "frames, see TokenFrameConstraint) instead of --max-duration. "
+            "Requires --bucketing-sampler.",
+        )
+        group.add_argument(
+            "--token-cost-weight",
+            type=float,
+            default=0.1,
+            help="The cost of one padded text token relative to one decoder "
+            "frame, used with --max-batch-cost.",
+        )
+
         group.add_argument(
             "--on-the-fly-feats",
             type=str2bool,
@@ -114,6 +134,21 @@ class TtsDataModule:
             "extraction. Will drop existing precomputed feature manifests "
             "if available.",
         )
+        group.add_argument(
+            "--feature-cache-dir",
+            type=Path,
+            default=None,
+            help="With --on-the-fly-feats, store the features computed for the "
+            "train and valid cuts in this directory and reuse them in later "
+            "epochs.",
+        )
+        group.add_argument(
+            "--feature-cache-max-gb",
+            type=float,
+            default=0,
+            help="Size limit of --feature-cache-dir in GB; the least recently "
+            "used features are evicted above it. 0 means no limit.",
+        )
         group.add_argument(
             "--shuffle",
             type=str2bool,
@@ -142,6 +177,13 @@ class TtsDataModule:
             help="The number of training dataloader workers that "
             "collect the batches.",
         )
+        group.add_argument(
+            "--persistent-workers",
+            type=str2bool,
+            default=False,
+            help="Keep the training dataloader workers (and the feature "
+            "files they have opened) alive across epochs.",
+        )
 
         group.add_argument(
             "--input-strategy",
@@ -150,6 +192,20 @@ class TtsDataModule:
             help="AudioSamples or PrecomputedFeatures",
         )
 
+    def train_input_strategy(self):
+        """The feature input strategy of the train and valid datasets."""
+        if not self.args.on_the_fly_feats:
+            # Same as PrecomputedFeatures, but slices features written by
+            # compute_fbank --storage-type mmap straight from the mapped file
+            return MmapPrecomputedFeatures()
+        if self.args.feature_cache_dir is not None:
+            return CachedOnTheFlyFeatures(
+                VocosFbank(),
+                cache_dir=self.args.feature_cache_dir,
+                max_size_gb=self.args.feature_cache_max_gb,
+            )
+        return OnTheFlyFeatures(VocosFbank())
+
     def train_dataloaders(
         self,
         cuts_train: CutSet,
@@ -168,13 +224,23 @@ class TtsDataModule:
             return_text=True,
             return_tokens=True,
             return_spk_ids=True,
-            feature_input_strategy=OnTheFlyFeatures(VocosFbank())
-            if self.args.on_the_fly_feats
-            else PrecomputedFeatures(),
+            feature_input_strategy=self.train_input_strategy(),
             return_cuts=self.args.return_cuts,
         )
 
-        if self.args.bucketing_sampler:
+        if self.args.bucketing_sampler and self.args.max_batch_cost > 0:
+            logging.info("Using TokenAwareBucketingSampler.")
+            train_sampler = TokenAwareBucketingSampler(
+                cuts_train,
+                max_cost=self.args.max_batch_cost,
+                token_weight=self.args.token_cost_weight,
+                shuffle=self.args.shuffle,
+                num_buckets=self.args.num_buckets,
+                buffer_size=self.args.num_buckets * 2000,
+                shuffle_buffer_size=self.args.num_buckets * 5000,
+                drop_last=self.args.drop_last,
+            )
+        elif self.args.bucketing_sampler:
             logging.info("Using DynamicBucketingSampler.")
             train_sampler = DynamicBucketingSampler(
                 cuts_train,
@@ -208,7 +274,8 @@ class TtsDataModule:
             sampler=train_sampler,
             batch_size=None,
             num_workers=self.args.num_workers,
-            persistent_workers=False,
+            persistent_workers=self.args.persistent_workers
+            and self.args.num_workers > 0,
             worker_init_fn=worker_init_fn,
         )
 
@@ -220,9 +287,7 @@ class TtsDataModule:
             return_text=True,
             return_tokens=True,
             return_spk_ids=True,
-            feature_input_strategy=OnTheFlyFeatures(VocosFbank())
-            if self.args.on_the_fly_feats
-            else PrecomputedFeatures(),
+            feature_input_strategy=self.train_input_strategy(),
             return_cuts=self.args.return_cuts,
         )
         dev_sampler = DynamicBucketingSampler(
@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+from lhotse import CutSet
+from lhotse.dataset.input_strategies import OnTheFlyFeatures
+from lhotse.features import FeatureExtractor
+from lhotse.utils import LOG_EPSILON
+
+# Rescan the cache size after this many newly stored feature files
+EVICTION_CHECK_INTERVAL = 500
+
+
+class CachedOnTheFlyFeatures(OnTheFlyFeatures):
+    """On-the-fly feature extraction with a feature cache on disk.
+
+    The features of a cut are computed the first time it is seen and stored
+    as an ``.npy`` file named after the hash of its cut id, in one of 256
+    shard directories. Later epochs memory-map the stored file instead of
+    loading and transforming the audio again.
+
+    Files are written atomically, so several DataLoader workers (and several
+    training processes) can share one cache directory. When ``max_size_gb``
+    is set, the least recently used files are evicted once the cache grows
+    above it; a hit refreshes the modification time of its file.
+
+    Args:
+      extractor:
+        The feature extractor, e.g. :class:`zipvoice.utils.feature.VocosFbank`.
+      cache_dir:
+        The cache directory. Use a separate directory per extractor config.
+      max_size_gb:
+        The cache size limit in GB, 0 for no limit.
+      num_workers:
+        Passed to :class:`lhotse.dataset.input_strategies.OnTheFlyFeatures`.
+    """
+
+    def __init__(
+        self,
+        extractor: FeatureExtractor,
+        cache_dir: Union[str, Path],
+        max_size_gb: float = 0,
+        num_workers: int = 0,
+    ):
+        super().__init__(extractor=extractor, num_workers=num_workers)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = int(max_size_gb * 1024**3)
+        self.num_stored = 0
+
+    def _path(self, cut_id: str) -> Path:
+        digest = hashlib.sha1(cut_id.encode("utf-8")).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}.npy"
+
+    def _load(self, path: Path) -> Optional[np.ndarray]:
+        try:
+            features = np.load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return features
+
+    def _store(self, path: Path, features: np.ndarray):
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, features)
+        os.replace(tmp_path, path)
+        self.num_stored += 1
+        if self.max_size > 0 and self.num_stored % EVICTION_CHECK_INTERVAL == 0:
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used files until the cache is 10% below
+        its size limit."""
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".npy"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_size:
+            return
+        target = int(self.max_size * 0.9)
+        num_removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            num_removed += 1
+        logging.info(
+            f"Evicted {num_removed} files from the feature cache {self.cache_dir}"
+        )
+
+    def __call__(self, cuts: CutSet) -> Tuple[torch.Tensor, torch.IntTensor]:
+        cuts = list(cuts)
+        paths = [self._path(cut.id) for cut in cuts]
+        features: List[Optional[np.ndarray]] = [self._load(p) for p in paths]
+
+        missing = [i for i, feats in enumerate(features) if feats is None]
+        if missing:
+            audios = [cuts[i].load_audio() for i in missing]
+            computed = self.extractor.extract_batch(
+                audios, sampling_rate=cuts[missing[0]].sampling_rate
+            )
+            for i, feats in zip(missing, computed):
+                feats = np.asarray(feats, dtype=np.float32)
+                self._store(paths[i], feats)
+                features[i] = feats
+
+        features_lens = torch.tensor(
+            [feats.shape[0] for feats in features], dtype=torch.int32
+        )
+        features = torch.nn.utils.rnn.pad_sequence(
+            [torch.from_numpy(np.array(feats)) for feats in features],
+            batch_first=True,
+            padding_value=LOG_EPSILON,
+        )
+        return features, features_lens
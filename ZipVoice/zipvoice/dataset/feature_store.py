@@ -0,0 +1,188 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple, Union
+
+import numpy as np
+import torch
+from lhotse import CutSet, MonoCut
+from lhotse.dataset.input_strategies import PrecomputedFeatures
+from lhotse.features.io import (
+    FeaturesReader,
+    FeaturesWriter,
+    register_reader,
+    register_writer,
+)
+from lhotse.utils import LOG_EPSILON, Pathlike, compute_num_frames
+
+DATA_FILENAME = "data.bin"
+META_FILENAME = "meta.json"
+
+
+@register_writer
+class MmapFeaturesWriter(FeaturesWriter):
+    """Writes the features of all cuts into one uncompressed array file that
+    can be memory-mapped.
+
+    ``storage_path`` is a directory holding ``data.bin`` (the frames of all
+    cuts, back to back) and ``meta.json`` (dtype and feature dimension). The
+    storage key of a cut is ``"{first_row}:{num_frames}"``, so the cut
+    manifest is the offset index. Use :class:`MmapFp16FeaturesWriter` to
+    halve the size on disk.
+    """
+
+    name = "mmap_features"
+    dtype = np.float32
+
+    def __init__(self, storage_path: Pathlike, mode: str = "w", *args, **kwargs):
+        super().__init__()
+        assert mode in ("w", "a"), mode
+        self.storage_path_ = Path(storage_path)
+        self.storage_path_.mkdir(parents=True, exist_ok=True)
+        self.num_features = None
+        self.num_rows = 0
+        meta_path = self.storage_path_ / META_FILENAME
+        if mode == "a" and meta_path.is_file():
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            assert np.dtype(meta["dtype"]) == np.dtype(self.dtype), meta
+            self.num_features = meta["num_features"]
+            self.num_rows = meta["num_rows"]
+        self.file = open(self.storage_path_ / DATA_FILENAME, mode + "b")
+
+    @property
+    def storage_path(self) -> str:
+        return str(self.storage_path_)
+
+    def write(self, key: str, value: np.ndarray) -> str:
+        value = np.ascontiguousarray(value, dtype=self.dtype)
+        assert value.ndim == 2, value.shape
+        if self.num_features is None:
+            self.num_features = value.shape[1]
+        assert value.shape[1] == self.num_features, (value.shape, self.num_features)
+        self.file.write(value.tobytes())
+        storage_key = f"{self.num_rows}:{value.shape[0]}"
+        self.num_rows += value.shape[0]
+        return storage_key
+
+    def close(self) -> None:
+        self.file.close()
+        with open(self.storage_path_ / META_FILENAME, "w") as f:
+            json.dump(
+                {
+                    "dtype": np.dtype(self.dtype).name,
+                    "num_features": self.num_features,
+                    "num_rows": self.num_rows,
+                },
+                f,
+            )
+
+
+class MmapFp16FeaturesWriter(MmapFeaturesWriter):
+    """:class:`MmapFeaturesWriter` storing float16 frames."""
+
+    dtype = np.float16
+
+
+@lru_cache(maxsize=None)
+def open_feature_store(storage_path: str) -> np.ndarray:
+    """Memory-map a store written by :class:`MmapFeaturesWriter`, as an array
+    of shape (num_rows, num_features). Cached, so each process maps every
+    store once."""
+    storage_path = Path(storage_path)
+    with open(storage_path / META_FILENAME, "r") as f:
+        meta = json.load(f)
+    return np.memmap(
+        storage_path / DATA_FILENAME,
+        dtype=meta["dtype"],
+        mode="r",
+        shape=(meta["num_rows"], meta["num_features"]),
+    )
+
+
+def parse_storage_key(storage_key: str) -> Tuple[int, int]:
+    first_row, num_frames = storage_key.split(":")
+    return int(first_row), int(num_frames)
+
+
+@register_reader
+class MmapFeaturesReader(FeaturesReader):
+    """Reads the features written by :class:`MmapFeaturesWriter`."""
+
+    name = "mmap_features"
+
+    def __init__(self, storage_path: Pathlike, *args, **kwargs):
+        super().__init__()
+        self.array = open_feature_store(str(storage_path))
+
+    def read(
+        self,
+        key: str,
+        left_offset_frames: int = 0,
+        right_offset_frames: Union[int, None] = None,
+    ) -> np.ndarray:
+        first_row, num_frames = parse_storage_key(key)
+        if right_offset_frames is None:
+            right_offset_frames = num_frames
+        rows = self.array[
+            first_row + left_offset_frames : first_row + right_offset_frames
+        ]
+        return np.array(rows, dtype=np.float32)
+
+
+class MmapPrecomputedFeatures(PrecomputedFeatures):
+    """:class:`PrecomputedFeatures` that copies the frames of cuts stored by
+    :class:`MmapFeaturesWriter` straight from the memory-mapped store into the
+    batch tensor, without a per-cut reader or decompression.
+
+    Other cuts (other storage types, mixed or padded cuts) are loaded with
+    ``cut.load_features()``; batches without any mmap-stored cut are
+    collated by :class:`PrecomputedFeatures`.
+    """
+
+    def __call__(self, cuts: CutSet) -> Tuple[torch.Tensor, torch.IntTensor]:
+        cuts = list(cuts)
+        if not any(_is_mmap_stored(cut) for cut in cuts):
+            return super().__call__(CutSet.from_cuts(cuts))
+
+        features_lens = torch.tensor(
+            [cut.num_frames for cut in cuts], dtype=torch.int32
+        )
+        features = torch.full(
+            (len(cuts), int(features_lens.max()), cuts[0].num_features),
+            LOG_EPSILON,
+            dtype=torch.float32,
+        )
+        # Frames are copied (and cast from float16) straight into the batch
+        batch = features.numpy()
+        for i, cut in enumerate(cuts):
+            if _is_mmap_stored(cut):
+                array = open_feature_store(cut.features.storage_path)
+                first_row, num_frames = parse_storage_key(cut.features.storage_key)
+                left = compute_num_frames(
+                    cut.start - cut.features.start, cut.frame_shift, cut.sampling_rate
+                )
+                right = min(left + cut.num_frames, num_frames)
+                feats = array[first_row + left : first_row + right]
+            else:
+                feats = cut.load_features()
+            n = min(feats.shape[0], cut.num_frames)
+            if n == 0:
+                raise ValueError(
+                    f"Cut {cut.id} has no feature frames in "
+                    f"{cut.features.storage_path} (key {cut.features.storage_key}), "
+                    f"expected {cut.num_frames}"
+                )
+            batch[i, :n] = feats[:n]
+            if n < cut.num_frames:
+                # Off-by-one frame counts are padded like MonoCut.load_features()
+                batch[i, n : cut.num_frames] = feats[n - 1]
+        return features, features_lens
+
+
+def _is_mmap_stored(cut) -> bool:
+    return (
+        isinstance(cut, MonoCut)
+        and cut.has_features
+        and cut.features.storage_type == MmapFeaturesReader.name
+    )
@@ -0,0 +1,167 @@
+import math
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from lhotse.cut import Cut
+from lhotse.dataset import DynamicBucketingSampler
+from lhotse.dataset.sampling.base import SamplingConstraint
+
+# 24 kHz audio with a hop length of 256 samples (VocosFbank)
+FRAME_SHIFT = 256 / 24000
+
+
+@dataclass
+class TokenFrameConstraint(SamplingConstraint):
+    """Limits the estimated padded compute of a batch instead of its total
+    duration.
+
+    Every cut in a batch is padded to the longest features and to the longest
+    token sequence, so the cost of a batch is estimated as::
+
+        batch_size * (F + F ** 2 / quadratic_frames + token_weight * N)
+
+    where F is the maximum number of frames and N the maximum number of
+    tokens in the batch. The quadratic term accounts for self-attention in
+    the decoder; the cost is expressed in decoder frames.
+
+    The per-cut cost (the same formula with a batch size of one) is also the
+    length used to assign cuts to buckets, so a bucket groups cuts with
+    similar frame and token counts.
+
+    Args:
+      max_cost:
+        The maximum cost of a batch, in decoder frames.
+      token_weight:
+        The cost of one padded token relative to one decoder frame.
+      quadratic_frames:
+        The number of frames at which the attention cost of a frame equals
+        its linear cost. None to ignore the attention cost.
+      max_cuts:
+        Optional limit on the number of cuts in a batch.
+    """
+
+    max_cost: float
+    token_weight: float = 0.1
+    quadratic_frames: Optional[float] = 4000
+    max_cuts: Optional[int] = None
+    num_cuts: int = 0
+    longest_frames: int = 0
+    longest_tokens: int = 0
+
+    def __post_init__(self) -> None:
+        assert self.max_cost > 0, self.max_cost
+        assert self.quadratic_frames is None or self.quadratic_frames > 0
+
+    @staticmethod
+    def num_frames(cut: Cut) -> int:
+        return cut.num_frames or math.ceil(cut.duration / FRAME_SHIFT)
+
+    @staticmethod
+    def num_tokens(cut: Cut) -> int:
+        supervision = cut.supervisions[0]
+        tokens = getattr(supervision, "tokens", None)
+        return len(tokens) if tokens is not None else len(supervision.text)
+
+    def cost(self, num_cuts: int, num_frames: int, num_tokens: int) -> float:
+        frames_cost = num_frames
+        if self.quadratic_frames is not None:
+            frames_cost += num_frames**2 / self.quadratic_frames
+        return num_cuts * (frames_cost + self.token_weight * num_tokens)
+
+    def add(self, example: Cut) -> None:
+        self.num_cuts += 1
+        self.longest_frames = max(self.longest_frames, self.num_frames(example))
+        self.longest_tokens = max(self.longest_tokens, self.num_tokens(example))
+
+    def exceeded(self) -> bool:
+        if self.max_cuts is not None and self.num_cuts > self.max_cuts:
+            return True
+        cost = self.cost(self.num_cuts, self.longest_frames, self.longest_tokens)
+        return cost > self.max_cost
+
+    def close_to_exceeding(self) -> bool:
+        if self.max_cuts is not None and self.num_cuts >= self.max_cuts:
+            return True
+        cost = self.cost(self.num_cuts + 1, self.longest_frames, self.longest_tokens)
+        return cost > self.max_cost
+
+    def reset(self) -> None:
+        self.num_cuts = 0
+        self.longest_frames = 0
+        self.longest_tokens = 0
+
+    def measure_length(self, example: Cut) -> float:
+        return self.cost(1, self.num_frames(example), self.num_tokens(example))
+
+    def state_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def load_state_dict(self, state_dict: Dict[str, Any]) -> None:
+        for key, value in state_dict.items():
+            setattr(self, key, value)
+
+    def __add__(self, other: "TokenFrameConstraint") -> "TokenFrameConstraint":
+        for key in ("max_cost", "token_weight", "quadratic_frames", "max_cuts"):
+            assert getattr(self, key) == getattr(other, key), key
+        return TokenFrameConstraint(
+            max_cost=self.max_cost,
+            token_weight=self.token_weight,
+            quadratic_frames=self.quadratic_frames,
+            max_cuts=self.max_cuts,
+            num_cuts=self.num_cuts + other.num_cuts,
+            longest_frames=max(self.longest_frames, other.longest_frames),
+            longest_tokens=max(self.longest_tokens, other.longest_tokens),
+        )
+
+
+class TokenAwareBucketingSampler(DynamicBucketingSampler):
+    """A :class:`lhotse.dataset.DynamicBucketingSampler` that builds batches
+    to a compute budget with :class:`TokenFrameConstraint`.
+
+    Unlike the base class with a custom constraint, its state can be saved
+    in checkpoints and restored.
+
+    Args:
+      cuts:
+        The training cuts; their supervisions should already carry token ids.
+      max_cost:
+        See :class:`TokenFrameConstraint`.
+      token_weight:
+        See :class:`TokenFrameConstraint`.
+      quadratic_frames:
+        See :class:`TokenFrameConstraint`.
+      kwargs:
+        Passed to :class:`lhotse.dataset.DynamicBucketingSampler`
+        (``max_duration`` must not be given).
+    """
+
+    def __init__(
+        self,
+        cuts,
+        max_cost: float,
+        token_weight: float = 0.1,
+        quadratic_frames: Optional[float] = 4000,
+        **kwargs,
+    ):
+        constraint = TokenFrameConstraint(
+            max_cost=max_cost,
+            token_weight=token_weight,
+            quadratic_frames=quadratic_frames,
+            max_cuts=kwargs.pop("max_cuts", None),
+        )
+        super().__init__(cuts, constraint=constraint, **kwargs)
+
+    def state_dict(self) -> Dict[str, Any]:
+        # The base class refuses to save custom constraints, so save it here
+        constraint, self.constraint = self.constraint, None
+        try:
+            state_dict = super().state_dict()
+        finally:
+            self.constraint = constraint
+        state_dict["constraint"] = constraint.state_dict()
+        return state_dict
+
+    def load_state_dict(self, state_dict: Dict[str, Any]) -> None:
+        state_dict = dict(state_dict)
+        self.constraint.load_state_dict(state_dict.pop("constraint"))
+        super().load_state_dict(state_dict)
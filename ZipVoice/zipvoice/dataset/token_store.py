@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+from lhotse.cut import Cut
+
+TOKENS_FILENAME = "tokens.bin"
+OFFSETS_FILENAME = "offsets.npy"
+CUT_IDS_FILENAME = "cut_ids.txt"
+META_FILENAME = "meta.json"
+
+
+def token_file_hash(token_file: Union[str, Path]) -> str:
+    """The sha256 hex digest of a token file."""
+    with open(token_file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def write_token_store(
+    cuts: Iterable[Cut],
+    tokenize: Callable[[Cut], List[int]],
+    store_dir: Union[str, Path],
+    vocab_size: int,
+    tokenizer: str,
+    lang: str,
+    token_file: Union[str, Path],
+) -> int:
+    """Tokenize cuts once and write their token ids to a token store.
+
+    The store is a directory with ``tokens.bin`` (the token ids of all cuts,
+    back to back, as int16 or int32 depending on ``vocab_size``),
+    ``offsets.npy`` (where the ids of the i-th cut start, plus the total),
+    ``cut_ids.txt`` (the i-th cut id per line) and ``meta.json``, which also
+    records the tokenizer the ids were computed with. Cuts are streamed, so
+    the whole store never has to fit in memory.
+
+    Args:
+      cuts:
+        The cuts to tokenize; duplicated cut ids are stored once.
+      tokenize:
+        Returns the token ids of a cut.
+      store_dir:
+        The output directory.
+      vocab_size:
+        The number of tokens of the tokenizer.
+      tokenizer:
+        The tokenizer type, e.g. "emilia" or "espeak".
+      lang:
+        The tokenizer language, only used by the espeak tokenizer.
+      token_file:
+        The token file of the tokenizer, its hash is recorded.
+    Returns:
+      The number of cuts in the store.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    dtype = np.int16 if vocab_size <= np.iinfo(np.int16).max else np.int32
+
+    seen = set()
+    offsets = [0]
+    with open(store_dir / TOKENS_FILENAME, "wb") as tokens_f, open(
+        store_dir / CUT_IDS_FILENAME, "w", encoding="utf-8"
+    ) as ids_f:
+        for cut in cuts:
+            if cut.id in seen:
+                continue
+            seen.add(cut.id)
+            token_ids = np.asarray(tokenize(cut), dtype=dtype)
+            tokens_f.write(token_ids.tobytes())
+            ids_f.write(f"{cut.id}\n")
+            offsets.append(offsets[-1] + len(token_ids))
+            if len(offsets) % 100000 == 0:
+                logging.info(f"Tokenized {len(offsets) - 1} cuts")
+
+    np.save(store_dir / OFFSETS_FILENAME, np.asarray(offsets, dtype=np.int64))
+    with open(store_dir / META_FILENAME, "w") as f:
+        json.dump(
+            {
+                "dtype": np.dtype(dtype).name,
+                "num_cuts": len(offsets) - 1,
+                "num_tokens": offsets[-1],
+                "tokenizer": tokenizer,
+                "lang": lang,
+                "token_file_sha256": token_file_hash(token_file),
+            },
+            f,
+        )
+    return len(offsets) - 1
+
+
+class TokenStore:
+    """Read-only access to a store written by :func:`write_token_store`.
+
+    The token ids are memory-mapped, so opening a store costs reading the
+    cut ids and offsets only. Pickling a store (e.g. for DataLoader workers)
+    only sends its path.
+
+    Args:
+      store_dir:
+        The store directory.
+      tokenizer:
+        If given, the tokenizer type the store must have been written with.
+      lang:
+        If given, the language the store must have been written with;
+        only checked for the espeak tokenizer.
+      token_file:
+        If given, the token file the store must have been written with.
+    """
+
+    def __init__(
+        self,
+        store_dir: Union[str, Path],
+        tokenizer: Optional[str] = None,
+        lang: Optional[str] = None,
+        token_file: Optional[Union[str, Path]] = None,
+    ):
+        self.store_dir = Path(store_dir)
+        with open(self.store_dir / META_FILENAME, "r") as f:
+            meta = json.load(f)
+        self._check_tokenizer(meta, tokenizer, lang, token_file)
+        self.offsets = np.load(self.store_dir / OFFSETS_FILENAME)
+        if meta["num_tokens"] > 0:
+            self.tokens = np.memmap(
+                self.store_dir / TOKENS_FILENAME,
+                dtype=meta["dtype"],
+                mode="r",
+                shape=(meta["num_tokens"],),
+            )
+        else:
+            # An empty file cannot be memory-mapped
+            self.tokens = np.zeros(0, dtype=meta["dtype"])
+        with open(self.store_dir / CUT_IDS_FILENAME, "r", encoding="utf-8") as f:
+            self.index: Dict[str, int] = {
+                line.rstrip("\n"): i for i, line in enumerate(f)
+            }
+        assert len(self.index) == meta["num_cuts"], (len(self.index), meta)
+
+    def _check_tokenizer(
+        self,
+        meta: dict,
+        tokenizer: Optional[str],
+        lang: Optional[str],
+        token_file: Optional[Union[str, Path]],
+    ):
+        expected = {}
+        if tokenizer is not None:
+            expected["tokenizer"] = tokenizer
+        if lang is not None and (tokenizer or meta.get("tokenizer")) == "espeak":
+            expected["lang"] = lang
+        if token_file is not None:
+            expected["token_file_sha256"] = token_file_hash(token_file)
+        for key, value in expected.items():
+            if key not in meta:
+                raise ValueError(
+                    f"Token store {self.store_dir} does not record its {key}, "
+                    f"rebuild it with zipvoice.bin.prepare_token_store"
+                )
+            if meta[key] != value:
+                raise ValueError(
+                    f"Token store {self.store_dir} was written with {key} "
+                    f"{meta[key]!r}, but {value!r} is used"
+                )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, cut_id: str) -> bool:
+        return cut_id in self.index
+
+    def __getitem__(self, cut_id: str) -> List[int]:
+        i = self.index[cut_id]
+        return self.tokens[self.offsets[i] : self.offsets[i + 1]].tolist()
+
+    def __getstate__(self):
+        return {"store_dir": self.store_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state["store_dir"])
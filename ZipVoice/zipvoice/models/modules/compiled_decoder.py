@@ -0,0 +1,181 @@
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+import torch
+import torch.nn as nn
+from torch import Tensor
+
+from zipvoice.utils.scaling_converter import convert_scaled_to_non_scaled
+
+BACKENDS = ("trace", "compile")
+
+
+class CompiledFmDecoder(nn.Module):
+    """A drop-in replacement for ``model.fm_decoder`` that runs a compiled graph.
+
+    The sequence length is padded up to a multiple of ``bucket_size`` (the padded
+    frames are masked, as in batched inference), so only one graph per
+    (batch size, bucket) is needed instead of one per input length:
+
+      - "trace": ``torch.jit.trace`` per bucket, after the inference conversion
+        of the scaled modules. On CPU the traced graph is frozen and passed to
+        ``torch.jit.optimize_for_inference`` (oneDNN fusions).
+      - "compile": ``torch.compile`` with static shapes; every bucket is one
+        recompilation.
+
+    Any failure to build or run a compiled graph falls back to the eager
+    decoder, so enabling this never breaks inference.
+
+    Args:
+      fm_decoder:
+        The eager TTSZipformer decoder.
+      backend:
+        "trace" or "compile".
+      bucket_size:
+        Sequence lengths are padded to a multiple of this (in frames). It must be
+        a multiple of the largest downsampling factor of the decoder.
+      freeze:
+        Freeze traced graphs on CPU. Freezing copies the weights into the graph,
+        so disable it when the weights are shared between processes.
+    """
+
+    def __init__(
+        self,
+        fm_decoder: nn.Module,
+        backend: str = "trace",
+        bucket_size: int = 128,
+        freeze: bool = True,
+    ):
+        super().__init__()
+        assert backend in BACKENDS, backend
+        assert bucket_size % max(fm_decoder.downsampling_factor) == 0, bucket_size
+        convert_scaled_to_non_scaled(fm_decoder, inplace=True)
+        self.eager = fm_decoder
+        self.backend = backend
+        self.bucket_size = bucket_size
+        self.freeze = freeze
+        self.in_dim = fm_decoder.in_proj.in_features
+        self.use_guidance_scale_embed = fm_decoder.use_guidance_scale_embed
+        self.downsampling_factor = fm_decoder.downsampling_factor
+        self.failed = False
+        # (batch_size, padded_len, device) -> traced graph
+        self.traced: Dict[Tuple[int, int, str], torch.jit.ScriptModule] = {}
+        self.compiled = None
+        if backend == "compile":
+            import torch._dynamo
+
+            # One recompilation per bucket is expected, do not give up after 8
+            torch._dynamo.config.cache_size_limit = max(
+                torch._dynamo.config.cache_size_limit, 64
+            )
+            self.compiled = torch.compile(fm_decoder, dynamic=False)
+
+    def padded_len(self, seq_len: int) -> int:
+        return (seq_len + self.bucket_size - 1) // self.bucket_size * self.bucket_size
+
+    def _get_traced(self, inputs: Tuple[Tensor, ...]) -> torch.jit.ScriptModule:
+        x = inputs[0]
+        key = (x.size(0), x.size(1), str(x.device))
+        if key not in self.traced:
+            logging.info(f"Tracing fm_decoder for batch {key[0]}, length {key[1]}")
+            # Tracing and freezing do not work on inference-mode tensors
+            with torch.inference_mode(False), torch.no_grad():
+                inputs = tuple(i.clone() for i in inputs)
+                traced = torch.jit.trace(self.eager, inputs, check_trace=False)
+                if self.freeze and x.device.type == "cpu":
+                    traced = torch.jit.optimize_for_inference(
+                        torch.jit.freeze(traced.eval())
+                    )
+            self.traced[key] = traced
+        return self.traced[key]
+
+    def forward(
+        self,
+        x: Tensor,
+        t: Optional[Tensor] = None,
+        padding_mask: Optional[Tensor] = None,
+        guidance_scale: Optional[Tensor] = None,
+    ) -> Tensor:
+        if self.failed or self.training or t is None:
+            return self.eager(
+                x=x, t=t, padding_mask=padding_mask, guidance_scale=guidance_scale
+            )
+
+        batch_size, seq_len, _ = x.shape
+        pad = self.padded_len(seq_len) - seq_len
+        if padding_mask is None:
+            padding_mask = torch.zeros(
+                batch_size, seq_len, dtype=torch.bool, device=x.device
+            )
+        if pad > 0:
+            x = nn.functional.pad(x, (0, 0, 0, pad))
+            padding_mask = nn.functional.pad(padding_mask, (0, pad), value=True)
+        if t.dim() == 2:
+            t = nn.functional.pad(t, (0, pad))
+
+        inputs = (x, t, padding_mask)
+        if guidance_scale is not None:
+            inputs = inputs + (guidance_scale,)
+        try:
+            if self.backend == "trace":
+                vt = self._get_traced(inputs)(*inputs)
+            else:
+                vt = self.compiled(*inputs)
+        except Exception as ex:
+            logging.warning(
+                f"Compiled fm_decoder ({self.backend}) failed, "
+                f"falling back to eager: {ex}"
+            )
+            self.failed = True
+            self.traced.clear()
+            vt = self.eager(*inputs)
+        return vt[:, :seq_len]
+
+    @torch.no_grad()
+    def warmup(
+        self,
+        seq_lens: Sequence[int],
+        batch_size: int = 1,
+        device: Optional[torch.device] = None,
+    ) -> bool:
+        """Build (and run once) the graphs for the buckets of the given lengths.
+
+        Args:
+          seq_lens:
+            Total (prompt + generated) lengths in frames expected at inference.
+          batch_size:
+            The decoder batch size, i.e. twice the number of sentences when
+            classifier-free guidance is used.
+          device:
+            Device of the dummy inputs; defaults to the decoder's device.
+        Returns:
+          False if compilation failed and the eager decoder will be used.
+        """
+        if device is None:
+            device = next(self.eager.parameters()).device
+        for seq_len in sorted({self.padded_len(n) for n in seq_lens}):
+            x = torch.randn(batch_size, seq_len, self.in_dim, device=device)
+            t = torch.full((batch_size,), 0.5, device=device)
+            guidance_scale = (
+                torch.full((batch_size,), 1.0, device=device)
+                if self.use_guidance_scale_embed
+                else None
+            )
+            self(x=x, t=t, guidance_scale=guidance_scale)
+            if self.failed:
+                return False
+        return True
+
+
+def compile_fm_decoder(
+    model: nn.Module,
+    backend: str = "trace",
+    bucket_size: int = 128,
+    freeze: bool = True,
+) -> CompiledFmDecoder:
+    """Replace ``model.fm_decoder`` with a :class:`CompiledFmDecoder` in place."""
+    if not isinstance(model.fm_decoder, CompiledFmDecoder):
+        model.fm_decoder = CompiledFmDecoder(
+            model.fm_decoder, backend=backend, bucket_size=bucket_size, freeze=freeze
+        )
+    return model.fm_decoder
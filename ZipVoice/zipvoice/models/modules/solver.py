@@ -15,7 +15,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Optional, Union
+from typing import Callable, Optional, Union
 
 import torch
 
@@ -190,6 +190,7 @@ class EulerSolver:
         t_start: float = 0.0,
         t_end: float = 1.0,
         t_shift: float = 1.0,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
         **kwargs
     ) -> torch.Tensor:
         """
@@ -211,6 +212,8 @@ class EulerSolver:
             t_shift: shift the t toward smaller numbers so that the sampling
                 will emphasize low SNR region. Should be in the range of (0, 1].
                 The shifting will be more significant when the number is smaller.
+            progress_callback: if given, called as `progress_callback(step, num_step)`
+                after each ODE step, with `step` counting from 1.
 
         Returns:
             The approximated solution at time `t_end`.
@@ -237,6 +240,8 @@ class EulerSolver:
                 **kwargs
             )
             x = x + v * (timesteps[step + 1] - timesteps[step])
+            if progress_callback is not None:
+                progress_callback(step + 1, num_step)
         return x
 
 
@@ -1,8 +1,6 @@
 import re
 from abc import ABC, abstractmethod
-
-import cn2an
-import inflect
+from typing import Dict, List
 
 
 class TextNormalizer(ABC):
@@ -21,6 +19,8 @@ class EnglishTextNormalizer(TextNormalizer):
     """
 
     def __init__(self):
+        import inflect
+
         # List of (regular expression, replacement) pairs for abbreviations:
         self._abbreviations = [
             (re.compile("\\b%s\\b" % x[0], re.IGNORECASE), x[1])
@@ -165,6 +165,341 @@ class ChineseTextNormalizer(TextNormalizer):
 
     def normalize(self, text: str) -> str:
         """Normalize text."""
+        import cn2an
+
         # Convert numbers to Chinese
         text = cn2an.transform(text, "an2cn")
         return text
+
+
+VI_DIGITS = ["không", "một", "hai", "ba", "bốn", "năm", "sáu", "bảy", "tám", "chín"]
+
+
+class VietnameseTextNormalizer(TextNormalizer):
+    """
+    A class to normalize Vietnamese text for TTS in a single left-to-right scan.
+
+    One precompiled alternation matches everything that needs rewriting, so the
+    text is scanned once regardless of how many rules there are:
+      - bracketed annotations and emojis are removed,
+      - whitespace is collapsed and punctuation is followed by exactly one space,
+      - numbers (Vietnamese "1.000.000,5" grouping), dates, times, currencies,
+        units and common abbreviations are expanded into words.
+    Diacritics are preserved and normalizing twice gives the same result.
+    """
+
+    ABBREVIATIONS = {
+        "TP.HCM": "thành phố Hồ Chí Minh",
+        "TPHCM": "thành phố Hồ Chí Minh",
+        "TP.": "thành phố",
+        "TP": "thành phố",
+        "HCM": "Hồ Chí Minh",
+        "HN": "Hà Nội",
+        "VN": "Việt Nam",
+        "UBND": "ủy ban nhân dân",
+        "HĐND": "hội đồng nhân dân",
+        "THPT": "trung học phổ thông",
+        "THCS": "trung học cơ sở",
+        "ĐH": "đại học",
+        "GS.": "giáo sư",
+        "PGS.": "phó giáo sư",
+        "TS.": "tiến sĩ",
+        "ThS.": "thạc sĩ",
+        "BS.": "bác sĩ",
+        "CSGT": "cảnh sát giao thông",
+        "SĐT": "số điện thoại",
+        "v.v.": "vân vân",
+        "v.v": "vân vân",
+        "ko": "không",
+    }
+
+    # Read after a number, e.g. "50%", "20.000đ", "5 km"
+    UNITS = {
+        "%": "phần trăm",
+        "đ": "đồng",
+        "₫": "đồng",
+        "VNĐ": "đồng",
+        "VND": "đồng",
+        "vnđ": "đồng",
+        "USD": "đô la",
+        "$": "đô la",
+        "€": "ơ rô",
+        "EUR": "ơ rô",
+        "km/h": "ki lô mét trên giờ",
+        "km": "ki lô mét",
+        "m2": "mét vuông",
+        "m²": "mét vuông",
+        "cm": "xen ti mét",
+        "mm": "mi li mét",
+        "m": "mét",
+        "kg": "ki lô gam",
+        "g": "gam",
+        "ha": "héc ta",
+        "h": "giờ",
+        "tr": "triệu",
+        "k": "nghìn",
+    }
+
+    # Read before a number, e.g. "$5"
+    CURRENCY_PREFIXES = {"$": "đô la", "€": "ơ rô"}
+
+    PUNCTUATION = ".!?…,;:"
+
+    # A minus sign right before a number, e.g. "-5"
+    MINUS_SIGNS = "-−"
+
+    def __init__(self):
+        # Numbers repeat a lot in real text (years, prices), cache their reading
+        self._number_cache: Dict[str, str] = {}
+        number = r"\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?"
+
+        def alternation(words):
+            return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+        emoji = (
+            "\U0001F600-\U0001F64F"  # emoticons
+            "\U0001F300-\U0001F5FF"  # symbols & pictographs
+            "\U0001F680-\U0001F6FF"  # transport & map symbols
+            "\U0001F1E0-\U0001F1FF"  # flags
+            "\u2190-\u2193\u27A1\u2B05-\u2B07"  # arrows
+            "\u25B2\u25B6\u25BC\u25C0\uFE0F"  # triangles, emoji selector
+        )
+        # Characters a match can start with; checked first so that the
+        # alternatives are only tried where one of them can match. Single
+        # spaces are frequent and never start a match on their own.
+        first_chars = "".join(
+            sorted(
+                {w[0] for w in self.ABBREVIATIONS}
+                | set(self.CURRENCY_PREFIXES)
+                | set(self.PUNCTUATION)
+                | set(self.MINUS_SIGNS)
+            )
+        )
+        first = f"[\\d(\\[（{emoji}{re.escape(first_chars)}]|[^\\S ]|  "
+
+        # Named alternatives, tried in this order. Each one is wrapped in an
+        # outer group so that `lastgroup` names it. Single spaces are left in
+        # the plain text between matches and handled by `emit`.
+        # The word right before a match, e.g. "Ngày" in "Ngày 2/9/1945"
+        self._previous_word_re = re.compile(r"(\w+)\s*$")
+        self._token_re = re.compile(
+            f"(?={first})(?:"
+            + "|".join(
+                [
+                    r"(?P<annotation>[(\[（][^)\]）]*[)\]）])",
+                    f"(?P<emoji>[{emoji}]+)",
+                    r"(?P<date>(?<!\w)(?P<date_d>\d{1,2})/(?P<date_m>\d{1,2})"
+                    r"/(?P<date_y>\d{4})(?!\d))",
+                    r"(?P<month>(?<!\w)(?P<month_m>\d{1,2})/(?P<month_y>\d{4})(?!\d))",
+                    r"(?P<day>(?<!\w)(?P<day_d>\d{1,2})/(?P<day_m>\d{1,2})(?![\d/]))",
+                    # "1m75", but not the area unit in "50m2"
+                    r"(?P<height>(?<!\w)(?P<height_m>\d)m(?!2(?!\d))"
+                    r"(?P<height_cm>\d{1,2})(?!\w))",
+                    r"(?P<time>(?<!\w)(?P<time_h>\d{1,2})(?::|h)"
+                    r"(?P<time_m>\d{2})(?!\d))",
+                    f"(?P<prefix>(?P<prefix_cur>{alternation(self.CURRENCY_PREFIXES)})"
+                    f"(?P<prefix_num>{number}))",
+                    f"(?P<number>(?:(?<!\\w)(?P<number_sign>[{self.MINUS_SIGNS}]))?"
+                    f"(?<!\\w)(?P<number_value>{number})(?!\\.?\\d)"
+                    f"(?:\\s?(?P<number_unit>{alternation(self.UNITS)})(?!\\w))?)",
+                    # "3.1.2": section, version and other dotted numbers
+                    r"(?P<section>(?<![\w.])\d+(?:\.\d+){2,})",
+                    f"(?P<abbreviation>(?<!\\w)(?:{alternation(self.ABBREVIATIONS)})"
+                    "(?!\\w))",
+                    f"(?P<punctuation>[{re.escape(self.PUNCTUATION)}]+)",
+                    r"(?P<space>\s{2,}|[^\S ])",
+                ]
+            )
+            + ")"
+        )
+
+    def normalize(self, text: str) -> str:
+        """Normalize text in one pass over the input."""
+        out: List[str] = []
+        pending_space = False  # A space is owed before the next word
+        pos = 0
+        for m in self._token_re.finditer(text):
+            start = m.start()
+            if start > pos:
+                # Plain text; it may start or end with a single space
+                chunk = text[pos:start]
+                if chunk[0] == " ":
+                    pending_space = True
+                word = chunk.strip(" ")
+                if word:
+                    if pending_space and out:
+                        out.append(" ")
+                    out.append(word)
+                    pending_space = False
+                if chunk[-1] == " ":
+                    pending_space = True
+            pos = m.end()
+
+            kind = m.lastgroup
+            if kind == "space":
+                pending_space = True
+            elif kind == "punctuation":
+                # No space before punctuation (a pending one is dropped),
+                # one after it
+                out.append(m.group(kind))
+                pending_space = True
+            elif kind != "annotation" and kind != "emoji":
+                if pending_space and out:
+                    out.append(" ")
+                out.append(self._expand(kind, m))
+                pending_space = True
+
+        tail = text[pos:]
+        if tail[:1] == " ":
+            pending_space = True
+        tail = tail.strip(" ")
+        if tail:
+            if pending_space and out:
+                out.append(" ")
+            out.append(tail)
+        return "".join(out)
+
+    def _expand(self, kind: str, m: re.Match) -> str:
+        if kind == "number":
+            words = self.number_string_to_words(m.group("number_value"))
+            if m.group("number_sign"):
+                words = f"âm {words}"
+            unit = m.group("number_unit")
+            return f"{words} {self.UNITS[unit]}" if unit else words
+        if kind == "prefix":
+            words = self.number_string_to_words(m.group("prefix_num"))
+            return f"{words} {self.CURRENCY_PREFIXES[m.group('prefix_cur')]}"
+        if kind == "section":
+            parts = m.group(kind).split(".")
+            return " chấm ".join(self.number_string_to_words(p) for p in parts)
+        if kind == "abbreviation":
+            return self.ABBREVIATIONS[m.group(kind)]
+        if kind == "date":
+            d, mo = int(m.group("date_d")), int(m.group("date_m"))
+            year = self.number_to_words(int(m.group("date_y")))
+            if 1 <= d <= 31 and 1 <= mo <= 12:
+                words = self.day_month_to_words(d, mo, self._previous_word(m))
+                return f"{words} năm {year}"
+            return f"{self.number_to_words(d)} {self.number_to_words(mo)} {year}"
+        if kind == "month":
+            mo = int(m.group("month_m"))
+            year = self.number_to_words(int(m.group("month_y")))
+            if 1 <= mo <= 12:
+                words = f"{self.month_to_words(mo)} năm {year}"
+                # "Tháng 4/2023" already says "tháng"
+                return words if self._previous_word(m) == "tháng" else f"tháng {words}"
+            return f"{self.number_to_words(mo)} trên {year}"
+        if kind == "day":
+            d, mo = int(m.group("day_d")), int(m.group("day_m"))
+            if 1 <= d <= 31 and 1 <= mo <= 12:
+                return self.day_month_to_words(d, mo, self._previous_word(m))
+            return f"{self.number_to_words(d)} phần {self.number_to_words(mo)}"
+        if kind == "height":
+            # "1m75" is one meter seventy-five (centimeters)
+            meters = self.number_to_words(int(m.group("height_m")))
+            return f"{meters} mét {self.number_to_words(int(m.group('height_cm')))}"
+        assert kind == "time", kind
+        h, mi = int(m.group("time_h")), int(m.group("time_m"))
+        if h < 24 and mi < 60:
+            words = f"{self.number_to_words(h)} giờ"
+            return f"{words} {self.number_to_words(mi)} phút" if mi else words
+        return f"{self.number_to_words(h)} {self.number_to_words(mi)}"
+
+    def month_to_words(self, month: int) -> str:
+        # The fourth month is "tháng tư", never "tháng bốn"
+        return "tư" if month == 4 else self.number_to_words(month)
+
+    def day_month_to_words(self, day: int, month: int, previous_word: str = "") -> str:
+        words = f"{self.number_to_words(day)} tháng {self.month_to_words(month)}"
+        # "Ngày 2/9" already says "ngày"
+        return words if previous_word == "ngày" else f"ngày {words}"
+
+    def _previous_word(self, m: re.Match) -> str:
+        """The lowercased word before a match, within a few characters."""
+        start = m.start()
+        previous = self._previous_word_re.search(m.string, max(0, start - 16), start)
+        return previous.group(1).lower() if previous else ""
+
+    def digits_to_words(self, digits: str) -> str:
+        return " ".join(VI_DIGITS[int(c)] for c in digits)
+
+    def number_string_to_words(self, s: str) -> str:
+        """Read "1.234.567,89" (or "3.14") as words."""
+        words = self._number_cache.get(s)
+        if words is None:
+            words = self._number_string_to_words(s)
+            if len(self._number_cache) < 65536:
+                self._number_cache[s] = words
+        return words
+
+    def _number_string_to_words(self, s: str) -> str:
+        integer, _, fraction = s.partition(",")
+        if "." in integer:
+            parts = integer.split(".")
+            if all(len(p) == 3 for p in parts[1:]):
+                integer = "".join(parts)  # Thousands separators
+            else:
+                integer, fraction = parts[0], parts[1]  # Decimal point
+        # Phone numbers, codes and very long numbers are read digit by digit
+        if (len(integer) > 1 and integer[0] == "0") or len(integer) > 15:
+            words = self.digits_to_words(integer)
+        else:
+            words = self.number_to_words(int(integer))
+        if fraction:
+            if fraction[0] == "0" or len(fraction) > 3:
+                words += " phẩy " + self.digits_to_words(fraction)
+            else:
+                words += " phẩy " + self.number_to_words(int(fraction))
+        return words
+
+    def number_to_words(self, n: int) -> str:
+        if n == 0:
+            return "không"
+        if n >= 10**9:
+            high, low = divmod(n, 10**9)
+            words = self.number_to_words(high) + " tỷ"
+            if low:
+                words += " " + self._below_billion(low, full=True)
+            return words
+        return self._below_billion(n, full=False)
+
+    def _below_billion(self, n: int, full: bool) -> str:
+        words = []
+        for group, scale in (
+            (n // 10**6, "triệu"),
+            (n // 1000 % 1000, "nghìn"),
+            (n % 1000, ""),
+        ):
+            if group:
+                # Groups after a higher one keep their zeros:
+                # "một nghìn không trăm linh năm"
+                words += self._read_triple(group, full=full or bool(words))
+                if scale:
+                    words.append(scale)
+        return " ".join(words)
+
+    def _read_triple(self, n: int, full: bool) -> List[str]:
+        hundreds, tens, units = n // 100, n // 10 % 10, n % 10
+        words = []
+        if hundreds or full:
+            words += [VI_DIGITS[hundreds], "trăm"]
+        if tens == 0:
+            if units:
+                if hundreds or full:
+                    words.append("linh")
+                words.append(VI_DIGITS[units])
+        elif tens == 1:
+            words.append("mười")
+            if units == 5:
+                words.append("lăm")
+            elif units:
+                words.append(VI_DIGITS[units])
+        else:
+            words += [VI_DIGITS[tens], "mươi"]
+            if units == 1:
+                words.append("mốt")
+            elif units == 5:
+                words.append("lăm")
+            elif units:
+                words.append(VI_DIGITS[units])
+        return words
@@ -20,14 +20,19 @@ import logging
 import re
 from abc import ABC, abstractmethod
 from functools import reduce
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 
-import jieba
-from lhotse import CutSet
-from pypinyin import Style, lazy_pinyin
-from pypinyin.contrib.tone_convert import to_finals_tone3, to_initials
+from zipvoice.tokenizer.normalizer import (
+    ChineseTextNormalizer,
+    EnglishTextNormalizer,
+    VietnameseTextNormalizer,
+)
 
-from zipvoice.tokenizer.normalizer import ChineseTextNormalizer, EnglishTextNormalizer
+# jieba, pypinyin and lhotse are only needed by some tokenizers and are
+# imported where they are used, so that e.g. the espeak path does not pay
+# for loading the Chinese dictionaries.
+if TYPE_CHECKING:
+    from lhotse import CutSet
 
 try:
     from piper_phonemize import phonemize_espeak
@@ -38,8 +43,6 @@ except Exception as ex:
             https://k2-fsa.github.io/icefall/piper_phonemize.html"
     )
 
-jieba.default_logger.setLevel(logging.INFO)
-
 
 class Tokenizer(ABC):
     """Abstract base class for tokenizers, defining common interface."""
@@ -127,17 +130,29 @@ class SimpleTokenizer(Tokenizer):
 class EspeakTokenizer(Tokenizer):
     """A simple tokenizer with Espeak g2p function."""
 
-    def __init__(self, token_file: Optional[str] = None, lang: str = "en-us"):
+    def __init__(
+        self,
+        token_file: Optional[str] = None,
+        lang: str = "en-us",
+        normalize: bool = False,
+    ):
         """
         Args:
           tokens: the file that contains information that maps tokens to ids,
             which is a text file with '{token}\t{token_id}' per line.
           lang: the language identifier, see
             https://github.com/rhasspy/espeak-ng/blob/master/docs/languages.md
+          normalize: if True and lang is "vi", normalize texts with
+            VietnameseTextNormalizer (the same normalization as the TTS backend)
+            before g2p. Off by default, since it changes the token ids of
+            texts with numbers, dates or abbreviations.
         """
         # Parse token file
         self.has_tokens = False
         self.lang = lang
+        self.normalizer = (
+            VietnameseTextNormalizer() if normalize and lang == "vi" else None
+        )
         if token_file is None:
             logging.debug(
                 "Initialize Tokenizer without tokens file, \
@@ -157,6 +172,8 @@ class EspeakTokenizer(Tokenizer):
 
     def g2p(self, text: str) -> List[str]:
         try:
+            if self.normalizer is not None:
+                text = self.normalizer.normalize(text)
             tokens = phonemize_espeak(text, self.lang)
             tokens = reduce(lambda x, y: x + y, tokens)
             return tokens
@@ -209,6 +226,10 @@ class EmiliaTokenizer(Tokenizer):
             token_type == "phone"
         ), f"Only support phone tokenizer for Emilia, but get {token_type}."
 
+        import jieba
+
+        jieba.default_logger.setLevel(logging.INFO)
+
         self.english_normalizer = EnglishTextNormalizer()
         self.chinese_normalizer = ChineseTextNormalizer()
 
@@ -296,6 +317,9 @@ class EmiliaTokenizer(Tokenizer):
         return token_ids_list
 
     def tokenize_ZH(self, text: str) -> List[str]:
+        import jieba
+        from pypinyin import Style, lazy_pinyin
+
         try:
             text = self.chinese_normalizer.normalize(text)
             segs = list(jieba.cut(text))
@@ -349,6 +373,8 @@ class EmiliaTokenizer(Tokenizer):
         """
         Separate pinyin into initial and final
         """
+        from pypinyin.contrib.tone_convert import to_finals_tone3, to_initials
+
         pinyins = []
         initial = to_initials(text, strict=False)
         # don't want to share tokens with espeak tokens,
@@ -611,7 +637,7 @@ class LibriTTSTokenizer(Tokenizer):
         return token_ids_list
 
 
-def add_tokens(cut_set: CutSet, tokenizer: str, lang: str):
+def add_tokens(cut_set: "CutSet", tokenizer: str, lang: str):
     if tokenizer == "emilia":
         tokenizer = EmiliaTokenizer()
     elif tokenizer == "espeak":
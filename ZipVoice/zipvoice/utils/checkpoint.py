@@ -16,11 +16,13 @@
 # limitations under the License.
 
 import glob
+import json
 import logging
+import mmap
 import os
 import re
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import torch
 import torch.nn as nn
@@ -34,6 +36,21 @@ from zipvoice.utils.common import AttributeDict, GradScaler
 # our class LRScheduler.
 LRSchedulerType = object
 
+# dtype names used in safetensors headers
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+SAFETENSORS_DTYPE_NAMES = {dtype: name for name, dtype in SAFETENSORS_DTYPES.items()}
+
 
 def save_checkpoint(
     filename: Path,
@@ -145,6 +162,112 @@ def load_checkpoint(
     return checkpoint
 
 
+def convert_checkpoint_to_safetensors(
+    filename: Path,
+    out_filename: Path,
+    key: str = "model",
+) -> int:
+    """Extract one set of weights from a training checkpoint into a safetensors file.
+
+    Args:
+      filename:
+        The training checkpoint (.pt) written by :func:`save_checkpoint`.
+      out_filename:
+        The safetensors file to write.
+      key:
+        Which weights to extract: "model", "model_avg" or "model_ema".
+    Returns:
+      The number of tensors written.
+    """
+    import safetensors.torch
+
+    logging.info(f"Loading checkpoint from {filename}")
+    # mmap=True maps the tensor data instead of reading it, so the optimizer state
+    # and the other model copies in the checkpoint are never paged in.
+    checkpoint = torch.load(filename, map_location="cpu", weights_only=False, mmap=True)
+    if key not in checkpoint:
+        raise KeyError(f"{filename} has no '{key}' entry, found {list(checkpoint)}")
+
+    state_dict = {}
+    seen_storages = set()
+    for name, tensor in checkpoint[key].items():
+        if name.startswith("module."):
+            name = name[len("module.") :]
+        # safetensors refuses tensors that share memory, e.g. tied weights
+        storage = tensor.untyped_storage().data_ptr()
+        if storage in seen_storages or not tensor.is_contiguous():
+            tensor = tensor.contiguous().clone()
+        seen_storages.add(storage)
+        state_dict[name] = tensor
+
+    metadata = {"format": "pt", "source": key}
+    # Kept so that converted checkpoints can still be averaged
+    for name in ("batch_idx_train", "average_period"):
+        if name in checkpoint:
+            metadata[name] = str(checkpoint[name])
+
+    logging.info(f"Saving {len(state_dict)} tensors to {out_filename}")
+    safetensors.torch.save_file(state_dict, str(out_filename), metadata=metadata)
+    return len(state_dict)
+
+
+def read_safetensors_metadata(filename: Path) -> Dict[str, str]:
+    """Return the ``__metadata__`` entry of a safetensors header."""
+    with open(filename, "rb") as f:
+        header_size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_size))
+    return header.get("__metadata__", {})
+
+
+def load_safetensors(
+    filename: Path,
+    model: Optional[nn.Module] = None,
+    strict: bool = True,
+) -> Dict[str, torch.Tensor]:
+    """Load a safetensors file as memory-mapped, zero-copy tensors.
+
+    The file is mapped copy-on-write, so the tensors are views of the page cache:
+    nothing is read until a tensor is first touched and the pages are shared with
+    every other process that maps the same file. If ``model`` is given, the tensors
+    are assigned to it directly instead of being copied into its parameters, so the
+    model can be built on the meta device beforehand.
+
+    Args:
+      filename:
+        The safetensors file.
+      model:
+        If not None, the module to load the weights into.
+      strict:
+        Passed to ``model.load_state_dict``.
+    Returns:
+      The state dict read from the file.
+    """
+    with open(filename, "rb") as f:
+        header_size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_size))
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    header.pop("__metadata__", None)
+    data_start = 8 + header_size
+
+    state_dict = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        numel = (end - begin) // torch.empty((), dtype=dtype).element_size()
+        if numel == 0:
+            tensor = torch.empty(info["shape"], dtype=dtype)
+        else:
+            tensor = torch.frombuffer(
+                buffer, dtype=dtype, count=numel, offset=data_start + begin
+            ).view(info["shape"])
+        state_dict[name] = tensor
+
+    if model is not None:
+        logging.info(f"Loading memory-mapped weights from {filename}")
+        model.load_state_dict(state_dict, strict=strict, assign=True)
+    return state_dict
+
+
 def load_checkpoint_extend_vocab_size(
     filename: Path, extend_size: int, model: nn.Module, strict: bool = True
 ) -> Dict[str, Any]:
@@ -361,6 +484,108 @@ def average_checkpoints_with_averaged_model(
     return avg
 
 
+def _open_averaged_model(filename: Path) -> Tuple[Dict[str, torch.Tensor], int, int]:
+    """Memory-map the averaged model of a checkpoint.
+
+    Returns the "model_avg" state dict, batch_idx_train and average_period.
+    ``filename`` is either a training checkpoint written by
+    :func:`save_checkpoint` or a safetensors file converted from its
+    "model_avg" entry by :func:`convert_checkpoint_to_safetensors`.
+    """
+    if Path(filename).suffix == ".safetensors":
+        metadata = read_safetensors_metadata(filename)
+        if metadata.get("source") != "model_avg" or "batch_idx_train" not in metadata:
+            raise ValueError(
+                f"{filename} was not converted from the model_avg entry of a "
+                f"training checkpoint (metadata: {metadata})"
+            )
+        return (
+            load_safetensors(filename),
+            int(metadata["batch_idx_train"]),
+            int(metadata["average_period"]),
+        )
+    checkpoint = torch.load(filename, map_location="cpu", weights_only=False, mmap=True)
+    return (
+        checkpoint["model_avg"],
+        checkpoint["batch_idx_train"],
+        checkpoint["average_period"],
+    )
+
+
+def average_checkpoints_streaming(
+    filename_start: Path,
+    filename_end: Path,
+    out_filename: Path,
+) -> int:
+    """Same average as :func:`average_checkpoints_with_averaged_model`, written
+    straight to a safetensors file with a small, constant memory footprint.
+
+    Both checkpoints are memory-mapped, so the optimizer state and the other
+    entries are never read, and the tensors are averaged and written one at a
+    time: besides the page cache, memory holds a single averaged tensor.
+
+    Args:
+      filename_start:
+        Checkpoint of the start model (excluded), a training checkpoint or a
+        safetensors file converted from its "model_avg" entry.
+      filename_end:
+        Checkpoint of the end model, in the same formats.
+      out_filename:
+        The safetensors file to write, loadable with :func:`load_safetensors`.
+    Returns:
+      The number of tensors written.
+    """
+    model_start, batch_idx_train_start, average_period = _open_averaged_model(
+        filename_start
+    )
+    model_end, batch_idx_train_end, _ = _open_averaged_model(filename_end)
+
+    batch_idx_train_start = (batch_idx_train_start // average_period) * average_period
+    batch_idx_train_end = (batch_idx_train_end // average_period) * average_period
+    interval = batch_idx_train_end - batch_idx_train_start
+    assert interval > 0, interval
+    weight_end = batch_idx_train_end / interval
+    weight_start = 1 - weight_end
+
+    assert set(model_start) == set(model_end), set(model_start) ^ set(model_end)
+
+    # The header comes first, and only needs the shapes and dtypes
+    header = {}
+    offset = 0
+    for name, tensor in model_end.items():
+        num_bytes = tensor.numel() * tensor.element_size()
+        if name.startswith("module."):
+            name = name[len("module.") :]
+        header[name] = {
+            "dtype": SAFETENSORS_DTYPE_NAMES[tensor.dtype],
+            "shape": list(tensor.shape),
+            "data_offsets": [offset, offset + num_bytes],
+        }
+        offset += num_bytes
+    header["__metadata__"] = {
+        "format": "pt",
+        "source": f"average of {filename_start} (excluded) to {filename_end}",
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # safetensors aligns the data on 8 bytes
+    header_bytes += b" " * (-len(header_bytes) % 8)
+
+    logging.info(f"Averaging {len(model_end)} tensors into {out_filename}")
+    with open(out_filename, "wb") as f:
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, end in model_end.items():
+            if torch.is_floating_point(end):
+                # (model_end + model_start * (weight_start / weight_end)) * weight_end
+                avg = end + model_start[name] * (weight_start / weight_end)
+                avg *= weight_end
+            else:
+                avg = end
+            f.write(avg.contiguous().reshape(-1).view(torch.uint8).numpy())
+            del avg
+    return len(model_end)
+
+
 def remove_checkpoints(
     out_dir: Path,
     topk: int,
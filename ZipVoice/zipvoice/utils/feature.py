@@ -16,7 +16,7 @@
 # limitations under the License.
 
 from dataclasses import dataclass
-from typing import Union
+from typing import List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import torch
@@ -52,6 +52,16 @@ class VocosFbank(FeatureExtractor):
             center=True,
             power=1,
         )
+        # Same transform without internal padding: batches are padded per item
+        # in extract_padded(), so padding of the batch never leaks into frames.
+        self.batch_fbank = torchaudio.transforms.MelSpectrogram(
+            sample_rate=self.config.sampling_rate,
+            n_fft=self.config.n_fft,
+            hop_length=self.config.hop_length,
+            n_mels=self.config.n_mels,
+            center=False,
+            power=1,
+        )
 
     def _feature_fn(self, sample):
         mel = self.fbank(sample)
@@ -115,6 +125,130 @@ class VocosFbank(FeatureExtractor):
         else:
             return mel
 
+    def extract_padded(
+        self,
+        samples: torch.Tensor,
+        lengths: Union[List[int], torch.Tensor],
+        sampling_rate: int,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Extract the features of a padded batch of waveforms with one
+        MelSpectrogram call.
+
+        Every item is reflect-padded by its own length, as the centered
+        single-item transform does, so the valid frames of each item are
+        identical to those returned by :meth:`extract`.
+
+        Args:
+          samples:
+            Padded waveforms of shape (batch, time) or (batch, channels, time).
+          lengths:
+            The number of valid samples of each item, of shape (batch,).
+          sampling_rate:
+            The sampling rate of the waveforms.
+        Returns:
+          A tuple (features, num_frames): the features of shape
+          (batch, frames, n_mels) (or 2 * n_mels for stereo), padded with zeros
+          after the valid frames, and the number of valid frames of each item.
+        """
+        expected_sr = self.config.sampling_rate
+        assert sampling_rate == expected_sr, (
+            f"Mismatched sampling rate: extractor expects {expected_sr}, "
+            f"got {sampling_rate}"
+        )
+        if samples.ndim == 2:
+            samples = samples.unsqueeze(1)
+        assert samples.ndim == 3, samples.shape
+        if self.num_channels == 1:
+            if samples.shape[1] == 2:
+                samples = samples.mean(dim=1, keepdim=True)
+        else:
+            assert samples.shape[1] == 2, samples.shape
+
+        lengths = torch.as_tensor(lengths, dtype=torch.int64).tolist()
+        batch_size, num_channels, _ = samples.shape
+        pad = self.config.n_fft // 2
+        max_len = max(lengths)
+        padded = samples.new_zeros(batch_size, num_channels, max_len + 2 * pad)
+        for i, n in enumerate(lengths):
+            item = samples[i : i + 1, :, :n]
+            # Reflect padding needs more samples than the padding itself
+            mode = "reflect" if n > pad else "constant"
+            padded[i, :, : n + 2 * pad] = torch.nn.functional.pad(
+                item, (pad, pad), mode=mode
+            )[0]
+
+        mel = self.batch_fbank(padded.reshape(batch_size * num_channels, -1))
+        logmel = mel.clamp(min=1e-7).log()
+        # (batch, channels * n_mels, time) -> (batch, time, channels * n_mels)
+        logmel = logmel.reshape(batch_size, -1, logmel.shape[-1]).transpose(1, 2)
+
+        num_frames = [
+            compute_num_frames(n / sampling_rate, self.frame_shift, sampling_rate)
+            for n in lengths
+        ]
+        features = logmel.new_zeros(batch_size, max(num_frames), logmel.shape[-1])
+        for i, (n, frames) in enumerate(zip(lengths, num_frames)):
+            valid = min(n // self.config.hop_length + 1, frames)
+            features[i, :valid] = logmel[i, :valid]
+            if valid < frames:
+                # Same replicate padding as extract()
+                features[i, valid:frames] = logmel[i, valid - 1]
+        return features, torch.tensor(num_frames, dtype=torch.int64)
+
+    def extract_batch(
+        self,
+        samples: Union[
+            np.ndarray, torch.Tensor, Sequence[np.ndarray], Sequence[torch.Tensor]
+        ],
+        sampling_rate: int,
+        lengths: Optional[Union[List[int], torch.Tensor]] = None,
+    ) -> Union[List[np.ndarray], List[torch.Tensor]]:
+        """Batched version of :meth:`extract`, used by lhotse's
+        ``compute_and_store_features_batch`` and ``OnTheFlyFeatures``.
+
+        Args:
+          samples:
+            Either a list of waveforms of shape (time,) or (channels, time), or
+            a padded array of shape (batch, time) or (batch, channels, time)
+            whose valid lengths are given by ``lengths``.
+          sampling_rate:
+            The sampling rate of the waveforms.
+          lengths:
+            The number of valid samples of each item of a padded array.
+        Returns:
+          The features of each item, of shape (frames, n_mels), with the same
+          type (numpy or torch) as the input.
+        """
+        if isinstance(samples, (np.ndarray, torch.Tensor)) and samples.ndim == 1:
+            samples = [samples]
+
+        is_numpy = False
+        if isinstance(samples, (np.ndarray, torch.Tensor)):
+            is_numpy = isinstance(samples, np.ndarray)
+            if is_numpy:
+                samples = torch.from_numpy(samples)
+            if lengths is None:
+                lengths = [samples.shape[-1]] * samples.shape[0]
+        else:
+            if len(samples) == 0:
+                return []
+            is_numpy = isinstance(samples[0], np.ndarray)
+            items = [
+                torch.from_numpy(s) if isinstance(s, np.ndarray) else s
+                for s in samples
+            ]
+            items = [s.unsqueeze(0) if s.ndim == 1 else s for s in items]
+            lengths = [s.shape[-1] for s in items]
+            samples = items[0].new_zeros(len(items), items[0].shape[0], max(lengths))
+            for i, s in enumerate(items):
+                samples[i, :, : s.shape[-1]] = s
+
+        features, num_frames = self.extract_padded(samples, lengths, sampling_rate)
+        features = [feat[:n] for feat, n in zip(features, num_frames.tolist())]
+        if is_numpy:
+            return [feat.cpu().numpy() for feat in features]
+        return features
+
     @property
     def frame_shift(self) -> Seconds:
         return self.config.hop_length / self.config.sampling_rate
@@ -0,0 +1,186 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class RenderProgress:
+    """Shared progress state of a generation job.
+
+    An instance can be passed directly as the `progress_callback` of
+    :func:`zipvoice.bin.infer_zipvoice.generate_list` and
+    :func:`zipvoice.bin.infer_zipvoice.generate_sentence`. It records the
+    current sentence, solver step and stage, together with live per-step
+    and per-vocoder timings.
+
+    The remaining time is estimated from the throughput of the job so far
+    (completed sentences per second), which stays right when sentences are
+    generated in batches or by several workers at once. Until the first
+    sentence completes, it is extrapolated from the solver step timings of
+    the sentences in flight.
+
+    When `path` is given, every update is also published to a JSON file
+    (written atomically, at most once per `min_interval` seconds), so that
+    another process can follow the progress with :meth:`read_snapshot`.
+
+    Events (the first argument of `__call__`):
+      - "start": total (number of sentences), num_step.
+      - "sentence_start": index.
+      - "solver_step": step, num_step.
+      - "vocoder": index.
+      - "sentence_end": index, metrics (the dict returned by generate_sentence).
+      - "finish".
+    """
+
+    def __init__(self, path: Optional[str] = None, min_interval: float = 0.2):
+        self.path = path
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self._last_write = 0.0
+        self.reset()
+
+    def reset(self):
+        self.is_rendering = False
+        self.stage = "idle"
+        self.total_sentences = 0
+        self.current_sentence = 0
+        self.step = 0
+        self.num_step = 0
+        self.start_time = None
+        self.end_time = None
+        self.step_times: List[float] = []
+        self.vocoder_times: List[float] = []
+        self.sentence_timings: List[Dict[str, Any]] = []
+        self.completed_sentences = 0
+        self._in_flight = set()
+        self._last_end_t = None
+        self._last_step_t = None
+        self._vocoder_t = None
+
+    def __call__(self, event: str, **info):
+        now = time.time()
+        with self.lock:
+            if event == "start":
+                self.reset()
+                self.is_rendering = True
+                self.stage = "start"
+                self.total_sentences = info.get("total", 0)
+                self.num_step = info.get("num_step", 0)
+                self.start_time = now
+            elif event == "sentence_start":
+                self.stage = "decoder"
+                self.current_sentence = max(self.current_sentence, info["index"] + 1)
+                self._in_flight.add(info["index"])
+                self.step = 0
+                self._last_step_t = now
+            elif event == "solver_step":
+                self.stage = "decoder"
+                self.step = info["step"]
+                self.num_step = info["num_step"]
+                if self._last_step_t is not None:
+                    self.step_times.append(now - self._last_step_t)
+                self._last_step_t = now
+            elif event == "vocoder":
+                self.stage = "vocoder"
+                self._vocoder_t = now
+            elif event == "sentence_end":
+                if self._vocoder_t is not None:
+                    self.vocoder_times.append(now - self._vocoder_t)
+                    self._vocoder_t = None
+                self._in_flight.discard(info["index"])
+                self.completed_sentences += 1
+                self._last_end_t = now
+                timing = {"index": info["index"]}
+                timing.update(info.get("metrics") or {})
+                self.sentence_timings.append(timing)
+            elif event == "finish":
+                self.is_rendering = False
+                self.stage = "done"
+                self.end_time = now
+            else:
+                logging.warning(f"Unknown progress event: {event}")
+                return
+        self._publish(force=event in ("start", "sentence_end", "finish"))
+
+    def estimate_time_remaining(self) -> Optional[float]:
+        """Estimate the remaining time from the throughput so far, or from the
+        live step and vocoder timings before any sentence has completed.
+        Returns None when nothing has been timed yet."""
+        remaining_sentences = max(self.total_sentences - self.completed_sentences, 0)
+        if self.completed_sentences > 0:
+            # Sentences completed per second since the start, then counted
+            # down until the next sentence completes
+            rate = self.completed_sentences / max(
+                self._last_end_t - self.start_time, 1e-6
+            )
+            since_last_end = time.time() - self._last_end_t
+            return max(remaining_sentences / rate - since_last_end, 0.0)
+
+        if not self.step_times:
+            return None
+        step_time = sum(self.step_times) / len(self.step_times)
+        vocoder_time = (
+            sum(self.vocoder_times) / len(self.vocoder_times)
+            if self.vocoder_times
+            else step_time
+        )
+        # The sentences in flight are generated together (one batch or one per
+        # worker); the queued ones follow in rounds of the same size
+        round_time = self.num_step * step_time + vocoder_time
+        in_flight = max(len(self._in_flight), 1)
+        if self.stage == "decoder":
+            remaining = (self.num_step - self.step) * step_time + vocoder_time
+        elif self.stage == "vocoder":
+            remaining = vocoder_time
+        else:
+            remaining = round_time
+        queued = max(remaining_sentences - in_flight, 0)
+        return remaining + math.ceil(queued / in_flight) * round_time
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            if self.start_time is None:
+                elapsed = 0.0
+            else:
+                elapsed = (self.end_time or time.time()) - self.start_time
+            eta = self.estimate_time_remaining() if self.is_rendering else 0.0
+            return {
+                "is_rendering": self.is_rendering,
+                "stage": self.stage,
+                "current_sentence": self.current_sentence,
+                "total_sentences": self.total_sentences,
+                "completed_sentences": self.completed_sentences,
+                "step": self.step,
+                "num_step": self.num_step,
+                "elapsed_time": elapsed,
+                "estimated_time_remaining": eta,
+                "sentence_timings": list(self.sentence_timings),
+                "updated_at": time.time(),
+            }
+
+    def _publish(self, force: bool = False):
+        if self.path is None:
+            return
+        now = time.time()
+        if not force and now - self._last_write < self.min_interval:
+            return
+        self._last_write = now
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, self.path)
+        except OSError as ex:
+            logging.warning(f"Failed to publish progress to {self.path}: {ex}")
+
+    @staticmethod
+    def read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+        """Read a snapshot published by another process, None if unavailable."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
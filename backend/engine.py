@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+In-process ZipVoice inference engine.
+The model, vocoder and tokenizer are loaded once per server process and sentences
+are synthesized straight into memory, without TSV files or per-segment wavs.
+"""
+
+import json
+import math
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from zipvoice.bin.infer_zipvoice import (MODEL_DEFAULTS, build_model,
+                                         generate_batch_wav,
+                                         generate_sentence_wav, get_device,
+                                         get_model, get_tokenizer, get_vocoder,
+                                         prepare_prompt,
+                                         rebuild_positional_encodings)
+
+if TYPE_CHECKING:
+    # torch and lhotse are imported on first use, importing the engine stays cheap
+    import torch
+
+# Prompt + sentence lengths (frames) whose decoder graphs are built at startup
+DECODER_WARMUP_FRAMES = (768, 1024, 1280, 1536)
+
+# Micro-batching: sentences whose predicted lengths fall in the same bucket share a batch
+BATCH_BUCKET_FRAMES = 128   # Bucket width in frames (padding waste per item stays below this)
+BATCH_POLL_INTERVAL = 0.5   # Seconds between stop checks while a render waits for its sentences
+
+
+class RenderStopped(Exception):
+    """Raised inside the sampler when a render is cancelled"""
+
+
+class SharedWeights:
+    """
+    A state dict packed into one shared-memory buffer per dtype.
+    Pickling it for a spawned process (torch.multiprocessing) only sends the buffer
+    handles, so every worker attaches to the same physical pages instead of copying.
+    """
+    def __init__(self, state_dict: Dict[str, "torch.Tensor"]):
+        import torch
+
+        self.index = []  # (name, dtype, offset, shape)
+        sizes = {}
+        for name, tensor in state_dict.items():
+            offset = sizes.get(tensor.dtype, 0)
+            self.index.append((name, tensor.dtype, offset, tuple(tensor.shape)))
+            sizes[tensor.dtype] = offset + tensor.numel()
+        self.buffers = {dtype: torch.empty(size, dtype=dtype).share_memory_() for dtype, size in sizes.items()}
+        for name, dtype, offset, shape in self.index:
+            tensor = state_dict[name]
+            self.buffers[dtype][offset:offset + tensor.numel()].copy_(tensor.reshape(-1))
+
+    def state_dict(self) -> Dict[str, "torch.Tensor"]:
+        """Views into the shared buffers (no copy)"""
+        return {
+            name: self.buffers[dtype][offset:offset + int(np.prod(shape))].view(shape)
+            for name, dtype, offset, shape in self.index
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.numel() * b.element_size() for b in self.buffers.values())
+
+
+class LockedTokenizer:
+    """
+    Serializes tokenizer calls. espeak-ng (the g2p behind the espeak tokenizer) is not
+    thread-safe, and concurrent renders tokenize on their own request threads (prompt
+    preparation, micro-batch submission).
+    """
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.lock = threading.Lock()
+
+    def texts_to_token_ids(self, texts: List[str]) -> List[List[int]]:
+        with self.lock:
+            return self.tokenizer.texts_to_token_ids(texts)
+
+    def texts_to_tokens(self, texts: List[str]) -> List[List[str]]:
+        with self.lock:
+            return self.tokenizer.texts_to_tokens(texts)
+
+    def __getattr__(self, name: str):
+        # vocab_size, pad_id, tokens_to_token_ids, ...
+        return getattr(self.tokenizer, name)
+
+
+class BatchItem:
+    """One pending sentence of a render"""
+    __slots__ = ("render", "index", "tokens", "prompt", "frames", "enqueued")
+
+    def __init__(self, render, index: int, tokens: List[int], prompt: Dict[str, Any], frames: int):
+        self.render = render
+        self.index = index
+        self.tokens = tokens
+        self.prompt = prompt
+        self.frames = frames
+        self.enqueued = time.time()
+
+
+class BatchedRender:
+    """The sentences of one synthesize() call, reassembled in order as their batches complete"""
+    def __init__(self, progress: Optional[Callable] = None,
+                 should_stop: Optional[Callable[[], Optional[str]]] = None):
+        self.progress = progress
+        self.should_stop = should_stop
+        self.results: Dict[int, np.ndarray] = {}
+        self.error: Optional[Exception] = None
+        self.closed = False  # Set when the caller is gone: its pending sentences are dropped
+        self.cond = threading.Condition()
+
+    def notify(self, event: str, **info):
+        if self.progress is not None:
+            self.progress(event, **info)
+
+    def stop_reason(self) -> Optional[str]:
+        return self.should_stop() if self.should_stop is not None else None
+
+    def put(self, index: int, wav: np.ndarray):
+        with self.cond:
+            self.results[index] = wav
+            self.cond.notify_all()
+
+    def fail(self, error: Exception):
+        with self.cond:
+            if self.error is None:
+                self.error = error
+            self.cond.notify_all()
+
+    def wait(self, index: int) -> np.ndarray:
+        """Block until sentence `index` is ready; raises the batch error or RenderStopped"""
+        with self.cond:
+            while index not in self.results and self.error is None:
+                reason = self.stop_reason()
+                if reason:
+                    raise RenderStopped(reason)
+                self.cond.wait(BATCH_POLL_INTERVAL)
+            if index in self.results:
+                return self.results.pop(index)
+            raise self.error
+
+
+class BatchScheduler:
+    """
+    Collects the pending sentences of all in-flight renders, buckets them by predicted frame
+    count (the same prompt-ratio formula the model uses) and runs each bucket as one batched
+    sampling pass. A bucket is dispatched once it fills `max_batch_frames` (padded frames, doubled
+    under classifier-free guidance) or once its oldest sentence has waited `max_wait` seconds.
+    """
+    def __init__(self, engine: "InferenceEngine", max_batch_frames: int, max_wait: float,
+                 bucket_frames: int = BATCH_BUCKET_FRAMES):
+        self.engine = engine
+        self.max_batch_frames = max_batch_frames
+        self.max_wait = max_wait
+        self.bucket_frames = bucket_frames
+        # Classifier-free guidance runs the decoder on a doubled batch
+        self.cfg_factor = 1 if engine.model_name == "zipvoice_distill" else 2
+        self.buckets: Dict[int, List[BatchItem]] = {}
+        self.cond = threading.Condition()
+        self.thread = None
+
+    @staticmethod
+    def predict_frames(tokens: List[int], prompt: Dict[str, Any], speed: float = 1.0) -> int:
+        """Prompt + generated frames, as in ZipVoice.forward_text_inference_ratio_duration"""
+        prompt_len = int(prompt["prompt_features_lens"][0])
+        prompt_tokens_len = max(len(prompt["prompt_tokens"][0]), 1)
+        return prompt_len + math.ceil(prompt_len / prompt_tokens_len * len(tokens) / speed)
+
+    def submit(self, render: BatchedRender, index: int, text: str, prompt: Dict[str, Any]):
+        # Runs on the caller's thread; the engine's LockedTokenizer serializes espeak-ng
+        tokens = self.engine.tokenizer.texts_to_token_ids([text])[0]
+        item = BatchItem(render, index, tokens, prompt, self.predict_frames(tokens, prompt))
+        with self.cond:
+            self.buckets.setdefault(item.frames // self.bucket_frames, []).append(item)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def _batch_cost(self, items: List[BatchItem]) -> int:
+        """Decoder frames of a batch once padded to its longest item"""
+        return len(items) * max(item.frames for item in items) * self.cfg_factor
+
+    def _next_batch(self) -> List[BatchItem]:
+        """Wait for a bucket that is full or past its deadline and take a batch from it"""
+        with self.cond:
+            while True:
+                for key in list(self.buckets):
+                    # Sentences of stopped or abandoned renders are never synthesized
+                    self.buckets[key] = [item for item in self.buckets[key]
+                                         if not item.render.closed and item.render.error is None]
+                    if not self.buckets[key]:
+                        del self.buckets[key]
+                if not self.buckets:
+                    self.cond.wait()
+                    continue
+
+                now = time.time()
+                full = [key for key, items in self.buckets.items() if self._batch_cost(items) >= self.max_batch_frames]
+                candidates = full or list(self.buckets)
+                key = min(candidates, key=lambda k: self.buckets[k][0].enqueued)
+                waited = now - self.buckets[key][0].enqueued
+                if not full and waited < self.max_wait:
+                    self.cond.wait(self.max_wait - waited)
+                    continue
+
+                # Oldest first, as many as fit the frame budget (always at least one)
+                items = self.buckets[key]
+                batch = [items[0]]
+                for item in items[1:]:
+                    if self._batch_cost(batch + [item]) > self.max_batch_frames:
+                        break
+                    batch.append(item)
+                self.buckets[key] = items[len(batch):]
+                if not self.buckets[key]:
+                    del self.buckets[key]
+                return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._process(batch)
+            except Exception as e:
+                print(f"[ERROR] Batch of {len(batch)} sentences failed: {e}")
+                for item in batch:
+                    item.render.fail(e)
+
+    def _process(self, batch: List[BatchItem]):
+        import torch
+
+        renders = list({id(item.render): item.render for item in batch}.values())
+        for item in batch:
+            item.render.notify("sentence_start", index=item.index)
+
+        def step_callback(step: int, num_step: int):
+            for render in renders:
+                render.notify("solver_step", step=step, num_step=num_step)
+            # Only abort the batch once every render in it is stopped
+            reasons = [render.stop_reason() for render in renders]
+            if all(reasons):
+                raise RenderStopped(reasons[0])
+
+        def vocoder_callback():
+            for item in batch:
+                item.render.notify("vocoder", index=item.index)
+
+        start = time.time()
+        engine = self.engine
+        try:
+            with engine.render_lock, torch.inference_mode():
+                wavs = generate_batch_wav(
+                    tokens=[item.tokens for item in batch],
+                    prompts=[item.prompt for item in batch],
+                    model=engine.model,
+                    vocoder=engine.vocoder,
+                    num_step=engine.num_step,
+                    guidance_scale=engine.guidance_scale,
+                    step_callback=step_callback,
+                    vocoder_callback=vocoder_callback
+                )
+        except RenderStopped as e:
+            for render in renders:
+                render.fail(e)
+            return
+
+        elapsed = time.time() - start
+        wav_seconds = sum(wav.shape[-1] for wav in wavs) / engine.sampling_rate
+        print(f"[BATCH] {len(batch)} sentences from {len(renders)} renders, "
+              f"{max(item.frames for item in batch)} frames, RTF {elapsed / max(wav_seconds, 1e-6):.3f}")
+        for item, wav in zip(batch, wavs):
+            seconds = wav.shape[-1] / engine.sampling_rate
+            metrics = {"t": elapsed, "wav_seconds": seconds, "rtf": elapsed / max(wav_seconds, 1e-6),
+                       "batch_size": len(batch)}
+            item.render.notify("sentence_end", index=item.index, metrics=metrics)
+            item.render.put(item.index, wav.squeeze(0).numpy().astype(np.float32, copy=False))
+
+    def synthesize(self, sentences: List[str], prompt: Dict[str, Any],
+                   progress: Optional[Callable] = None,
+                   should_stop: Optional[Callable[[], Optional[str]]] = None) -> Iterator[np.ndarray]:
+        """Submit every sentence at once and yield the waveforms in order as batches complete"""
+        render = BatchedRender(progress, should_stop)
+        render.notify("start", total=len(sentences), num_step=self.engine.num_step)
+        try:
+            for i, text in enumerate(sentences):
+                self.submit(render, i, text, prompt)
+            for i in range(len(sentences)):
+                yield render.wait(i)
+        finally:
+            render.closed = True
+            render.notify("finish")
+
+
+class InferenceEngine:
+    """Loads ZipVoice once and synthesizes sentences into numpy buffers"""
+    def __init__(self, model_dir: str, checkpoint_name: str, model_name: str = "zipvoice",
+                 tokenizer: str = "espeak", lang: str = "vi", seed: int = 666,
+                 shared_weights: Optional[SharedWeights] = None, compile_decoder: Optional[str] = None,
+                 batch_max_frames: int = 0, batch_max_wait_ms: float = 50,
+                 vocoder_path: Optional[str] = None):
+        self.model_dir = Path(model_dir)
+        self.checkpoint_name = checkpoint_name
+        self.model_name = model_name
+        self.tokenizer_type = tokenizer
+        self.lang = lang
+        self.seed = seed
+        self.shared_weights = shared_weights  # Attach to these instead of reading the checkpoint
+        self.compile_decoder = compile_decoder  # None, "trace" or "compile" (see CompiledFmDecoder)
+        self.batch_max_frames = batch_max_frames  # Decoder frames per micro-batch (0 = one sentence at a time)
+        self.batch_max_wait = batch_max_wait_ms / 1000
+        self.vocoder_path = vocoder_path  # Local Vocos directory (None = download from HuggingFace)
+        self.scheduler = None
+        self.num_step = MODEL_DEFAULTS[model_name]["num_step"]
+        self.guidance_scale = MODEL_DEFAULTS[model_name]["guidance_scale"]
+        self.model = None
+        self.vocoder = None
+        self.tokenizer = None
+        self.feature_extractor = None
+        self.device = None
+        self.sampling_rate = 24000
+        self.load_lock = threading.Lock()
+        self.render_lock = threading.Lock()  # One render at a time on the GPU
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def _read_config(self) -> Dict[str, Any]:
+        with open(self.model_dir / "model.json", "r") as f:
+            return json.load(f)
+
+    def load_shared_weights(self) -> SharedWeights:
+        """Read the checkpoint once on CPU and move its weights into shared memory"""
+        start = time.time()
+        tokenizer = get_tokenizer(self.tokenizer_type, str(self.model_dir / "tokens.txt"), lang=self.lang)
+        model = get_model(self.model_name, self._read_config(), str(self.model_dir / self.checkpoint_name), tokenizer)
+        shared = SharedWeights(model.state_dict())
+        del model
+        print(f"[ENGINE] Shared {shared.nbytes / 1024 ** 2:.0f}MB of model weights in {time.time() - start:.1f}s")
+        return shared
+
+    def load(self):
+        """Load model, vocoder and tokenizer (no-op once loaded)"""
+        with self.load_lock:
+            if self.model is not None:
+                return
+            import torch
+
+            from zipvoice.utils.feature import VocosFbank
+
+            start = time.time()
+            model_config = self._read_config()
+            if model_config["feature"]["type"] != "vocos":
+                raise NotImplementedError(f"Unsupported feature type: {model_config['feature']['type']}")
+
+            tokenizer = get_tokenizer(self.tokenizer_type, str(self.model_dir / "tokens.txt"), lang=self.lang)
+            if self.shared_weights is not None:
+                # Build on the meta device (no allocation) and adopt the shared tensors as parameters
+                with torch.device("meta"):
+                    model = build_model(self.model_name, model_config, tokenizer)
+                model.load_state_dict(self.shared_weights.state_dict(), strict=True, assign=True)
+                # Tensors that are neither parameters nor buffers are still on the meta device
+                rebuild_positional_encodings(model)
+                model.requires_grad_(False)
+            else:
+                model = get_model(self.model_name, model_config, str(self.model_dir / self.checkpoint_name), tokenizer)
+            device = get_device()
+            model = model.to(device)
+            model.eval()
+            if self.compile_decoder:
+                self._compile_decoder(model, device)
+
+            vocoder = get_vocoder(self.vocoder_path)
+            vocoder = vocoder.to(device)
+            vocoder.eval()
+
+            self.tokenizer = LockedTokenizer(tokenizer)
+            self.feature_extractor = VocosFbank()
+            self.sampling_rate = model_config["feature"]["sampling_rate"]
+            self.device = device
+            self.vocoder = vocoder
+            self.model = model
+            print(f"[ENGINE] Loaded {self.model_name} ({self.checkpoint_name}) on {device} in {time.time() - start:.1f}s")
+
+    def _compile_decoder(self, model: "torch.nn.Module", device: "torch.device"):
+        """Swap in the compiled fm_decoder and build its graphs now rather than on the first render"""
+        from zipvoice.models.modules.compiled_decoder import compile_fm_decoder
+
+        start = time.time()
+        # Freezing copies the weights into the graph, which would defeat shared weights
+        decoder = compile_fm_decoder(model, backend=self.compile_decoder, freeze=self.shared_weights is None)
+        # Classifier-free guidance runs the decoder on a doubled batch
+        batch_size = 1 if self.model_name == "zipvoice_distill" else 2
+        if decoder.warmup(DECODER_WARMUP_FRAMES, batch_size=batch_size, device=device):
+            print(f"[ENGINE] Compiled fm_decoder ({self.compile_decoder}) in {time.time() - start:.1f}s")
+        else:
+            print(f"[WARN] fm_decoder compilation ({self.compile_decoder}) failed, using the eager decoder")
+
+    def prepare_prompt(self, prompt_text: str, prompt_wav: str) -> Dict[str, Any]:
+        """Prompt tokens and features; depends only on the prompt, so callers cache it"""
+        self.load()
+        import torch
+
+        with torch.inference_mode():
+            return prepare_prompt(
+                prompt_text=prompt_text,
+                prompt_wav=prompt_wav,
+                tokenizer=self.tokenizer,
+                feature_extractor=self.feature_extractor,
+                device=self.device,
+                sampling_rate=self.sampling_rate
+            )
+
+    def synthesize_one(self, index: int, text: str, prompt: Dict[str, Any],
+                       progress: Optional[Callable] = None,
+                       should_stop: Optional[Callable[[], Optional[str]]] = None) -> np.ndarray:
+        """
+        Synthesize one sentence into a float32 waveform.
+        `should_stop` is polled after every solver step; a non-empty return value
+        aborts the render with RenderStopped carrying that reason.
+        """
+        import torch
+
+        def callback(event: str, **info):
+            if progress is not None:
+                progress(event, **info)
+            if should_stop is not None and event == "solver_step":
+                reason = should_stop()
+                if reason:
+                    raise RenderStopped(reason)
+
+        with torch.inference_mode():
+            wav, metrics = generate_sentence_wav(
+                text=text,
+                prompt=prompt,
+                model=self.model,
+                vocoder=self.vocoder,
+                tokenizer=self.tokenizer,
+                num_step=self.num_step,
+                guidance_scale=self.guidance_scale,
+                sampling_rate=self.sampling_rate,
+                progress_callback=callback,
+                sentence_index=index
+            )
+        print(f"[SENTENCE] {index + 1} done, RTF {metrics['rtf']:.3f}")
+        return wav.squeeze(0).numpy().astype(np.float32, copy=False)
+
+    def synthesize(self, sentences: List[str], prompt: Dict[str, Any],
+                   progress: Optional[Callable] = None,
+                   should_stop: Optional[Callable[[], Optional[str]]] = None) -> Iterator[np.ndarray]:
+        """
+        Yield one float32 waveform per sentence (see synthesize_one).
+        With micro-batching on, sentences of concurrent renders are batched together instead.
+        """
+        self.load()
+        from lhotse.utils import fix_random_seed
+
+        if self.batch_max_frames > 0:
+            with self.load_lock:
+                if self.scheduler is None:
+                    self.scheduler = BatchScheduler(self, self.batch_max_frames, self.batch_max_wait)
+            yield from self.scheduler.synthesize(sentences, prompt, progress, should_stop)
+            return
+        with self.render_lock:
+            # Same seed per render as the one-process-per-render CLI
+            fix_random_seed(self.seed)
+            if progress is not None:
+                progress("start", total=len(sentences), num_step=self.num_step)
+            try:
+                for i, text in enumerate(sentences):
+                    yield self.synthesize_one(i, text, prompt, progress, should_stop)
+            finally:
+                if progress is not None:
+                    progress("finish")
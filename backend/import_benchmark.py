@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the server and CLI entry points.
+Each module is imported in a fresh interpreter (so nothing is cached in sys.modules)
+under `python -X importtime`; reports the median wall time and the slowest imports.
+
+    python3 import_benchmark.py                      # default entry points
+    python3 import_benchmark.py main --repeat 10 --top 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = [
+    "main",                             # API server (backend/main.py)
+    "engine",                           # In-process inference engine
+    "zipvoice.bin.infer_zipvoice",      # CLI used by the subprocess mode
+    "zipvoice.tokenizer.tokenizer",
+]
+
+
+def import_once(module: str) -> Tuple[float, Dict[str, int]]:
+    """Import `module` in a new interpreter; returns (wall seconds, cumulative us per imported module)"""
+    env = os.environ.copy()
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (backend_dir, env.get("PYTHONPATH")) if p)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=env)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        last_line = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        raise RuntimeError(f"import {module} failed: {last_line}")
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) == 3:
+            cumulative[fields[2].strip()] = int(fields[1])
+    return elapsed, cumulative
+
+
+def benchmark(module: str, repeat: int, top: int):
+    times: List[float] = []
+    cumulative = {}
+    for _ in range(repeat):
+        elapsed, cumulative = import_once(module)
+        times.append(elapsed)
+
+    print(f"[BENCH] {module}: median {statistics.median(times) * 1000:.0f}ms, "
+          f"min {min(times) * 1000:.0f}ms over {repeat} runs ({len(cumulative)} modules imported)")
+    # Top-level packages only: their cumulative time includes everything below them
+    packages = {name: us for name, us in cumulative.items() if "." not in name}
+    for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"         {us / 1000:8.1f}ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level packages to list")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            benchmark(module, args.repeat, args.top)
+        except RuntimeError as e:
+            print(f"[ERROR] {e}")
+
+
+if __name__ == "__main__":
+    main()
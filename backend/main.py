@@ -7,26 +7,36 @@ Using ZipVoice defaults for optimal Vietnamese speech synthesis.
 
 import asyncio
 import datetime
+import functools
 import json
 import os
 import re
 import shutil
+import sqlite3
 import subprocess
+import tempfile
 import threading
 import time
 import uuid
 from collections import deque
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import numpy as np
-import soundfile as sf
 from fastapi import (BackgroundTasks, FastAPI, File, Form, HTTPException,
                      Request, Response, UploadFile)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 
+from zipvoice.tokenizer.normalizer import VietnameseTextNormalizer
+from zipvoice.utils.progress import RenderProgress
+
+if TYPE_CHECKING:
+    # numpy, soundfile and torchaudio are imported where audio is handled, startup stays cheap
+    import numpy as np
+    import torchaudio
+
 # Disable API access logging but keep error logging
 import logging
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
@@ -38,10 +48,54 @@ logging.getLogger("fastapi").setLevel(logging.WARNING)
 DATA_DIR = "/data"
 ZIPVOICE_DIR = "/ZipVoice"
 MODEL_DIR = "/models/zipvoice_vi"
-CHECKPOINT_NAME = "iter-525000-avg-2.pt"
+CHECKPOINT_NAME = os.environ.get("CHECKPOINT_NAME", "iter-525000-avg-2.pt")
+# A converted copy (python3 -m zipvoice.bin.convert_checkpoint) is memory-mapped instead of unpickled
+if CHECKPOINT_NAME.endswith(".pt") and os.path.exists(os.path.join(MODEL_DIR, CHECKPOINT_NAME[:-3] + ".safetensors")):
+    CHECKPOINT_NAME = CHECKPOINT_NAME[:-3] + ".safetensors"
+VOCODER_PATH = os.environ.get("VOCODER_PATH") or None  # Local Vocos directory (config.yaml + pytorch_model.bin)
 DEFAULT_PROFILE = "tina"
 DOING_DIR = "/DOING"  # Temporary processing folder
-DATA_LOG_FILE = "/data/data.json"  # Lightweight DB for rendering history
+DATA_LOG_FILE = "/data/data.json"  # Legacy JSON render history (migrated on startup)
+RENDER_DB_FILE = "/data/renders.db"  # SQLite (WAL) render history
+RENDER_HISTORY_RETENTION = 5000      # Number of render records kept
+
+# "inprocess": model loaded once in the API process, segments kept in memory
+# "pool": warm pool of worker processes, each with the model loaded
+# "subprocess": one infer_zipvoice process per render (TSV + per-segment wavs)
+INFERENCE_MODE = os.environ.get("INFERENCE_MODE", "inprocess")
+
+# Worker pool ("pool" mode): workers are pinned to disjoint core sets
+WORKER_POOL_SIZE = int(os.environ.get("WORKER_POOL_SIZE", "2"))
+WORKER_MAX_REQUESTS = int(os.environ.get("WORKER_MAX_REQUESTS", "200"))  # Recycle after N requests
+WORKER_MAX_RSS_MB = float(os.environ.get("WORKER_MAX_RSS_MB", "6000"))   # Recycle above this RSS (0 = off)
+WORKER_SHARE_WEIGHTS = os.environ.get("WORKER_SHARE_WEIGHTS", "1") == "1"  # One shared copy of the weights
+
+# Compiled flow-matching decoder ("trace" or "compile"; empty = eager). Built and warmed up at startup,
+# falls back to eager if compilation fails
+DECODER_COMPILE = os.environ.get("DECODER_COMPILE", "")
+
+# Micro-batching across concurrent renders ("inprocess" mode): sentences with similar predicted lengths
+# are sampled together, up to BATCH_MAX_FRAMES decoder frames per batch (0 = off), and no sentence waits
+# more than BATCH_MAX_WAIT_MS for others to join its batch
+BATCH_MAX_FRAMES = int(os.environ.get("BATCH_MAX_FRAMES", "0"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "50"))
+SENTENCE_PAUSE_SECONDS = 0.5  # Pause between sentences for natural speech flow
+
+# Merged output loudness (running RMS target + per-chunk peak limiter)
+LOUDNESS_TARGET_RMS = 0.1     # ~-20 dBFS RMS, same target ZipVoice normalizes prompts to
+LOUDNESS_SMOOTHING = 0.3      # Weight of a quieter segment when raising the running gain
+LOUDNESS_MAX_GAIN = 4.0       # Never boost quiet segments by more than +12 dB
+LIMITER_CEILING = 0.95        # Peak ceiling (prevents clipping)
+LIMITER_BLOCK_SECONDS = 0.005 # Limiter gain is computed per 5ms block and interpolated
+
+# Output formats, encoded in-process by libsndfile: name -> (container, subtype, media type, extension)
+OUTPUT_FORMATS = {
+    "wav": ("WAV", "PCM_16", "audio/wav", "wav"),
+    "flac": ("FLAC", "PCM_16", "audio/flac", "flac"),
+    "opus": ("OGG", "OPUS", "audio/ogg", "opus"),
+    "mp3": ("MP3", "MPEG_LAYER_III", "audio/mpeg", "mp3")
+}
+RENDER_STORAGE_FORMAT = os.environ.get("RENDER_STORAGE_FORMAT", "flac")  # Format renders are kept in
 
 # Use ZipVoice defaults only (no advanced settings)
 ZIPVOICE_DEFAULTS = {
@@ -52,11 +106,30 @@ ZIPVOICE_DEFAULTS = {
     "checkpoint_name": CHECKPOINT_NAME
 }
 
+# Prompt preparation (decoder cost scales with prompt + target frames)
+FEATURE_SAMPLE_RATE = 24000  # ZipVoice VocosFbank sampling rate
+FEATURE_HOP_LENGTH = 256     # ZipVoice VocosFbank hop length (93.75 frames/s)
+PROMPT_FRAME_BUDGET = 750    # Default prompt budget per profile (~8s of audio)
+PROMPT_MIN_SECONDS = 2.0     # Shorter prompts lose too much speaker identity
+PROMPT_CACHE_DIRNAME = "prompt_cache"
+
+# Sentence segmentation (generated frames per segment, estimated from the prompt's speaking rate)
+SEGMENT_MAX_FRAMES = 1125      # ~12s: longer sentences are split at clause boundaries (attention cost is quadratic)
+SEGMENT_MIN_FRAMES = 190       # ~2s: shorter fragments are merged into a neighbour
+DEFAULT_FRAMES_PER_CHAR = 6.5  # ~14 characters/s of Vietnamese speech, used when the prompt gives no estimate
+SEGMENT_CONJUNCTIONS = ["và", "nhưng", "hoặc", "nên", "vì", "mà", "thì", "rồi", "để", "khi", "nếu", "tuy", "song", "còn"]
+
 # GPU monitoring thresholds
 GPU_TEMP_EMERGENCY = 90  # Stop processing at 90°C
 GPU_TEMP_THROTTLE = 85   # Reduce load at 85°C
 TARGET_GPU_UTILIZATION = 85  # Target 85% utilization
 
+# Event stream (single producer, pushed to all subscribers)
+TELEMETRY_INTERVAL = 2.0        # nvidia-smi is queried at most once per interval
+PROGRESS_PUSH_INTERVAL = 0.5    # Render progress push period while rendering
+EVENT_KEEPALIVE_INTERVAL = 15.0 # SSE comment to keep proxies from closing idle streams
+EVENT_QUEUE_SIZE = 100          # Per-subscriber backlog before dropping old events
+
 # Performance metrics storage
 class RenderMetrics:
     def __init__(self):
@@ -95,7 +168,6 @@ class RenderMetrics:
 
 # Global instances
 render_metrics = RenderMetrics()
-current_process = None  # Track current rendering process for stop functionality
 
 # === PYDANTIC MODELS === #
 
@@ -111,6 +183,7 @@ class ProfileResponse(BaseModel):
     path: str
     is_default: bool
     created_at: str
+    prompt_frame_budget: Optional[int] = None
 
 class GPUStatus(BaseModel):
     """GPU status response model"""
@@ -127,11 +200,16 @@ class RenderStatus(BaseModel):
     total_sentences: int
     estimated_time_remaining: float
     elapsed_time: float
+    stage: str = "idle"  # "start", "decoder", "vocoder", "done"
+    step: int = 0
+    num_step: int = 0
+    render_id: Optional[str] = None  # Most recently started render
+    active_renders: int = 0
 
 # === GPU MONITORING FUNCTIONS === #
 
-def get_gpu_status() -> GPUStatus:
-    """Get current GPU temperature, utilization and memory status"""
+def query_gpu_status() -> GPUStatus:
+    """Query current GPU temperature, utilization and memory status from nvidia-smi"""
     try:
         # Try to get GPU info using nvidia-ml-py
         result = subprocess.run(['nvidia-smi', '--query-gpu=temperature.gpu,utilization.gpu,memory.used,memory.total', '--format=csv,noheader,nounits'], 
@@ -171,6 +249,27 @@ def get_gpu_status() -> GPUStatus:
         status="UNKNOWN"
     )
 
+class GPUTelemetry:
+    """Caches nvidia-smi readings so all consumers share one query per interval"""
+    def __init__(self, interval: float = TELEMETRY_INTERVAL):
+        self.interval = interval
+        self.status = None
+        self.updated_at = 0.0
+        self.lock = threading.Lock()
+    
+    def get(self) -> GPUStatus:
+        with self.lock:
+            if self.status is None or time.time() - self.updated_at >= self.interval:
+                self.status = query_gpu_status()
+                self.updated_at = time.time()
+            return self.status
+
+gpu_telemetry = GPUTelemetry()
+
+def get_gpu_status() -> GPUStatus:
+    """Get current GPU status (cached for TELEMETRY_INTERVAL seconds)"""
+    return gpu_telemetry.get()
+
 def should_stop_processing() -> bool:
     """Check if processing should be stopped due to high GPU temperature"""
     gpu_status = get_gpu_status()
@@ -184,32 +283,193 @@ def should_throttle_processing() -> bool:
 # === STOP MECHANISM === #
 
 class ProcessController:
-    def __init__(self):
+    """Stop flag, supervised subprocess and progress of one render"""
+    def __init__(self, render_id: str):
+        self.render_id = render_id
         self.should_stop = False
         self.current_process = None
+        self.stop_signal = None  # (loop, asyncio.Event) of the supervised subprocess
+        self.progress = None  # RenderProgress (in-process) or progress file path (subprocess)
+        self.render_start_time = None
+        self.render_word_count = 0
         self.lock = threading.Lock()
     
     def stop_current_process(self):
         with self.lock:
             self.should_stop = True
-            if self.current_process:
-                try:
-                    self.current_process.terminate()
-                    print("[INFO] Terminated current rendering process")
-                except Exception as e:
-                    print(f"[WARN] Could not terminate process: {e}")
+            if self.stop_signal:
+                # The supervisor terminates the process as soon as the event fires
+                loop, stop_event = self.stop_signal
+                loop.call_soon_threadsafe(stop_event.set)
+                print(f"[INFO] Signalled rendering process of render {self.render_id} to stop")
+    
+    def attach_process(self, process, loop: asyncio.AbstractEventLoop, stop_event: asyncio.Event):
+        with self.lock:
+            self.current_process = process
+            self.stop_signal = (loop, stop_event)
+            if self.should_stop:  # Stop requested before the process started
+                stop_event.set()
     
-    def reset(self):
+    def detach_process(self):
         with self.lock:
-            self.should_stop = False
             self.current_process = None
+            self.stop_signal = None
+    
+    def start_render(self, progress, word_count: int):
+        with self.lock:
+            self.progress = progress
+            self.render_start_time = time.time()
+            self.render_word_count = word_count
+    
+    def read_progress(self) -> Optional[Dict[str, Any]]:
+        """Latest progress snapshot of the current render, if any"""
+        with self.lock:
+            progress = self.progress
+        if isinstance(progress, RenderProgress):
+            return progress.snapshot()
+        return RenderProgress.read_snapshot(progress) if progress else None
+    
+    def stop_reason(self) -> Optional[str]:
+        """Reason to abort the in-process render (user stop or GPU overheating), if any"""
+        if self.is_stopped():
+            return "Process stopped by user request"
+        if should_stop_processing():
+            return "Process stopped due to high GPU temperature (>90°C)"
+        return None
     
     def is_stopped(self) -> bool:
         with self.lock:
             return self.should_stop
 
-# Global process controller
-process_controller = ProcessController()
+RENDER_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+class RenderRegistry:
+    """
+    In-flight renders by render id. Renders run concurrently (their sentences share
+    engine batches), so each one has its own controller: starting, finishing or
+    stopping a render never touches the others.
+    """
+    def __init__(self):
+        self.controllers: Dict[str, ProcessController] = {}
+        self.lock = threading.Lock()
+    
+    def begin(self, render_id: Optional[str] = None) -> ProcessController:
+        render_id = render_id or uuid.uuid4().hex
+        # The id also names the render's DOING directory
+        if not RENDER_ID_PATTERN.fullmatch(render_id):
+            raise HTTPException(400, "render_id may only contain letters, digits, '-' and '_' (at most 64)")
+        with self.lock:
+            if render_id in self.controllers:
+                raise HTTPException(409, f"Render '{render_id}' is already running")
+            controller = ProcessController(render_id)
+            self.controllers[render_id] = controller
+        return controller
+    
+    def end(self, controller: ProcessController):
+        with self.lock:
+            if self.controllers.get(controller.render_id) is controller:
+                del self.controllers[controller.render_id]
+    
+    def get(self, render_id: str) -> Optional[ProcessController]:
+        with self.lock:
+            return self.controllers.get(render_id)
+    
+    def active(self) -> List[ProcessController]:
+        """In-flight renders, oldest first"""
+        with self.lock:
+            return list(self.controllers.values())
+
+render_registry = RenderRegistry()
+
+# In-process inference engine (loaded at startup when INFERENCE_MODE is "inprocess")
+ENGINE_CONFIG = {
+    "model_dir": MODEL_DIR,
+    "checkpoint_name": CHECKPOINT_NAME,
+    "model_name": ZIPVOICE_DEFAULTS["model_name"],
+    "tokenizer": ZIPVOICE_DEFAULTS["tokenizer"],
+    "lang": ZIPVOICE_DEFAULTS["lang"],
+    "compile_decoder": DECODER_COMPILE or None,
+    "batch_max_frames": BATCH_MAX_FRAMES,
+    "batch_max_wait_ms": BATCH_MAX_WAIT_MS,
+    "vocoder_path": VOCODER_PATH
+}
+# Warm worker pool (started at startup when INFERENCE_MODE is "pool")
+# Both are created on first use: importing them pulls in torch and the model code,
+# which would otherwise hold up the API (and the subprocess mode never needs them).
+inference_engine = None
+worker_pool = None
+inference_lock = threading.Lock()
+
+def get_inference_engine():
+    """In-process InferenceEngine, created on first use"""
+    global inference_engine
+    with inference_lock:
+        if inference_engine is None:
+            from engine import InferenceEngine
+            inference_engine = InferenceEngine(**ENGINE_CONFIG)
+    return inference_engine
+
+def get_worker_pool():
+    """Warm WorkerPool, created (not started) on first use"""
+    global worker_pool
+    with inference_lock:
+        if worker_pool is None:
+            from worker_pool import WorkerPool
+            worker_pool = WorkerPool(WORKER_POOL_SIZE, ENGINE_CONFIG, max_requests=WORKER_MAX_REQUESTS,
+                                     max_rss_mb=WORKER_MAX_RSS_MB, share_weights=WORKER_SHARE_WEIGHTS)
+    return worker_pool
+
+# === EVENT BROADCASTING === #
+
+class EventBroadcaster:
+    """Fan-out of server events to all SSE subscribers from a single producer"""
+    def __init__(self):
+        self.subscribers = set()
+        self.latest = {}  # Last payload per event type, replayed to new subscribers
+        self.loop = None
+        self.lock = threading.Lock()
+    
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+    
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.add(queue)
+            for event, data in self.latest.items():
+                queue.put_nowait((event, data))
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self.lock:
+            self.subscribers.discard(queue)
+    
+    def has_subscribers(self) -> bool:
+        with self.lock:
+            return bool(self.subscribers)
+    
+    def publish(self, event: str, data: Dict[str, Any], replay: bool = True):
+        """Publish an event; safe to call from worker threads"""
+        with self.lock:
+            if replay:
+                self.latest[event] = data
+            queues = list(self.subscribers)
+        if self.loop is None or not queues:
+            return
+        for queue in queues:
+            self.loop.call_soon_threadsafe(self._enqueue, queue, event, data)
+    
+    @staticmethod
+    def _enqueue(queue: asyncio.Queue, event: str, data: Dict[str, Any]):
+        # Slow clients lose their oldest events instead of growing memory
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait((event, data))
+
+event_broadcaster = EventBroadcaster()
 
 # === FASTAPI APP SETUP === #
 
@@ -229,73 +489,166 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# === UTILITY FUNCTIONS === #
+# === RENDER HISTORY STORE === #
 
-def load_data_log() -> List[Dict[str, Any]]:
-    """Load rendering history from lightweight JSON database"""
-    try:
-        if os.path.exists(DATA_LOG_FILE):
+class RenderStore:
+    """
+    Render history in SQLite (WAL mode): renders, per-sentence timings and cache references.
+    Lookups by id go through a unique index and pages are read newest-first from the
+    rowid order, so neither downloads nor /recent_renders scan the whole history.
+    """
+    RECORD_COLUMNS = ["id", "timestamp", "text", "full_text_preview", "profile_id",
+                      "audio_path", "word_count", "processing_time", "file_size", "cache_ref"]
+    
+    def __init__(self, db_path: str, retention: int):
+        self.db_path = db_path
+        self.retention = retention
+        self.conn = None
+        self.lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS renders (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    timestamp TEXT NOT NULL,
+                    text TEXT,
+                    full_text_preview TEXT,
+                    profile_id TEXT,
+                    audio_path TEXT,
+                    word_count INTEGER,
+                    processing_time REAL,
+                    file_size INTEGER,
+                    cache_ref TEXT
+                );
+                CREATE TABLE IF NOT EXISTS sentence_timings (
+                    render_id TEXT NOT NULL REFERENCES renders(id) ON DELETE CASCADE,
+                    idx INTEGER NOT NULL,
+                    text TEXT,
+                    t REAL,
+                    t_vocoder REAL,
+                    wav_seconds REAL,
+                    rtf REAL,
+                    PRIMARY KEY (render_id, idx)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS renders_profile ON renders(profile_id, seq);
+            """)
+            self.conn = conn
+            self._migrate_json_log()
+        return self.conn
+    
+    def _migrate_json_log(self):
+        """One-time import of the legacy /data/data.json history"""
+        if not os.path.exists(DATA_LOG_FILE):
+            return
+        try:
             with open(DATA_LOG_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"[WARN] Failed to load data log: {e}")
-    return []
-
-def save_data_log(data: List[Dict[str, Any]]) -> None:
-    """Save rendering history to lightweight JSON database"""
-    try:
-        # Ensure data directory exists
-        os.makedirs(os.path.dirname(DATA_LOG_FILE), exist_ok=True)
-        with open(DATA_LOG_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    except IOError as e:
-        print(f"[WARN] Failed to save data log: {e}")
-
-def add_render_record(text: str, profile_id: str, audio_path: str, word_count: int, processing_time: float) -> None:
-    """Add a new render record to the data log with automatic cleanup of old records"""
+                legacy = json.load(f)
+            legacy = legacy if isinstance(legacy, list) else []
+            with self.conn:
+                # Legacy log is newest first; insert oldest first to keep order
+                for record in reversed(legacy):
+                    self.conn.execute(
+                        f"INSERT OR IGNORE INTO renders ({', '.join(self.RECORD_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(self.RECORD_COLUMNS))})",
+                        [record.get(c) for c in self.RECORD_COLUMNS]
+                    )
+            os.replace(DATA_LOG_FILE, DATA_LOG_FILE + ".migrated")
+            print(f"[INFO] Migrated {len(legacy)} render records from {DATA_LOG_FILE}")
+        except (json.JSONDecodeError, IOError, sqlite3.Error) as e:
+            print(f"[WARN] Failed to migrate legacy data log: {e}")
+    
+    def add(self, record: Dict[str, Any], sentence_timings: Optional[List[Dict[str, Any]]] = None) -> None:
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    f"INSERT INTO renders ({', '.join(self.RECORD_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(self.RECORD_COLUMNS))})",
+                    [record.get(c) for c in self.RECORD_COLUMNS]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sentence_timings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(record["id"], t.get("index"), t.get("text"), t.get("t"),
+                      t.get("t_vocoder"), t.get("wav_seconds"), t.get("rtf"))
+                     for t in sentence_timings or []]
+                )
+                # Retention: drop everything older than the newest `retention` records
+                conn.execute(
+                    "DELETE FROM renders WHERE seq <= "
+                    "(SELECT seq FROM renders ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                    (self.retention,)
+                )
+    
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self._connect().execute(
+                f"SELECT {', '.join(self.RECORD_COLUMNS)} FROM renders WHERE id = ?", (record_id,)
+            ).fetchone()
+        return dict(row) if row else None
+    
+    def get_sentence_timings(self, record_id: str) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self._connect().execute(
+                "SELECT idx AS 'index', text, t, t_vocoder, wav_seconds, rtf "
+                "FROM sentence_timings WHERE render_id = ? ORDER BY idx", (record_id,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+    
+    def page(self, page: int, per_page: int) -> tuple:
+        """Return (records, total_records) for a newest-first page"""
+        with self.lock:
+            conn = self._connect()
+            total = conn.execute("SELECT COUNT(*) FROM renders").fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {', '.join(self.RECORD_COLUMNS)} FROM renders ORDER BY seq DESC LIMIT ? OFFSET ?",
+                (per_page, (page - 1) * per_page)
+            ).fetchall()
+        return [dict(r) for r in rows], total
+
+render_store = RenderStore(RENDER_DB_FILE, RENDER_HISTORY_RETENTION)
+
+def add_render_record(text: str, profile_id: str, audio_path: str, word_count: int, processing_time: float,
+                      sentence_timings: Optional[List[Dict[str, Any]]] = None,
+                      cache_ref: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Add a new render record (and its per-sentence timings) to the render history"""
     try:
-        data_log = load_data_log()
-        
-        # Create new record
+        now = datetime.datetime.now()
         record = {
-            "id": datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3],  # Unique ID with milliseconds
-            "timestamp": datetime.datetime.now().isoformat(),
+            "id": f"{now.strftime('%Y%m%d_%H%M%S_%f')[:-3]}_{uuid.uuid4().hex[:6]}",  # Unique ID with milliseconds
+            "timestamp": now.isoformat(),
             "text": text[:200] + "..." if len(text) > 200 else text,  # Truncate long text for storage
             "full_text_preview": text[:50] + "..." if len(text) > 50 else text,  # Short preview
             "profile_id": profile_id,
             "audio_path": audio_path,
             "word_count": word_count,
             "processing_time": processing_time,
-            "file_size": os.path.getsize(audio_path) if os.path.exists(audio_path) else 0
+            "file_size": os.path.getsize(audio_path) if os.path.exists(audio_path) else 0,
+            "cache_ref": cache_ref
         }
         
-        # Add to beginning of list (most recent first)
-        data_log.insert(0, record)
-        
-        # Clean up old records: if more than 50 records, keep only the most recent 50
-        if len(data_log) > 50:
-            data_log = data_log[:50]
-            print(f"[INFO] Cleaned up old records, keeping only the most recent 50 entries")
-        
-        save_data_log(data_log)
+        render_store.add(record, sentence_timings)
         print(f"[LOG] Added render record: {record['id']} ({word_count} words, {processing_time:.1f}s)")
+        return record
         
     except Exception as e:
         print(f"[WARN] Failed to add render record: {e}")
+        return None
 
 def get_recent_renders(page: int = 1, per_page: int = 10) -> Dict[str, Any]:
-    """Get paginated list of recent renders (keeps most recent 50 records)"""
+    """Get paginated list of recent renders (newest first)"""
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), 100)
     try:
-        data_log = load_data_log()
-        
-        # Calculate pagination
-        total_records = len(data_log)
+        page_records, total_records = render_store.page(page, per_page)
         total_pages = max(1, (total_records + per_page - 1) // per_page)
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        
-        page_records = data_log[start_idx:end_idx]
         
         return {
             "records": page_records,
@@ -322,203 +675,552 @@ def get_recent_renders(page: int = 1, per_page: int = 10) -> Dict[str, Any]:
             }
         }
 
-def load_profiles() -> Dict[str, Any]:
-    """Load voice profile metadata from JSON storage"""
-    profiles_file = Path(DATA_DIR) / "profiles.json"
-    if profiles_file.exists():
+# === PROFILE REGISTRY === #
+
+class ProfileRegistry:
+    """
+    In-memory voice profile registry backed by /data/profiles.json.
+    The file is parsed only when its mtime changes (edits by other processes are
+    picked up on the next access) and is persisted with write-and-rename, so a crash
+    never leaves a truncated file. Per-profile artifacts (trimmed prompt, prompt
+    duration, and anything the inference engine derives from them) are cached here,
+    keyed on the sample files and frame budget, so request handling parses no JSON.
+    """
+    def __init__(self, profiles_file: Path):
+        self.profiles_file = profiles_file
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self.mtime = None
+        self.artifacts: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.RLock()
+    
+    def _refresh(self):
+        """Reload profiles.json if it changed on disk"""
         try:
-            with open(profiles_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"[WARN] Failed to load profiles: {e}")
-    return {}
+            mtime = self.profiles_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self.mtime:
+            return
+        profiles = {}
+        if mtime is not None:
+            try:
+                with open(self.profiles_file, "r", encoding="utf-8") as f:
+                    profiles = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"[WARN] Failed to load profiles: {e}")
+                return
+        self.profiles = profiles
+        self.mtime = mtime
+        # Drop artifacts of removed profiles; the rest are revalidated on access
+        self.artifacts = {k: v for k, v in self.artifacts.items() if k in profiles}
+    
+    def _persist(self, profiles: Dict[str, Dict[str, Any]]):
+        """Atomically write profiles.json (temp file + rename)"""
+        self.profiles_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.profiles_file.with_suffix(".json.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(profiles, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.profiles_file)
+        except IOError as e:
+            print(f"[ERROR] Failed to save profiles: {e}")
+            raise HTTPException(500, f"Failed to save profile metadata: {str(e)}")
+        self.profiles = profiles
+        self.mtime = self.profiles_file.stat().st_mtime_ns
+    
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            self._refresh()
+            return {k: dict(v) for k, v in self.profiles.items()}
+    
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            self._refresh()
+            info = self.profiles.get(profile_id)
+            return dict(info) if info is not None else None
+    
+    def add(self, profile_id: str, info: Dict[str, Any]):
+        with self.lock:
+            self._refresh()
+            profiles = dict(self.profiles)
+            profiles[profile_id] = info
+            self._persist(profiles)
+    
+    def remove(self, profile_id: str):
+        with self.lock:
+            self._refresh()
+            profiles = {k: v for k, v in self.profiles.items() if k != profile_id}
+            self._persist(profiles)
+            self.artifacts.pop(profile_id, None)
+    
+    def _artifact_key(self, info: Dict[str, Any]) -> tuple:
+        profile_dir = Path(info["path"])
+        wav_stat = (profile_dir / "sample.wav").stat()
+        txt_stat = (profile_dir / "sample.txt").stat()
+        return (wav_stat.st_mtime_ns, wav_stat.st_size, txt_stat.st_mtime_ns, get_prompt_frame_budget(info))
+    
+    def get_artifacts(self, profile_id: str) -> Dict[str, Any]:
+        """
+        Precomputed artifacts of a profile: prompt_wav, prompt_text, prompt_frames,
+        prompt_seconds. Rebuilt when the sample files or the frame budget change.
+        """
+        with self.lock:
+            self._refresh()
+            info = self.profiles.get(profile_id)
+            if info is None:
+                raise HTTPException(404, f"Voice profile '{profile_id}' not found")
+            key = self._artifact_key(info)
+            cached = self.artifacts.get(profile_id)
+            if cached is not None and cached["key"] == key:
+                return cached
+            prompt = prepare_profile_prompt(info)
+            cached = {
+                "key": key,
+                "prompt_wav": prompt["prompt_wav"],
+                "prompt_text": prompt["prompt_text"],
+                "prompt_frames": prompt["prompt_frames"],
+                "prompt_seconds": prompt["end_seconds"] - prompt["start_seconds"]
+            }
+            self.artifacts[profile_id] = cached
+            return cached
+    
+    def set_artifact(self, profile_id: str, name: str, value: Any):
+        """Attach a derived artifact (e.g. prompt features or tokens) to a profile's cache entry"""
+        with self.lock:
+            if profile_id in self.artifacts:
+                self.artifacts[profile_id][name] = value
+
+profile_registry = ProfileRegistry(Path(DATA_DIR) / "profiles.json")
 
-def save_profiles(profiles: Dict[str, Any]) -> None:
-    """Save voice profile metadata to JSON storage"""
-    profiles_file = Path(DATA_DIR) / "profiles.json"
+# === UTILITY FUNCTIONS === #
+
+async def terminate_process(process: asyncio.subprocess.Process):
+    """Terminate a supervised process, killing it if it does not exit within 10s"""
+    if process.returncode is not None:
+        return
+    process.terminate()
     try:
-        profiles_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(profiles_file, "w", encoding="utf-8") as f:
-            json.dump(profiles, f, indent=2, ensure_ascii=False)
-    except IOError as e:
-        print(f"[ERROR] Failed to save profiles: {e}")
-        raise HTTPException(500, f"Failed to save profile metadata: {str(e)}")
-
-def run_command_with_monitoring(cmd: List[str], timeout: int = 300, **kwargs) -> subprocess.CompletedProcess:
-    """Execute system command with GPU monitoring and timeout - increased timeout for longer texts"""
-    print(f"[CMD] {' '.join(cmd)}")
+        await asyncio.wait_for(process.wait(), timeout=10)
+    except asyncio.TimeoutError:
+        print("[FORCE] Force killing process")
+        process.kill()
+        await process.wait()
+
+async def supervise_command(cmd: List[str], timeout: int, controller: ProcessController, on_line=None,
+                            **kwargs) -> subprocess.CompletedProcess:
+    """
+    Run a command under asyncio supervision: process exit is awaited, stdout/stderr lines are
+    streamed as they arrive (and passed to `on_line`), and user stop, GPU overheating and
+    timeout are awaited as events that terminate the process immediately. The process is
+    attached to the render's `controller`, so stopping that render terminates it.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        **kwargs
+    )
+    stop_event = asyncio.Event()
+    controller.attach_process(process, asyncio.get_running_loop(), stop_event)
+    stdout_lines, stderr_lines = [], []
+    
+    async def pump(stream, lines: List[str], tag: str):
+        async for raw in stream:
+            line = raw.decode("utf-8", errors="replace").rstrip()
+            lines.append(line)
+            print(f"[{tag}] {line}")
+            if on_line is not None:
+                try:
+                    on_line(line)
+                except Exception as e:
+                    print(f"[WARN] Output line handler failed: {e}")
+    
+    async def thermal_watch():
+        # Readings come from the shared telemetry cache, refreshed at most once per interval
+        while not await asyncio.to_thread(should_stop_processing):
+            await asyncio.sleep(TELEMETRY_INTERVAL)
+    
+    pumps = asyncio.gather(
+        pump(process.stdout, stdout_lines, "STDOUT"),
+        pump(process.stderr, stderr_lines, "STDERR")
+    )
+    exited = asyncio.ensure_future(process.wait())
+    stopped = asyncio.ensure_future(stop_event.wait())
+    overheated = asyncio.ensure_future(thermal_watch())
     
     try:
-        # Start the process
-        process = subprocess.Popen(
-            cmd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding='utf-8',
-            **kwargs
-        )
-        
-        # Store process reference for potential termination
-        with process_controller.lock:
-            process_controller.current_process = process
-        
-        start_time = time.time()
-        
-        # Monitor process with GPU checks
-        while True:
-            # Check if process finished
-            if process.poll() is not None:
-                break
-            
-            # Check for stop signal
-            if process_controller.is_stopped():
+        done, _ = await asyncio.wait({exited, stopped, overheated}, timeout=timeout,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        if exited not in done:
+            if stopped in done:
                 print("[STOP] Terminating process due to user stop request")
-                process.terminate()
-                try:
-                    process.wait(timeout=10)
-                except subprocess.TimeoutExpired:
-                    print("[FORCE] Force killing process")
-                    process.kill()
-                    process.wait()
-                raise Exception("Process stopped by user request")
-            
-            # Check GPU temperature
-            if should_stop_processing():
+                reason = "Process stopped by user request"
+            elif overheated in done:
                 print("[OVERHEAT] Terminating process due to high GPU temperature")
-                process.terminate()
-                try:
-                    process.wait(timeout=10)
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    process.wait()
-                raise Exception("Process stopped due to high GPU temperature (>90°C)")
-            
-            # Check timeout - increased for longer texts
-            if time.time() - start_time > timeout:
+                reason = "Process stopped due to high GPU temperature (>90°C)"
+            else:
                 print(f"[TIMEOUT] Process exceeded {timeout} seconds")
-                process.terminate()
-                try:
-                    process.wait(timeout=10)
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    process.wait()
-                raise Exception(f"Process timeout after {timeout} seconds")
-            
-            # Brief sleep to avoid excessive polling
-            time.sleep(2)
+                reason = f"Process timeout after {timeout} seconds"
+            await terminate_process(process)
+            await pumps
+            raise Exception(reason)
         
-        # Get final output
-        stdout, stderr = process.communicate()
+        await pumps
+        return subprocess.CompletedProcess(cmd, process.returncode, "\n".join(stdout_lines), "\n".join(stderr_lines))
+    
+    finally:
+        for task in (exited, stopped, overheated):
+            task.cancel()
+        await terminate_process(process)
+        controller.detach_process()
+
+def run_command_with_monitoring(cmd: List[str], controller: ProcessController, timeout: int = 300, on_line=None,
+                                **kwargs) -> subprocess.CompletedProcess:
+    """Execute system command with GPU monitoring and timeout - increased timeout for longer texts"""
+    print(f"[CMD] {' '.join(cmd)}")
+    
+    try:
+        # Runs in the request's worker thread, on its own event loop
+        result = asyncio.run(supervise_command(cmd, timeout, controller, on_line=on_line, **kwargs))
         
-        if stdout:
-            print(f"[STDOUT] {stdout}")
-        if stderr:
-            print(f"[STDERR] {stderr}")
-            
-        if process.returncode != 0:
-            error_details = f"Return code: {process.returncode}"
-            if stderr:
-                error_details += f"\nStderr: {stderr}"
-            if stdout:
-                error_details += f"\nStdout: {stdout}"
-            print(f"[PROCESS_ERROR] {error_details}")
+        if result.returncode != 0:
+            print(f"[PROCESS_ERROR] Return code: {result.returncode}")
             raise subprocess.CalledProcessError(
-                process.returncode, cmd, stdout, stderr
+                result.returncode, cmd, result.stdout, result.stderr
             )
         
-        # Create result object
-        result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
         return result
         
     except Exception as e:
         error_msg = f"Command execution failed: {' '.join(cmd)}"
+        if not isinstance(e, subprocess.CalledProcessError):
+            error_msg += f"\n{e}"
         if hasattr(e, 'stderr') and e.stderr:
             error_msg += f"\nStderr: {e.stderr}"
         if hasattr(e, 'stdout') and e.stdout:
             error_msg += f"\nStdout: {e.stdout}"
         print(f"[ERROR] {error_msg}")
         raise Exception(error_msg)
-    
-    finally:
-        # Clean up process reference
-        with process_controller.lock:
-            process_controller.current_process = None
 
-def ensure_prompt_wav(sample_path: str, out_dir: str) -> str:
-    """Convert audio sample to 24kHz mono format for Vietnamese TTS compatibility"""
-    prompt_wav = f"{out_dir}/prompt-24k.wav"
-    
+# === AUDIO DECODING === #
+
+@functools.lru_cache(maxsize=8)
+def get_resampler(orig_freq: int, new_freq: int) -> "torchaudio.transforms.Resample":
+    """Resampling kernel, built once per source rate"""
+    import torchaudio
+    return torchaudio.transforms.Resample(orig_freq=orig_freq, new_freq=new_freq)
+
+def resample_audio(audio: "np.ndarray", orig_freq: int, new_freq: int) -> "np.ndarray":
+    """Resample mono float32 audio in-process"""
+    if orig_freq == new_freq:
+        return audio
+    import torch
+    with torch.inference_mode():
+        resampled = get_resampler(orig_freq, new_freq)(torch.from_numpy(audio).unsqueeze(0))
+    return resampled.squeeze(0).numpy()
+
+def ffmpeg_decode(sample_path: str, sample_rate: int) -> "np.ndarray":
+    """Decode through the ffmpeg CLI (fallback for containers the in-process decoders cannot read)"""
+    import numpy as np
+    cmd = [
+        "ffmpeg", "-v", "error", "-i", sample_path,
+        "-ac", "1",                 # Mono
+        "-ar", str(sample_rate),
+        "-f", "f32le", "-"          # Raw float32 PCM on stdout
+    ]
+    print(f"[CMD] {' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, timeout=120)
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg failed to decode {sample_path}: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32).copy()
+
+def decode_audio(sample_path: str, sample_rate: int = FEATURE_SAMPLE_RATE, allow_ffmpeg: bool = False) -> "np.ndarray":
+    """
+    Decode an audio file (WAV/FLAC/MP3 via libsndfile, M4A via torchaudio) to mono
+    float32 at `sample_rate`. ffmpeg is only tried when `allow_ffmpeg` is set.
+    """
+    import numpy as np
+    import soundfile as sf
     # Verify input file exists
     if not os.path.exists(sample_path):
         raise FileNotFoundError(f"Sample audio file not found: {sample_path}")
     
-    # Convert to 24kHz mono using FFmpeg
-    cmd = [
-        "ffmpeg", "-y", "-i", sample_path,
-        "-ac", "1",      # Mono
-        "-ar", "24000",  # 24kHz sample rate
-        prompt_wav
-    ]
-    
-    run_command_with_monitoring(cmd)
-    
-    # Verify output file was created
-    if not os.path.exists(prompt_wav):
-        raise Exception(f"Failed to create 24kHz audio: {prompt_wav}")
-    
-    print(f"[SUCCESS] Converted audio to 24kHz mono: {prompt_wav}")
-    return prompt_wav
+    try:
+        audio, sr = sf.read(sample_path, dtype="float32", always_2d=True)
+        audio = audio.mean(axis=1)
+    except RuntimeError as sf_error:
+        try:
+            import torchaudio
+            waveform, sr = torchaudio.load(sample_path)
+            audio = waveform.mean(dim=0).numpy()
+        except Exception as ta_error:
+            if not allow_ffmpeg:
+                raise Exception(f"Could not decode {sample_path}: {sf_error}; {ta_error}")
+            print(f"[WARN] In-process decoding failed for {sample_path}, falling back to ffmpeg")
+            return ffmpeg_decode(sample_path, sample_rate)
+    
+    return resample_audio(np.ascontiguousarray(audio, dtype=np.float32), sr, sample_rate)
+
+# === PROMPT PREPARATION === #
+
+def seconds_to_frames(seconds: float) -> int:
+    """Convert a duration to the number of ZipVoice feature frames"""
+    return int(round(seconds * FEATURE_SAMPLE_RATE / FEATURE_HOP_LENGTH))
+
+def frames_to_seconds(frames: int) -> float:
+    """Convert a number of ZipVoice feature frames to seconds"""
+    return frames * FEATURE_HOP_LENGTH / FEATURE_SAMPLE_RATE
+
+def find_pause_centers(audio: "np.ndarray", sample_rate: int, min_pause: float = 0.15) -> List[float]:
+    """Locate pauses in speech with frame energy analysis, returned as pause centers in seconds"""
+    import numpy as np
+    frame_len = int(0.01 * sample_rate)  # 10ms analysis frames
+    num_frames = len(audio) // frame_len
+    if num_frames == 0:
+        return []
+
+    frames = audio[:num_frames * frame_len].reshape(num_frames, frame_len)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+
+    # Adaptive threshold: above the noise floor but well below the speech level
+    threshold = max(np.percentile(energy_db, 10) + 10.0, np.max(energy_db) - 40.0)
+    silent = energy_db < threshold
+
+    centers = []
+    run_start = None
+    min_run = int(min_pause / 0.01)
+    for i, is_silent in enumerate(np.append(silent, False)):
+        if is_silent and run_start is None:
+            run_start = i
+        elif not is_silent and run_start is not None:
+            if i - run_start >= min_run:
+                centers.append((run_start + i) / 2 * 0.01)
+            run_start = None
+    return centers
+
+def align_phrase_boundaries(text: str, pause_centers: List[float], duration: float,
+                            tolerance: float = 0.6) -> List[tuple]:
+    """
+    Align transcript phrase boundaries (punctuation) to detected pauses.
+    Assumes a roughly uniform speaking rate in characters, then snaps each
+    expected boundary time to the nearest pause. Returns (time, char_index) pairs,
+    including the start and the end of the sample.
+    """
+    boundaries = [(0.0, 0)]
+    total_chars = len(text)
+    if total_chars == 0:
+        return boundaries
+
+    for match in re.finditer(r'[.!?…,;:]+\s*', text):
+        char_index = match.end()
+        if char_index >= total_chars:
+            continue
+        expected_time = duration * char_index / total_chars
+        nearest = min(pause_centers, key=lambda c: abs(c - expected_time), default=None)
+        if nearest is not None and abs(nearest - expected_time) <= tolerance and nearest > boundaries[-1][0]:
+            boundaries.append((nearest, char_index))
+
+    boundaries.append((duration, total_chars))
+    return boundaries
+
+def select_prompt_span(audio: "np.ndarray", sample_rate: int, text: str, max_seconds: float) -> tuple:
+    """
+    Pick the best sub-span of the prompt audio that fits within max_seconds.
+    Candidate spans start and end on aligned phrase boundaries, so the transcript
+    can be cut at the same place. Longer spans with more voiced audio win.
+    Returns (start_sample, end_sample, prompt_text).
+    """
+    import numpy as np
+    duration = len(audio) / sample_rate
+    if duration <= max_seconds:
+        return 0, len(audio), text
+
+    boundaries = align_phrase_boundaries(text, find_pause_centers(audio, sample_rate), duration)
+    peak = np.max(np.abs(audio)) if len(audio) else 0.0
+
+    best = None
+    best_score = -1.0
+    for i in range(len(boundaries)):
+        for j in range(i + 1, len(boundaries)):
+            start_t, start_c = boundaries[i]
+            end_t, end_c = boundaries[j]
+            span_seconds = end_t - start_t
+            if span_seconds > max_seconds:
+                break
+            if span_seconds < PROMPT_MIN_SECONDS:
+                continue
+
+            span = audio[int(start_t * sample_rate):int(end_t * sample_rate)]
+            # Prefer long, steady, unclipped spans
+            clipped_ratio = np.mean(np.abs(span) >= 0.99 * peak) if peak > 0 else 0.0
+            score = span_seconds * (1.0 - min(clipped_ratio * 10, 0.5))
+            if score > best_score:
+                best_score = score
+                best = (int(start_t * sample_rate), int(end_t * sample_rate), text[start_c:end_c].strip())
+
+    if best is None or not best[2]:
+        print(f"[WARN] No aligned prompt span fits {max_seconds:.1f}s, keeping full sample ({duration:.1f}s)")
+        return 0, len(audio), text
+    return best
+
+def get_prompt_frame_budget(profile_info: Dict[str, Any]) -> int:
+    """Get the prompt frame budget for a profile, falling back to the global default"""
+    try:
+        return int(profile_info.get("prompt_frame_budget") or PROMPT_FRAME_BUDGET)
+    except (TypeError, ValueError):
+        return PROMPT_FRAME_BUDGET
+
+def prepare_profile_prompt(profile_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Prepare (and cache) the trimmed 24kHz prompt for a voice profile.
+    The cache lives in the profile directory and is invalidated when the
+    sample audio, the transcript or the frame budget changes.
+    Returns the prompt metadata, including prompt_wav and prompt_text.
+    """
+    import soundfile as sf
+    profile_dir = Path(profile_info["path"])
+    sample_wav_path = profile_dir / "sample.wav"
+    sample_txt_path = profile_dir / "sample.txt"
+    cache_dir = profile_dir / PROMPT_CACHE_DIRNAME
+    meta_path = cache_dir / "prompt.json"
+    prompt_wav_path = cache_dir / "prompt.wav"
+
+    with open(sample_txt_path, "r", encoding="utf-8") as f:
+        sample_text = clean_vietnamese_text(f.read())
+    if not sample_text:
+        raise HTTPException(400, f"Profile '{profile_dir.name}' has empty sample text")
+
+    frame_budget = get_prompt_frame_budget(profile_info)
+    wav_stat = sample_wav_path.stat()
+    cache_key = {
+        "wav_mtime": wav_stat.st_mtime,
+        "wav_size": wav_stat.st_size,
+        "text": sample_text,
+        "frame_budget": frame_budget
+    }
+
+    # Reuse cached prompt if nothing changed
+    if meta_path.exists() and prompt_wav_path.exists():
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("cache_key") == cache_key and "prompt_text" in meta:
+                meta["prompt_wav"] = str(prompt_wav_path)
+                return meta
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"[WARN] Ignoring invalid prompt cache: {e}")
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    sample_rate = FEATURE_SAMPLE_RATE
+    audio = decode_audio(str(sample_wav_path), sample_rate, allow_ffmpeg=True)
+
+    start, end, prompt_text = select_prompt_span(audio, sample_rate, sample_text, frames_to_seconds(frame_budget))
+    sf.write(str(prompt_wav_path), audio[start:end], sample_rate)
+
+    meta = {
+        "cache_key": cache_key,
+        "prompt_text": prompt_text,
+        "start_seconds": start / sample_rate,
+        "end_seconds": end / sample_rate,
+        "prompt_frames": seconds_to_frames((end - start) / sample_rate),
+        "source_seconds": len(audio) / sample_rate
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    print(f"[PROMPT] Prepared prompt for '{profile_dir.name}': {meta['start_seconds']:.2f}s-{meta['end_seconds']:.2f}s "
+          f"({meta['prompt_frames']} frames, budget {frame_budget}) of {meta['source_seconds']:.2f}s sample")
+    meta["prompt_wav"] = str(prompt_wav_path)
+    return meta
+
+vietnamese_normalizer = VietnameseTextNormalizer()  # Tables are compiled once
 
 def clean_vietnamese_text(text: str) -> str:
-    """Clean and normalize Vietnamese text while preserving diacritics"""
+    """
+    Clean and normalize Vietnamese text while preserving diacritics: annotations and emojis
+    are stripped, spacing is tidied and numbers/dates/currencies/abbreviations are spelled out,
+    in one pass (same normalizer the espeak tokenizer uses)
+    """
     if not text:
         return ""
-    
-    # Strip whitespace and normalize
-    text = text.strip()
-    
-    # Remove parenthetical annotations (including Chinese characters, explanations, etc.)
-    # Matches: (content), [content], （content）
-    text = re.sub(r'[(\[（][^)\]）]*[)\]）]', '', text)
-    
-    # SIMPLIFIED emoji removal - only target specific problematic emojis
-    # Remove only clear emojis that are not Vietnamese text
-    text = re.sub(r'[👉👈👆👇→←↑↓➡️⬅️⬆️⬇️▶️◀️▲▼]', '', text)
-    
-    # Remove specific emoji ranges that don't conflict with Vietnamese
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons  
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-        "]+", flags=re.UNICODE)
-    text = emoji_pattern.sub('', text)
-    
-    # Normalize multiple whitespace to single space
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Clean up spacing around punctuation
-    text = re.sub(r'\s*([.!?…,;:])\s*', r'\1 ', text)
-    
-    # Remove extra spaces at beginning of lines
-    text = re.sub(r'^\s+', '', text, flags=re.MULTILINE)
-    
-    # Remove trailing spaces and clean up final result
-    text = re.sub(r'\s+$', '', text)
-    text = text.strip()
-    
-    return text
+    return vietnamese_normalizer.normalize(text)
+
+# Clause boundaries for splitting an overlong sentence, strongest first; whitespace is the last resort
+CLAUSE_SPLITTERS = [
+    re.compile(r'(?<=[,;:])\s+'),
+    re.compile(r'\s+(?=(?:' + '|'.join(SEGMENT_CONJUNCTIONS) + r')\s)'),
+    re.compile(r'\s+')
+]
+
+def prompt_frames_per_char(prompt_artifacts: Dict[str, Any]) -> float:
+    """Speaking rate of a profile prompt (feature frames per text character), same ratio ZipVoice uses for duration"""
+    prompt_text = prompt_artifacts.get("prompt_text") or ""
+    prompt_frames = prompt_artifacts.get("prompt_frames") or 0
+    if not prompt_text or not prompt_frames:
+        return DEFAULT_FRAMES_PER_CHAR
+    # Clamp: a prompt with long silences or a truncated transcript would skew every estimate
+    return min(max(prompt_frames / len(prompt_text), 3.0), 15.0)
+
+def split_long_segment(text: str, max_chars: int, level: int = 0) -> List[str]:
+    """Break an overlong sentence at the strongest boundary available, packing the pieces up to max_chars"""
+    if len(text) <= max_chars or level == len(CLAUSE_SPLITTERS):
+        return [text]
+    
+    chunks = []
+    current = ""
+    for piece in CLAUSE_SPLITTERS[level].split(text):
+        candidate = f"{current} {piece}" if current else piece
+        if current and len(candidate) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    
+    # Pieces still too long (no boundary of this kind inside) go to the next weaker boundary
+    result = []
+    for chunk in chunks:
+        result.extend(split_long_segment(chunk, max_chars, level + 1))
+    return result
 
-def split_vietnamese_sentences(text: str) -> List[str]:
-    """Split Vietnamese text into sentences for optimal processing (based on refer/simple-index.py)"""
+def merge_short_segments(segments: List[str], min_chars: int, max_chars: int) -> List[str]:
+    """Join fragments shorter than min_chars with their predecessor while the result stays within max_chars"""
+    merged = []
+    for segment in segments:
+        if (merged and (len(merged[-1]) < min_chars or len(segment) < min_chars)
+                and len(merged[-1]) + 1 + len(segment) <= max_chars):
+            merged[-1] = f"{merged[-1]} {segment}"
+        else:
+            merged.append(segment)
+    return merged
+
+def split_vietnamese_sentences(text: str, frames_per_char: float = DEFAULT_FRAMES_PER_CHAR,
+                               max_frames: int = SEGMENT_MAX_FRAMES, min_frames: int = SEGMENT_MIN_FRAMES) -> List[str]:
+    """
+    Split Vietnamese text into synthesis segments (based on refer/simple-index.py).
+    Sentences longer than max_frames (estimated at frames_per_char) are split at commas,
+    semicolons and conjunctions; fragments shorter than min_frames are merged with a neighbour.
+    """
     if not text:
         return []
     
     # Split on sentence boundaries while preserving punctuation
     sentence_endings = r'(?<=[.!?…])\s+'
-    parts = [p.strip() for p in re.split(sentence_endings, text) if p.strip()]
+    sentences = [p.strip() for p in re.split(sentence_endings, text) if p.strip()]
+    
+    # Keep every segment near the frame budget
+    max_chars = max(int(max_frames / frames_per_char), 1)
+    min_chars = int(min_frames / frames_per_char)
+    parts = []
+    for sentence in sentences:
+        pieces = split_long_segment(sentence, max_chars)
+        if len(pieces) > 1:
+            print(f"[INFO] Split a {len(sentence)}-character sentence into {len(pieces)} segments")
+        parts.extend(pieces)
+    parts = merge_short_segments(parts, min_chars, max_chars)
     
     # Handle edge case where text doesn't end with punctuation
     if not parts:
@@ -549,11 +1251,12 @@ def split_vietnamese_sentences(text: str) -> List[str]:
     print(f"[INFO] Split into {len(filtered_parts)} sentences for processing")
     return filtered_parts
 
-def create_doing_directory() -> str:
-    """Create timestamped directory in DOING folder for processing"""
+def create_doing_directory(render_id: str) -> str:
+    """Create a timestamped directory of one render in the DOING folder"""
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    doing_dir = f"{DOING_DIR}/{timestamp}"
-    os.makedirs(doing_dir, exist_ok=True)
+    # The render id keeps renders started in the same second apart
+    doing_dir = f"{DOING_DIR}/{timestamp}_{render_id}"
+    os.makedirs(doing_dir)
     print(f"[INFO] Created processing directory: {doing_dir}")
     return doing_dir
 
@@ -571,8 +1274,8 @@ def cleanup_old_doing_folders():
             
             if os.path.isdir(item_path):
                 try:
-                    # Parse timestamp from folder name (format: YYYY-MM-DD_HH-MM-SS)
-                    folder_time = datetime.datetime.strptime(item, "%Y-%m-%d_%H-%M-%S")
+                    # Parse timestamp from folder name (format: YYYY-MM-DD_HH-MM-SS_<render id>)
+                    folder_time = datetime.datetime.strptime(item[:19], "%Y-%m-%d_%H-%M-%S")
                     
                     # Delete if older than cutoff
                     if folder_time < cutoff_date:
@@ -593,8 +1296,8 @@ def build_vietnamese_tsv(out_dir: str, prompt_text: str, prompt_wav: str, senten
     try:
         with open(tsv_path, "w", encoding="utf-8", newline="") as f:
             for i, sentence in enumerate(sentences, 1):
-                # Clean sentence text
-                clean_sentence = clean_vietnamese_text(sentence)
+                # Sentences come from already normalized text
+                clean_sentence = sentence.strip()
                 if not clean_sentence:
                     continue
                 
@@ -634,7 +1337,8 @@ def build_vietnamese_tsv(out_dir: str, prompt_text: str, prompt_wav: str, senten
     except (IOError, UnicodeError) as e:
         raise Exception(f"Failed to create TSV file: {str(e)}")
 
-def vietnamese_sentence_inference(out_dir: str, tsv_path: str, total_sentences: int = 0) -> None:
+def vietnamese_sentence_inference(out_dir: str, tsv_path: str, controller: ProcessController,
+                                  total_sentences: int = 0) -> None:
     """Execute Vietnamese TTS inference using ZipVoice defaults (no advanced parameters)"""
     
     # Validate inputs
@@ -668,6 +1372,7 @@ def vietnamese_sentence_inference(out_dir: str, tsv_path: str, total_sentences:
     })
     
     # Construct ZipVoice command with ONLY default parameters (no advanced settings)
+    # Progress (sentence, solver step, vocoder stage) is published to a JSON file
     cmd = [
         "python3", "-m", "zipvoice.bin.infer_zipvoice",
         "--model-name", ZIPVOICE_DEFAULTS["model_name"],
@@ -676,7 +1381,8 @@ def vietnamese_sentence_inference(out_dir: str, tsv_path: str, total_sentences:
         "--tokenizer", ZIPVOICE_DEFAULTS["tokenizer"],
         "--lang", ZIPVOICE_DEFAULTS["lang"],
         "--test-list", tsv_path,
-        "--res-dir", out_dir
+        "--res-dir", out_dir,
+        "--progress-file", f"{out_dir}/progress.json"
     ]
     
     # Log each sentence being processed
@@ -685,12 +1391,18 @@ def vietnamese_sentence_inference(out_dir: str, tsv_path: str, total_sentences:
     
     print(f"[INFO] Starting Vietnamese TTS inference with ZipVoice defaults")
     
+    def on_inference_line(line: str):
+        # A finished sentence is logged as "[Sentence: i] RTF: ..."; push progress right away
+        if "[Sentence:" in line:
+            event_broadcaster.publish("render_status", get_render_status().model_dump())
+    
     try:
         # Use monitoring version with longer timeout for sentence processing
         # Calculate timeout based on number of sentences (30 seconds per sentence minimum)
         sentence_timeout = max(300, len(sentences_to_process) * 30)
         print(f"[INFO] Setting timeout to {sentence_timeout} seconds for {len(sentences_to_process)} sentences")
-        run_command_with_monitoring(cmd, timeout=sentence_timeout, cwd=ZIPVOICE_DIR, env=env)
+        run_command_with_monitoring(cmd, controller, timeout=sentence_timeout, on_line=on_inference_line,
+                                    cwd=ZIPVOICE_DIR, env=env)
         print(f"[SUCCESS] Vietnamese TTS inference completed successfully")
         
     except Exception as e:
@@ -698,86 +1410,212 @@ def vietnamese_sentence_inference(out_dir: str, tsv_path: str, total_sentences:
         print(f"[ERROR] {error_msg}")
         raise HTTPException(500, error_msg)
 
-def merge_vietnamese_segments(out_dir: str) -> str:
-    """Merge generated audio segments into final Vietnamese speech output"""
+# === AUDIO MERGING === #
+
+class SegmentMerger:
+    """
+    Streams segments to the output file as they arrive, so memory stays at one
+    segment regardless of the total length. Loudness follows a running RMS target
+    (smoothed across segments so sentences keep their relative dynamics), and a
+    block-wise peak limiter keeps each chunk under the ceiling without a global pass.
+    """
+    def __init__(self, final_path: str, sample_rate: int, output_format: str = "wav"):
+        import numpy as np
+        import soundfile as sf
+        self.sample_rate = sample_rate
+        self.pause = np.zeros(int(SENTENCE_PAUSE_SECONDS * sample_rate), dtype=np.float32)
+        self.block = max(1, int(LIMITER_BLOCK_SECONDS * sample_rate))
+        self.gain = None
+        self.num_segments = 0
+        self.num_samples = 0
+        container, subtype = OUTPUT_FORMATS[output_format][:2]
+        self.writer = sf.SoundFile(final_path, "w", samplerate=sample_rate, channels=1,
+                                   format=container, subtype=subtype)
+    
+    def _loudness_gain(self, audio: "np.ndarray") -> float:
+        import numpy as np
+        rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+        if rms < 1e-4:  # Near-silent segment: keep the current gain
+            return self.gain if self.gain is not None else 1.0
+        target_gain = min(LOUDNESS_TARGET_RMS / rms, LOUDNESS_MAX_GAIN)
+        # Louder segment: follow immediately (the limiter should not do the work),
+        # quieter segment: raise the gain gradually
+        if self.gain is None or target_gain < self.gain:
+            return target_gain
+        return (1 - LOUDNESS_SMOOTHING) * self.gain + LOUDNESS_SMOOTHING * target_gain
+    
+    def _limit(self, audio: "np.ndarray") -> "np.ndarray":
+        """Per-block gain reduction, linearly interpolated between blocks to avoid clicks"""
+        import numpy as np
+        num_blocks = -(-len(audio) // self.block)
+        padded = np.pad(np.abs(audio), (0, num_blocks * self.block - len(audio)))
+        block_peak = padded.reshape(num_blocks, self.block).max(axis=1)
+        if block_peak.max() <= LIMITER_CEILING:
+            return audio
+        block_gain = np.minimum(1.0, LIMITER_CEILING / np.maximum(block_peak, 1e-9))
+        # A block's gain also applies to its neighbours so the ramps never overshoot
+        # (edge-padded: the first and last blocks have a single neighbour)
+        neighbours = np.pad(block_gain, 1, mode="edge")
+        block_gain = np.minimum(block_gain, np.minimum(neighbours[:-2], neighbours[2:]))
+        centers = np.arange(num_blocks) * self.block + self.block / 2
+        envelope = np.interp(np.arange(len(audio)), centers, block_gain)
+        return np.clip(audio * envelope, -LIMITER_CEILING, LIMITER_CEILING).astype(np.float32, copy=False)
+    
+    def add(self, audio: "np.ndarray"):
+        import numpy as np
+        # Convert stereo to mono if necessary
+        if audio.ndim == 2:
+            audio = audio[:, 0]
+        
+        # Validate audio data
+        if len(audio) == 0:
+            print(f"[WARN] Empty audio segment {self.num_segments + 1}")
+            return
+        
+        self.gain = self._loudness_gain(audio)
+        chunk = self._limit(audio.astype(np.float32) * np.float32(self.gain))
+        
+        # Pause before each segment except the first one
+        if self.num_segments > 0:
+            self.writer.write(self.pause)
+            self.num_samples += len(self.pause)
+        self.writer.write(chunk)
+        self.num_samples += len(chunk)
+        self.num_segments += 1
+    
+    def close(self) -> float:
+        """Finish the file and return its duration in seconds"""
+        self.writer.close()
+        return self.num_samples / self.sample_rate
+
+def merge_audio_segments(segments, sample_rate: int, final_path: str, output_format: str = "wav") -> float:
+    """
+    Merge audio segments (any iterable, consumed lazily) with natural pauses into the final file.
+    Returns the total duration in seconds.
+    """
+    merger = SegmentMerger(final_path, sample_rate, output_format)
+    try:
+        for audio_data in segments:
+            merger.add(audio_data)
+    finally:
+        total_duration = merger.close()
     
-    # Find all generated segment files
-    segment_pattern = "seg_*.wav"
-    wav_files = sorted(Path(out_dir).glob(segment_pattern))
+    if merger.num_segments == 0:
+        raise Exception("No valid audio segments to merge")
+    
+    # Calculate total duration for logging
+    pause_duration_total = (merger.num_segments - 1) * SENTENCE_PAUSE_SECONDS
+    
+    print(f"[SUCCESS] Created final Vietnamese audio: {final_path} ({merger.num_segments} segments)")
+    print(f"[INFO] Total duration: {total_duration:.2f}s (audio: {total_duration - pause_duration_total:.2f}s, pauses: {pause_duration_total:.2f}s)")
+    return total_duration
+
+def merge_vietnamese_segments(out_dir: str, final_path: str, output_format: str = "wav") -> float:
+    """Merge the segment wavs written by the inference subprocess (subprocess mode)"""
+    import soundfile as sf
+    wav_files = sorted(Path(out_dir).glob("seg_*.wav"))
     
     if not wav_files:
         raise Exception(f"No audio segments found in {out_dir}")
     
     print(f"[INFO] Merging {len(wav_files)} Vietnamese audio segments with natural pauses")
+    sample_rate = sf.info(str(wav_files[0])).samplerate
     
-    # Process and concatenate segments with pauses
-    sample_rate = None
-    audio_chunks = []
-    pause_duration = 0.5  # 500ms pause between sentences for natural speech flow
-    
-    for i, wav_file in enumerate(wav_files):
-        try:
-            audio_data, sr = sf.read(str(wav_file))
-            
-            # Validate sample rate consistency
-            if sample_rate is None:
-                sample_rate = sr
-                # Create pause silence array once we know the sample rate
-                pause_samples = int(pause_duration * sample_rate)
-                pause_silence = np.zeros(pause_samples, dtype=audio_data.dtype)
-                print(f"[INFO] Adding {pause_duration}s pauses between sentences ({pause_samples} samples at {sample_rate}Hz)")
-            elif sr != sample_rate:
-                raise Exception(f"Sample rate mismatch: {wav_file} has {sr}Hz, expected {sample_rate}Hz")
-            
-            # Convert stereo to mono if necessary
-            if audio_data.ndim == 2:
-                audio_data = audio_data[:, 0]
-            
-            # Validate audio data
-            if len(audio_data) == 0:
-                print(f"[WARN] Empty audio segment: {wav_file}")
+    def read_segments():
+        """Read segments one at a time so only one is held in memory"""
+        for wav_file in wav_files:
+            try:
+                audio_data, sr = sf.read(str(wav_file), dtype="float32")
+                
+                # Validate sample rate consistency
+                if sr != sample_rate:
+                    raise Exception(f"Sample rate mismatch: {wav_file} has {sr}Hz, expected {sample_rate}Hz")
+                yield audio_data
+                
+            except Exception as e:
+                print(f"[WARN] Failed to process segment {wav_file}: {e}")
                 continue
-            
-            # Add the audio segment
-            audio_chunks.append(audio_data)
-            
-            # Add pause after each segment except the last one
-            if i < len(wav_files) - 1:
-                audio_chunks.append(pause_silence.copy())
-                print(f"[PAUSE] Added {pause_duration}s pause after segment {i+1}/{len(wav_files)}")
-            
-        except Exception as e:
-            print(f"[WARN] Failed to process segment {wav_file}: {e}")
-            continue
-    
-    if not audio_chunks:
-        raise Exception("No valid audio segments to merge")
-    
-    # Concatenate all segments with pauses
-    final_audio = np.concatenate(audio_chunks)
-    
-    # Normalize audio level
-    if len(final_audio) > 0:
-        max_val = np.max(np.abs(final_audio))
-        if max_val > 0:
-            final_audio = final_audio / max_val * 0.95  # Prevent clipping
-    
-    # Save final Vietnamese audio
-    final_path = f"{out_dir}/vietnamese_final.wav"
-    sf.write(final_path, final_audio, sample_rate)
-    
-    # Verify output file
-    if not os.path.exists(final_path) or os.path.getsize(final_path) == 0:
-        raise Exception("Failed to create final audio file")
     
-    # Calculate total duration for logging
-    total_duration = len(final_audio) / sample_rate
-    audio_duration = total_duration - (len(wav_files) - 1) * pause_duration
-    pause_duration_total = (len(wav_files) - 1) * pause_duration
-    
-    print(f"[SUCCESS] Created final Vietnamese audio: {final_path} ({len(wav_files)} segments)")
-    print(f"[INFO] Total duration: {total_duration:.2f}s (audio: {audio_duration:.2f}s, pauses: {pause_duration_total:.2f}s)")
-    return final_path
+    return merge_audio_segments(read_segments(), sample_rate, final_path, output_format)
+
+def render_in_process(profile_id: str, prompt_artifacts: Dict[str, Any], sentences: List[str],
+                      controller: ProcessController, final_path: str, output_format: str = "wav") -> float:
+    """Synthesize sentences with the in-process engine (or the worker pool) and write the final file once"""
+    for i, sentence in enumerate(sentences, 1):
+        print(f"[SENTENCE] Processing {i}/{len(sentences)}: {sentence[:50]}{'...' if len(sentence) > 50 else ''}")
+    
+    if INFERENCE_MODE == "pool":
+        pool = get_worker_pool()
+        segments = pool.synthesize(sentences, prompt_artifacts["prompt_text"], prompt_artifacts["prompt_wav"],
+                                   progress=controller.progress, should_stop=controller.stop_reason)
+        return merge_audio_segments(segments, pool.sampling_rate, final_path, output_format)
+    
+    engine = get_inference_engine()
+    # Prompt tokens/features are computed once per profile prompt and kept in the registry
+    prompt = prompt_artifacts.get("engine_prompt")
+    if prompt is None:
+        prompt = engine.prepare_prompt(prompt_artifacts["prompt_text"], prompt_artifacts["prompt_wav"])
+        profile_registry.set_artifact(profile_id, "engine_prompt", prompt)
+    
+    segments = engine.synthesize(sentences, prompt, progress=controller.progress,
+                                 should_stop=controller.stop_reason)
+    return merge_audio_segments(segments, engine.sampling_rate, final_path, output_format)
+
+# === OUTPUT ENCODING === #
+
+def validate_output_format(output_format: Optional[str]) -> Optional[str]:
+    """
+    Check that an output format is known and supported by the installed libsndfile.
+    No format means the render is served in the format it is stored in.
+    """
+    import soundfile as sf
+    if not output_format:
+        return None
+    output_format = output_format.lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(400, f"Unsupported output format '{output_format}', expected one of: {', '.join(OUTPUT_FORMATS)}")
+    container, subtype = OUTPUT_FORMATS[output_format][:2]
+    if container not in sf.available_formats() or subtype not in sf.available_subtypes(container):
+        raise HTTPException(400, f"Output format '{output_format}' is not supported by the installed libsndfile")
+    return output_format
+
+def audio_file_format(path: str) -> Optional[str]:
+    """Output format name of an existing audio file, from its extension"""
+    extension = Path(path).suffix.lstrip(".").lower()
+    return next((name for name, spec in OUTPUT_FORMATS.items() if spec[3] == extension), None)
+
+def audio_response(path: str, output_format: Optional[str], filename_stem: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serve an audio file in the requested format (default: the format it is stored in).
+    The stored file is sent as-is when it already has that format, otherwise it is
+    transcoded block by block into a temporary file (no ffmpeg) that is streamed back
+    and removed once sent, so a long render is never held in memory.
+    """
+    import soundfile as sf
+    stored_format = audio_file_format(path)
+    output_format = output_format or stored_format or "wav"
+    media_type, extension = OUTPUT_FORMATS[output_format][2:]
+    filename = f"{filename_stem}.{extension}"
+    headers = dict(headers or {})
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+    
+    if stored_format == output_format:
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+    
+    container, subtype = OUTPUT_FORMATS[output_format][:2]
+    fd, transcoded_path = tempfile.mkstemp(suffix=f".{extension}")
+    try:
+        with os.fdopen(fd, "w+b") as target_file:
+            with sf.SoundFile(path) as source:
+                with sf.SoundFile(target_file, "w", samplerate=source.samplerate, channels=source.channels,
+                                  format=container, subtype=subtype) as target:
+                    for block in source.blocks(blocksize=65536, dtype="float32"):
+                        target.write(block)
+    except Exception:
+        os.remove(transcoded_path)
+        raise
+    return FileResponse(transcoded_path, media_type=media_type, filename=filename, headers=headers,
+                        background=BackgroundTask(os.remove, transcoded_path))
 
 # === API ENDPOINTS === #
 
@@ -804,21 +1642,130 @@ def get_gpu_status_endpoint():
 
 @app.get("/render_status", response_model=RenderStatus, summary="Get Render Status")
 def get_render_status():
-    """Get current rendering status for progress tracking"""
-    # This would be updated during actual rendering
+    """Get current rendering status for progress tracking (of the most recently started render)"""
+    started = []
+    for controller in render_registry.active():
+        with controller.lock:
+            if controller.render_start_time is not None:
+                started.append((controller.render_start_time, controller.render_word_count, controller))
+    
+    if not started:
+        return RenderStatus(
+            is_rendering=False,
+            current_sentence=0,
+            total_sentences=0,
+            estimated_time_remaining=0.0,
+            elapsed_time=0.0
+        )
+    
+    start_time, word_count, controller = max(started, key=lambda item: item[0])
+    elapsed = time.time() - start_time
+    snapshot = controller.read_progress()
+    
+    # ETA from the render's own throughput (or live solver timings before the first
+    # sentence completes), otherwise fall back to the historical words-per-second estimate
+    eta = snapshot.get("estimated_time_remaining") if snapshot else None
+    if eta is None:
+        eta = max(render_metrics.estimate_time(word_count) - elapsed, 0.0)
+    
     return RenderStatus(
-        is_rendering=process_controller.current_process is not None,
-        current_sentence=0,
-        total_sentences=0,
-        estimated_time_remaining=0.0,
-        elapsed_time=0.0
+        is_rendering=True,
+        current_sentence=snapshot["current_sentence"] if snapshot else 0,
+        total_sentences=snapshot["total_sentences"] if snapshot else 0,
+        estimated_time_remaining=eta,
+        elapsed_time=elapsed,
+        stage=snapshot["stage"] if snapshot else "start",
+        step=snapshot["step"] if snapshot else 0,
+        num_step=snapshot["num_step"] if snapshot else 0,
+        render_id=controller.render_id,
+        active_renders=len(started)
+    )
+
+async def telemetry_producer():
+    """Single producer for GPU telemetry and render progress events"""
+    last_gpu_push = 0.0
+    last_render_status = None
+    while True:
+        try:
+            if event_broadcaster.has_subscribers():
+                now = time.time()
+                if now - last_gpu_push >= TELEMETRY_INTERVAL:
+                    gpu_status = await asyncio.to_thread(get_gpu_status)
+                    event_broadcaster.publish("gpu_status", gpu_status.model_dump())
+                    last_gpu_push = now
+                
+                render_status = get_render_status().model_dump()
+                if render_status != last_render_status:
+                    event_broadcaster.publish("render_status", render_status)
+                    last_render_status = render_status
+        except Exception as e:
+            print(f"[WARN] Telemetry producer error: {e}")
+        await asyncio.sleep(PROGRESS_PUSH_INTERVAL)
+
+@app.on_event("startup")
+async def start_event_stream():
+    """Bind the broadcaster to the server loop and start the telemetry producer"""
+    event_broadcaster.bind_loop(asyncio.get_running_loop())
+    asyncio.create_task(telemetry_producer())
+    
+    # Import and warm up the model in the background so the API comes up immediately
+    # and the first request does not pay for loading
+    if INFERENCE_MODE == "inprocess":
+        threading.Thread(target=lambda: get_inference_engine().load(), daemon=True).start()
+    elif INFERENCE_MODE == "pool":
+        threading.Thread(target=lambda: get_worker_pool().start(), daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_worker_pool():
+    """Stop pool workers with the server"""
+    if INFERENCE_MODE == "pool" and worker_pool is not None:
+        worker_pool.close()
+
+@app.get("/events", summary="Server-Sent Events Stream")
+async def stream_events(request: Request):
+    """
+    Push channel for monitoring: gpu_status, render_status and render_completed events.
+    Replaces per-tab polling of /gpu_status and /render_status.
+    """
+    queue = event_broadcaster.subscribe()
+    
+    async def event_generator():
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=EVENT_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        finally:
+            event_broadcaster.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-@app.post("/stop_render", summary="Stop Current Rendering")
-def stop_render():
-    """Emergency stop for current rendering process"""
-    process_controller.stop_current_process()
-    return {"message": "Rendering process stopped", "success": True}
+@app.post("/stop_render", summary="Stop Rendering")
+def stop_render(render_id: Optional[str] = None):
+    """
+    Stop the render `render_id` (sent with /synthesize_speech or read from /render_status).
+    Without a render id, this is the emergency stop: every in-flight render is stopped.
+    """
+    if render_id is not None:
+        controller = render_registry.get(render_id)
+        if controller is None:
+            raise HTTPException(404, f"Render '{render_id}' is not running")
+        controllers = [controller]
+    else:
+        controllers = render_registry.active()
+    for controller in controllers:
+        controller.stop_current_process()
+    return {"message": f"Stopped {len(controllers)} rendering process(es)", "success": True,
+            "render_ids": [controller.render_id for controller in controllers]}
 
 @app.get("/performance_metrics", summary="Get Performance Metrics")
 def get_performance_metrics():
@@ -844,11 +1791,11 @@ def get_recent_renders_endpoint(page: int = 1, per_page: int = 10):
         raise HTTPException(500, "Failed to retrieve render history")
 
 @app.get("/render_file/{record_id}", summary="Download Render Audio File")
-def download_render_file(record_id: str):
-    """Download audio file from a specific render record"""
+def download_render_file(record_id: str, output_format: Optional[str] = None):
+    """Download audio file from a specific render record (wav, flac, opus or mp3; default: as stored)"""
+    output_format = validate_output_format(output_format)
     try:
-        data_log = load_data_log()
-        record = next((r for r in data_log if r["id"] == record_id), None)
+        record = render_store.get(record_id)
         
         if not record:
             raise HTTPException(404, f"Render record '{record_id}' not found")
@@ -857,11 +1804,7 @@ def download_render_file(record_id: str):
         if not os.path.exists(audio_path):
             raise HTTPException(404, f"Audio file not found: {audio_path}")
         
-        return FileResponse(
-            audio_path,
-            media_type="audio/wav",
-            filename=f"render_{record_id}.wav"
-        )
+        return audio_response(audio_path, output_format, f"render_{record_id}")
         
     except HTTPException:
         raise
@@ -869,12 +1812,23 @@ def download_render_file(record_id: str):
         print(f"[ERROR] Failed to download render file: {e}")
         raise HTTPException(500, "Failed to download audio file")
 
+@app.get("/render_details/{record_id}", summary="Get Render Details")
+def get_render_details(record_id: str):
+    """Get a render record with its per-sentence timings"""
+    record = render_store.get(record_id)
+    if not record:
+        raise HTTPException(404, f"Render record '{record_id}' not found")
+    return {
+        "message": "Render details",
+        "data": record,
+        "sentence_timings": render_store.get_sentence_timings(record_id)
+    }
+
 @app.get("/profiles", response_model=Dict[str, ProfileResponse], summary="List Voice Profiles")
 def get_profiles():
     """Retrieve all available voice profiles with metadata"""
     try:
-        profiles = load_profiles()
-        return profiles
+        return profile_registry.all()
     except Exception as e:
         print(f"[ERROR] Failed to load profiles: {e}")
         raise HTTPException(500, "Failed to retrieve voice profiles")
@@ -885,7 +1839,8 @@ def create_profile(
     display_name: str = Form(..., description="Human-readable profile name"),
     description: str = Form("", description="Profile description"),
     sample_text: str = Form(..., description="Exact transcript of sample audio"),
-    sample_wav: UploadFile = File(..., description="Voice sample audio file")
+    sample_wav: UploadFile = File(..., description="Voice sample audio file"),
+    prompt_frame_budget: Optional[int] = Form(None, description="Maximum prompt length in feature frames (~93.75 frames/s)")
 ):
     """Create a new voice profile with sample audio and transcript"""
     
@@ -901,9 +1856,12 @@ def create_profile(
     if not sample_wav.filename.lower().endswith(('.wav', '.mp3', '.m4a', '.flac')):
         raise HTTPException(400, "Audio file must be WAV, MP3, M4A, or FLAC format")
     
+    # Validate prompt budget
+    if prompt_frame_budget is not None and prompt_frame_budget < seconds_to_frames(PROMPT_MIN_SECONDS):
+        raise HTTPException(400, f"Prompt frame budget must be at least {seconds_to_frames(PROMPT_MIN_SECONDS)} frames")
+    
     # Check if profile already exists
-    profiles = load_profiles()
-    if name in profiles:
+    if profile_registry.get(name) is not None:
         raise HTTPException(400, f"Profile '{name}' already exists")
     
     # Create profile directory
@@ -912,11 +1870,20 @@ def create_profile(
     try:
         profile_dir.mkdir(parents=True, exist_ok=True)
         
-        # Save uploaded audio file
-        audio_path = profile_dir / "sample.wav"
-        with open(audio_path, "wb") as f:
+        # Save uploaded audio file, then store it decoded as 24kHz mono wav so later
+        # reads never need ffmpeg (the only place the ffmpeg fallback may run)
+        upload_path = profile_dir / f"upload{Path(sample_wav.filename).suffix.lower()}"
+        with open(upload_path, "wb") as f:
             shutil.copyfileobj(sample_wav.file, f)
         
+        import soundfile as sf
+        audio = decode_audio(str(upload_path), FEATURE_SAMPLE_RATE, allow_ffmpeg=True)
+        if len(audio) == 0:
+            raise Exception("Uploaded audio file is empty")
+        audio_path = profile_dir / "sample.wav"
+        sf.write(str(audio_path), audio, FEATURE_SAMPLE_RATE, subtype="PCM_16")
+        upload_path.unlink()
+        
         # Save text files with proper UTF-8 encoding
         sample_txt_path = profile_dir / "sample.txt"
         with open(sample_txt_path, "w", encoding="utf-8") as f:
@@ -927,15 +1894,22 @@ def create_profile(
             f.write(clean_vietnamese_text(sample_text))
         
         # Update profiles metadata
-        profiles[name] = {
+        profile_info = {
             "name": display_name,
             "description": description or f"Custom voice profile - {display_name}",
             "path": str(profile_dir),
             "is_default": False,
-            "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "prompt_frame_budget": prompt_frame_budget or PROMPT_FRAME_BUDGET
         }
         
-        save_profiles(profiles)
+        # Register the profile, then build its prompt artifacts once at profile time
+        profile_registry.add(name, profile_info)
+        try:
+            profile_registry.get_artifacts(name)
+        except Exception:
+            profile_registry.remove(name)
+            raise
         
         print(f"[INFO] Created voice profile '{name}' at {profile_dir}")  # Only INFO log for profile creation
         return {
@@ -957,13 +1931,11 @@ def create_profile(
 def delete_profile(profile_id: str):
     """Delete a voice profile (protected against deleting default profiles)"""
     
-    profiles = load_profiles()
+    profile_info = profile_registry.get(profile_id)
     
-    if profile_id not in profiles:
+    if profile_info is None:
         raise HTTPException(404, f"Profile '{profile_id}' not found")
     
-    profile_info = profiles[profile_id]
-    
     # Protect default profiles
     if profile_info.get("is_default", False):
         raise HTTPException(400, f"Cannot delete default profile '{profile_id}'")
@@ -975,8 +1947,7 @@ def delete_profile(profile_id: str):
             shutil.rmtree(profile_dir)
         
         # Remove from metadata
-        del profiles[profile_id]
-        save_profiles(profiles)
+        profile_registry.remove(profile_id)
         
         print(f"[SUCCESS] Deleted profile '{profile_id}'")
         return {"message": f"Profile '{profile_id}' deleted successfully"}
@@ -989,7 +1960,9 @@ def delete_profile(profile_id: str):
 @app.post("/synthesize_speech", summary="Generate Vietnamese Speech - Version 2")
 def synthesize_speech_v2(
     profile_id: Optional[str] = Form(None, description="Voice profile ID (optional, uses default if not provided)"),
-    text: str = Form(..., description="Vietnamese text to synthesize (unlimited length)")
+    text: str = Form(..., description="Vietnamese text to synthesize (unlimited length)"),
+    output_format: Optional[str] = Form(None, description="Response audio format: wav, flac, opus or mp3 (default: the render storage format)"),
+    render_id: Optional[str] = Form(None, description="Client-chosen render id for /stop_render (optional)")
 ):
     """
     Generate high-quality Vietnamese speech using sentence-by-sentence processing.
@@ -1002,8 +1975,7 @@ def synthesize_speech_v2(
     - ZipVoice defaults only (no advanced settings)
     """
     
-    # Reset process controller for new render
-    process_controller.reset()
+    output_format = validate_output_format(output_format)
     
     # Use default profile if none specified
     active_profile = profile_id or DEFAULT_PROFILE
@@ -1022,12 +1994,11 @@ def synthesize_speech_v2(
     word_count = len(words)
     
     # Validate profile exists
-    profiles = load_profiles()
-    if active_profile not in profiles:
+    profile_info = profile_registry.get(active_profile)
+    if profile_info is None:
         raise HTTPException(404, f"Voice profile '{active_profile}' not found")
     
     # Get profile information
-    profile_info = profiles[active_profile]
     profile_dir = Path(profile_info["path"])
     sample_txt_path = profile_dir / "sample.txt"
     sample_wav_path = profile_dir / "sample.wav"
@@ -1036,93 +2007,109 @@ def synthesize_speech_v2(
     if not sample_txt_path.exists() or not sample_wav_path.exists():
         raise HTTPException(400, f"Profile '{active_profile}' is missing required files")
     
-    # Create timestamped directory in DOING folder
-    doing_dir = create_doing_directory()
-    
-    # Clean up old processing folders (older than 2 days)
-    cleanup_old_doing_folders()
+    # Stop flag and progress of this render only
+    controller = render_registry.begin(render_id)
     
     start_time = time.time()
     
     try:
-        # Version 2 synthesis started
-        print(f"[INFO] Profile: {active_profile}, Text: {word_count} words")  # Single INFO log for synthesis
+        # Create timestamped directory in DOING folder
+        doing_dir = create_doing_directory(controller.render_id)
         
-        # Step 1: Read prompt text
-        with open(sample_txt_path, "r", encoding="utf-8") as f:
-            prompt_text = clean_vietnamese_text(f.read())
+        # Clean up old processing folders (older than 8 hours)
+        cleanup_old_doing_folders()
         
-        if not prompt_text:
-            raise HTTPException(400, f"Profile '{active_profile}' has empty sample text")
+        # Version 2 synthesis started
+        print(f"[INFO] Profile: {active_profile}, Text: {word_count} words")  # Single INFO log for synthesis
         
-        # Step 2: Convert sample audio to 24kHz mono
-        prompt_wav_24k = ensure_prompt_wav(str(sample_wav_path), doing_dir)
+        # Step 1-2: Get the cached 24kHz prompt trimmed to the profile's frame budget
+        prompt_artifacts = profile_registry.get_artifacts(active_profile)
+        prompt_wav_24k, prompt_text = prompt_artifacts["prompt_wav"], prompt_artifacts["prompt_text"]
         
-        # Step 3: Split Vietnamese text into sentences for processing
-        sentences = split_vietnamese_sentences(vietnamese_text)
+        # Step 3: Split Vietnamese text into segments sized for the decoder (from the prompt's speaking rate)
+        sentences = split_vietnamese_sentences(vietnamese_text, prompt_frames_per_char(prompt_artifacts))
         if not sentences:
             raise HTTPException(400, "Unable to process Vietnamese text into sentences")
         
         # Split into sentences
         print(f"[INFO] Processing {len(sentences)} Vietnamese sentences")
         
-        # Step 4: Create TSV file for batch processing
-        tsv_path = build_vietnamese_tsv(doing_dir, prompt_text, prompt_wav_24k, sentences)
-        
-        # Step 5: Run Vietnamese TTS inference with monitoring and sentence display
-        vietnamese_sentence_inference(doing_dir, tsv_path, len(sentences))
+        # Renders are stored compressed; the response is encoded in the requested format
+        final_audio_path = f"{doing_dir}/final_result.{OUTPUT_FORMATS[RENDER_STORAGE_FORMAT][3]}"
         
-        # Check if process was stopped
-        if process_controller.is_stopped():
-            raise HTTPException(409, "Rendering was stopped by user")
-        
-        # Step 6: Merge audio segments
-        final_audio_path = merge_vietnamese_segments(doing_dir)
-        
-        # Step 7: Copy final result to the processing directory for preservation
-        preserved_result = f"{doing_dir}/final_result.wav"
-        shutil.copy2(final_audio_path, preserved_result)
-        print(f"[MERGE] Final audio preserved at: {preserved_result}")
-        
-        # Verify final output
-        if not os.path.exists(final_audio_path):
-            raise HTTPException(500, "Failed to generate Vietnamese audio output")
-        
-        # Validate audio file
-        try:
-            audio_data, sample_rate = sf.read(final_audio_path)
-            if len(audio_data) == 0:
-                raise Exception("Generated audio file is empty")
-        except Exception as e:
-            raise HTTPException(500, f"Generated audio file is corrupted: {str(e)}")
+        if INFERENCE_MODE in ("inprocess", "pool"):
+            # Step 4-6: Synthesize in memory and write the merged audio once
+            texts = [s.strip() for s in sentences if s.strip()]
+            from engine import RenderStopped
+            controller.start_render(RenderProgress(), word_count)
+            try:
+                audio_duration = render_in_process(active_profile, prompt_artifacts, texts, controller,
+                                                   final_audio_path, RENDER_STORAGE_FORMAT)
+            except RenderStopped as e:
+                if controller.is_stopped():
+                    raise HTTPException(409, "Rendering was stopped by user")
+                raise Exception(str(e))
+        else:
+            # Publish progress location for /render_status
+            controller.start_render(f"{doing_dir}/progress.json", word_count)
+            
+            # Step 4: Create TSV file for batch processing
+            tsv_path = build_vietnamese_tsv(doing_dir, prompt_text, prompt_wav_24k, sentences)
+            
+            # Step 5: Run Vietnamese TTS inference with monitoring and sentence display
+            vietnamese_sentence_inference(doing_dir, tsv_path, controller, len(sentences))
+            
+            # Check if process was stopped
+            if controller.is_stopped():
+                raise HTTPException(409, "Rendering was stopped by user")
+            
+            # Step 6: Merge audio segments
+            audio_duration = merge_vietnamese_segments(doing_dir, final_audio_path, RENDER_STORAGE_FORMAT)
+            
+            # Segment wavs are only needed for the merge
+            for wav_file in Path(doing_dir).glob("seg_*.wav"):
+                wav_file.unlink()
+            
+            with open(tsv_path, "r", encoding="utf-8") as f:
+                texts = [line.rstrip("\n").split("\t")[-1] for line in f if line.strip()]
         
         # Record performance metrics
         render_time = time.time() - start_time
         render_metrics.add_render(word_count, render_time)
         
-        # Add render record to data log for history tracking
-        add_render_record(
+        # Per-sentence timings published by the sampler
+        snapshot = controller.read_progress() or {}
+        sentence_timings = snapshot.get("sentence_timings", [])
+        for timing in sentence_timings:
+            if 0 <= timing.get("index", -1) < len(texts):
+                timing["text"] = texts[timing["index"]]
+        
+        # Add render record to render history
+        record = add_render_record(
             text=vietnamese_text,
             profile_id=active_profile,
-            audio_path=preserved_result,  # Use the preserved path
+            audio_path=final_audio_path,
             word_count=word_count,
-            processing_time=render_time
+            processing_time=render_time,
+            sentence_timings=sentence_timings,
+            cache_ref=prompt_wav_24k
         )
+        if record:
+            event_broadcaster.publish("render_completed", record, replay=False)
         
         # Return audio file
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"vietnamese_speech_v2_{active_profile}_{timestamp}.wav"
-        return FileResponse(
+        return audio_response(
             final_audio_path,
-            media_type="audio/wav",
-            filename=filename,
+            output_format,
+            f"vietnamese_speech_v2_{active_profile}_{timestamp}",
             headers={
-                "Content-Disposition": f"attachment; filename={filename}",
                 "X-Profile-Used": active_profile,
                 "X-Synthesis-Time": timestamp,
-                "X-Audio-Duration": f"{len(audio_data) / sample_rate:.2f}s",
+                "X-Audio-Duration": f"{audio_duration:.2f}s",
                 "X-Render-Time": f"{render_time:.2f}s",
                 "X-Word-Count": str(word_count),
+                "X-Render-Id": controller.render_id,
                 "X-Performance": f"{render_time/word_count:.2f}s/word"
             }
         )
@@ -1137,8 +2124,8 @@ def synthesize_speech_v2(
         raise HTTPException(500, error_msg)
     
     finally:
-        # Clean up process controller
-        process_controller.reset()
+        # Only this render's controller is dropped; other renders keep their state
+        render_registry.end(controller)
 
 
 # === APPLICATION STARTUP === #
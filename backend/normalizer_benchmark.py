@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for Vietnamese text normalization on megabyte-scale inputs.
+Compares the single-pass VietnameseTextNormalizer with the previous multi-pass
+clean_vietnamese_text (eight re.sub passes, patterns compiled per call).
+
+    python3 normalizer_benchmark.py                  # 1, 4 and 16 MB
+    python3 normalizer_benchmark.py --sizes-mb 8 --repeat 5
+    python3 normalizer_benchmark.py --check-only     # regression cases only
+
+The normalizer's regression cases are checked before every benchmark run.
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+from zipvoice.tokenizer.normalizer import VietnameseTextNormalizer
+
+# Sentences dense in things to expand (numbers, dates, emojis, abbreviations)
+DENSE_SENTENCES = [
+    "Xin chào các bạn (ghi chú: 你好), hôm nay là 20/11/2024 👉 lúc 10:30 sáng.",
+    "Giá vàng tăng 5,5% lên 1.500.000đ mỗi chỉ , theo UBND TP.HCM .",
+    "Anh ấy chạy 12km trong 1h05 rồi nghỉ   ở THPT gần nhà!",
+    "Đây là một đoạn văn dài không có số nào cả, chỉ có chữ tiếng Việt thôi…",
+    "Liên hệ SĐT 0912345678 hoặc gửi $20 trước ngày 5/12 nhé 😀.",
+]
+
+# Ordinary narration, as in most audiobook/article renders
+PROSE_SENTENCES = [
+    "Ngày xửa ngày xưa, ở một ngôi làng nhỏ ven sông, có một cô bé rất chăm chỉ.",
+    "Mỗi sáng cô dậy sớm, quét sân, cho gà ăn rồi mới đi học.",
+    "Trên đường đến trường, cô thường dừng lại ngắm những cánh đồng lúa xanh mướt.",
+    "Thầy giáo khen cô là học sinh ngoan nhất lớp, ai cũng quý mến cô.",
+    "Buổi chiều, cô giúp mẹ nấu cơm và kể cho em nghe những câu chuyện cổ tích.",
+]
+
+CORPORA = {"dense": DENSE_SENTENCES, "prose": PROSE_SENTENCES}
+
+# (input, expected output) pairs the normalizer once got wrong
+REGRESSION_CASES = [
+    # "ngày"/"tháng" already in the text is not read twice
+    ("Ngày 2/9/1945 tại HN.", "Ngày hai tháng chín năm một nghìn chín trăm bốn mươi lăm tại Hà Nội."),
+    ("Tháng 4/2023", "Tháng tư năm hai nghìn không trăm hai mươi ba"),
+    ("vào ngày 20/11", "vào ngày hai mươi tháng mười một"),
+    ("hôm nay 2/9", "hôm nay ngày hai tháng chín"),
+    # Heights and lengths written as "1m75"
+    ("cao 1m75", "cao một mét bảy mươi lăm"),
+    ("dài 5m", "dài năm mét"),
+    # Areas are not heights
+    ("Căn hộ 50m2", "Căn hộ năm mươi mét vuông"),
+    ("120m2.", "một trăm hai mươi mét vuông."),
+    # Negative and dotted section numbers
+    ("-5", "âm năm"),
+    ("3.1.2", "ba chấm một chấm hai"),
+]
+
+
+def legacy_clean_vietnamese_text(text: str) -> str:
+    """The multi-pass cleaner the backend used before the single-pass normalizer"""
+    if not text:
+        return ""
+    text = text.strip()
+    text = re.sub(r'[(\[（][^)\]）]*[)\]）]', '', text)
+    text = re.sub(r'[👉👈👆👇→←↑↓➡️⬅️⬆️⬇️▶️◀️▲▼]', '', text)
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F1E0-\U0001F1FF"
+        "]+", flags=re.UNICODE)
+    text = emoji_pattern.sub('', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([.!?…,;:])\s*', r'\1 ', text)
+    text = re.sub(r'^\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\s+$', '', text)
+    return text.strip()
+
+
+def make_text(sentences: List[str], size_mb: float, seed: int = 0) -> str:
+    """Random mix of `sentences`, about `size_mb` MB of UTF-8"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts: List[str] = []
+    size = 0
+    while size < target:
+        sentence = rng.choice(sentences)
+        parts.append(sentence)
+        size += len(sentence.encode("utf-8")) + 1
+    return " ".join(parts)
+
+
+def measure(func: Callable[[str], str], text: str, repeat: int) -> float:
+    """Median MB/s over `repeat` runs"""
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        times.append(time.perf_counter() - start)
+    return size_mb / statistics.median(times)
+
+
+def check_regressions(normalizer: VietnameseTextNormalizer) -> bool:
+    """Run REGRESSION_CASES (and check idempotence); prints every failure"""
+    ok = True
+    for text, expected in REGRESSION_CASES:
+        result = normalizer.normalize(text)
+        if result != expected or normalizer.normalize(result) != result:
+            print(f"[ERROR] {text!r} -> {result!r}, expected {expected!r}")
+            ok = False
+    print(f"[INFO] {len(REGRESSION_CASES)} normalizer regression cases: {'passed' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16], help="Input sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size")
+    parser.add_argument("--corpus", choices=sorted(CORPORA), nargs="+", default=sorted(CORPORA),
+                        help="dense: numbers/dates/emojis in every sentence, prose: plain narration")
+    parser.add_argument("--check-only", action="store_true", help="Only run the regression cases")
+    args = parser.parse_args()
+
+    normalizer = VietnameseTextNormalizer()
+    if not check_regressions(normalizer):
+        sys.exit(1)
+    if args.check_only:
+        return
+    print(f"[BENCH] {'corpus':>6}  {'size':>8}  {'legacy MB/s':>12}  {'single-pass MB/s':>17}")
+    for corpus in args.corpus:
+        for size_mb in args.sizes_mb:
+            text = make_text(CORPORA[corpus], size_mb)
+            legacy = measure(legacy_clean_vietnamese_text, text, args.repeat)
+            single = measure(normalizer.normalize, text, args.repeat)
+            print(f"[BENCH] {corpus:>6}  {size_mb:6.1f}MB  {legacy:12.2f}  {single:17.2f}")
+    print("[BENCH] The single-pass normalizer also expands numbers, dates, currencies and abbreviations")
+
+
+if __name__ == "__main__":
+    main()
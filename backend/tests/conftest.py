@@ -0,0 +1,89 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(BACKEND_DIR), str(BACKEND_DIR.parent / "ZipVoice")]
+
+# A ZipVoice and a Vocos small enough to build and run in a test
+TINY_MODEL_CONFIG = {
+    "model": {
+        "fm_decoder_downsampling_factor": [1, 2, 1],
+        "fm_decoder_num_layers": [1, 1, 1],
+        "fm_decoder_cnn_module_kernel": [7, 7, 7],
+        "fm_decoder_feedforward_dim": 64,
+        "fm_decoder_num_heads": 2,
+        "fm_decoder_dim": 32,
+        "text_encoder_num_layers": 1,
+        "text_encoder_feedforward_dim": 64,
+        "text_encoder_cnn_module_kernel": 5,
+        "text_encoder_num_heads": 2,
+        "text_encoder_dim": 32,
+        "query_head_dim": 8,
+        "value_head_dim": 4,
+        "pos_head_dim": 4,
+        "pos_dim": 16,
+        "time_embed_dim": 32,
+        "text_embed_dim": 32,
+        "feat_dim": 100
+    },
+    "feature": {"sampling_rate": 24000, "type": "vocos"}
+}
+TINY_VOCOS_CONFIG = """
+feature_extractor:
+  class_path: vocos.feature_extractors.MelSpectrogramFeatures
+  init_args: {sample_rate: 24000, n_fft: 1024, hop_length: 256, n_mels: 100, padding: center}
+backbone:
+  class_path: vocos.models.VocosBackbone
+  init_args: {input_channels: 100, dim: 32, intermediate_dim: 64, num_layers: 1}
+head:
+  class_path: vocos.heads.ISTFTHead
+  init_args: {dim: 32, n_fft: 1024, hop_length: 256, padding: center}
+"""
+
+
+@pytest.fixture(scope="session")
+def tiny_model(tmp_path_factory):
+    """Engine kwargs of a randomly initialized model (plus a prompt wav), built once per session"""
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("lhotse")
+    vocos = pytest.importorskip("vocos")
+    import soundfile as sf
+
+    from zipvoice.bin.infer_zipvoice import build_model
+    from zipvoice.tokenizer.tokenizer import SimpleTokenizer
+
+    root = tmp_path_factory.mktemp("tiny_model")
+    model_dir = root / "model"
+    model_dir.mkdir()
+    tokens = ["_"] + list("abcdefghijklmnopqrstuvwxyz .,")
+    (model_dir / "tokens.txt").write_text("".join(f"{t}\t{i}\n" for i, t in enumerate(tokens)))
+    (model_dir / "model.json").write_text(json.dumps(TINY_MODEL_CONFIG))
+    torch.manual_seed(0)
+    model = build_model("zipvoice", TINY_MODEL_CONFIG, SimpleTokenizer(token_file=str(model_dir / "tokens.txt")))
+    torch.save({"model": model.state_dict()}, model_dir / "model.pt")
+
+    vocoder_dir = root / "vocos"
+    vocoder_dir.mkdir()
+    (vocoder_dir / "config.yaml").write_text(TINY_VOCOS_CONFIG)
+    vocoder = vocos.Vocos.from_hparams(str(vocoder_dir / "config.yaml"))
+    torch.save(vocoder.state_dict(), vocoder_dir / "pytorch_model.bin")
+
+    prompt_wav = root / "prompt.wav"
+    rng = np.random.default_rng(0)
+    sf.write(str(prompt_wav), (0.1 * rng.standard_normal(24000)).astype(np.float32), 24000)
+
+    return {
+        "engine_kwargs": {
+            "model_dir": str(model_dir),
+            "checkpoint_name": "model.pt",
+            "tokenizer": "simple",
+            "lang": "en-us",
+            "vocoder_path": str(vocoder_dir)
+        },
+        "prompt_text": "a short prompt.",
+        "prompt_wav": str(prompt_wav)
+    }
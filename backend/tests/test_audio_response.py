@@ -0,0 +1,58 @@
+import io
+import os
+import tempfile
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from main import audio_response
+
+SAMPLE_RATE = 24000
+
+
+@pytest.fixture
+def stored_render(tmp_path):
+    path = tmp_path / "final_result.flac"
+    audio = (0.1 * np.sin(2 * np.pi * 220 * np.arange(SAMPLE_RATE) / SAMPLE_RATE)).astype(np.float32)
+    sf.write(path, audio, SAMPLE_RATE, format="FLAC", subtype="PCM_16")
+    return str(path)
+
+
+@pytest.fixture
+def client(stored_render):
+    app = FastAPI()
+
+    @app.get("/audio")
+    def audio(output_format: str = None):
+        return audio_response(stored_render, output_format, "render")
+
+    return TestClient(app)
+
+
+def test_default_serves_the_stored_format(client, stored_render):
+    response = client.get("/audio")
+    assert response.headers["content-type"] == "audio/flac"
+    assert "render.flac" in response.headers["content-disposition"]
+    with open(stored_render, "rb") as f:
+        assert response.content == f.read()
+
+
+def test_transcoded_response_leaves_no_temporary_file(client, monkeypatch, tmp_path):
+    transcoded = []
+    mkstemp = tempfile.mkstemp
+
+    def tracking_mkstemp(*args, **kwargs):
+        fd, path = mkstemp(*args, dir=tmp_path, **kwargs)
+        transcoded.append(path)
+        return fd, path
+
+    monkeypatch.setattr("main.tempfile.mkstemp", tracking_mkstemp)
+    response = client.get("/audio", params={"output_format": "wav"})
+    assert response.headers["content-type"] == "audio/wav"
+    assert "render.wav" in response.headers["content-disposition"]
+    audio, sr = sf.read(io.BytesIO(response.content), dtype="float32")
+    assert sr == SAMPLE_RATE and len(audio) == SAMPLE_RATE
+    assert len(transcoded) == 1 and not os.path.exists(transcoded[0])
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from engine import InferenceEngine  # noqa: E402
+
+SENTENCES = ["hello there.", "a second sentence, a bit longer."]
+
+
+def synthesize(engine: InferenceEngine, tiny_model) -> list:
+    engine.load()
+    prompt = engine.prepare_prompt(tiny_model["prompt_text"], tiny_model["prompt_wav"])
+    return list(engine.synthesize(SENTENCES, prompt))
+
+
+def test_engine_synthesizes_one_waveform_per_sentence(tiny_model):
+    wavs = synthesize(InferenceEngine(**tiny_model["engine_kwargs"]), tiny_model)
+    assert len(wavs) == len(SENTENCES)
+    for wav in wavs:
+        assert wav.dtype == np.float32 and wav.ndim == 1 and len(wav) > 0
+        assert np.isfinite(wav).all()
+
+
+def test_shared_weights_engine_matches_checkpoint_engine(tiny_model):
+    kwargs = tiny_model["engine_kwargs"]
+    expected = synthesize(InferenceEngine(**kwargs), tiny_model)
+    shared = InferenceEngine(**kwargs).load_shared_weights()
+    wavs = synthesize(InferenceEngine(**kwargs, shared_weights=shared), tiny_model)
+    for wav, expected_wav in zip(wavs, expected):
+        np.testing.assert_allclose(wav, expected_wav, atol=1e-5)
@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from main import ProfileRegistry
+
+
+@pytest.fixture
+def profiles_file(tmp_path):
+    return tmp_path / "data" / "profiles.json"
+
+
+@pytest.fixture
+def registry(profiles_file):
+    return ProfileRegistry(profiles_file)
+
+
+def write_externally(path, profiles):
+    """Edit profiles.json as another process would, with a distinct mtime"""
+    mtime = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(json.dumps(profiles), encoding="utf-8")
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+
+
+def test_missing_file_is_an_empty_registry(registry):
+    assert registry.all() == {}
+    assert registry.get("voice") is None
+
+
+def test_add_persists_atomically(registry, profiles_file):
+    registry.add("voice", {"name": "Voice"})
+    assert json.loads(profiles_file.read_text(encoding="utf-8")) == {"voice": {"name": "Voice"}}
+    assert list(profiles_file.parent.iterdir()) == [profiles_file]
+    assert ProfileRegistry(profiles_file).get("voice") == {"name": "Voice"}
+
+
+def test_returned_profiles_are_copies(registry):
+    registry.add("voice", {"name": "Voice"})
+    registry.get("voice")["name"] = "Changed"
+    registry.all()["voice"]["name"] = "Changed"
+    assert registry.get("voice") == {"name": "Voice"}
+
+
+def test_external_edits_are_reloaded(registry, profiles_file):
+    registry.add("voice", {"name": "Voice"})
+    write_externally(profiles_file, {"other": {"name": "Other"}})
+    assert registry.all() == {"other": {"name": "Other"}}
+
+
+def test_corrupt_file_keeps_the_loaded_profiles(registry, profiles_file):
+    registry.add("voice", {"name": "Voice"})
+    profiles_file.write_text("{not json", encoding="utf-8")
+    os.utime(profiles_file, ns=(1, 1))
+    assert registry.get("voice") == {"name": "Voice"}
+
+
+def test_failed_write_keeps_the_previous_file(registry, profiles_file, monkeypatch):
+    registry.add("voice", {"name": "Voice"})
+
+    def failing_replace(src, dst):
+        raise IOError("disk full")
+
+    monkeypatch.setattr(main.os, "replace", failing_replace)
+    with pytest.raises(HTTPException):
+        registry.add("other", {"name": "Other"})
+    assert json.loads(profiles_file.read_text(encoding="utf-8")) == {"voice": {"name": "Voice"}}
+    assert registry.all() == {"voice": {"name": "Voice"}}
+
+
+def test_artifacts_are_cached_until_the_sample_changes(registry, tmp_path, monkeypatch):
+    profile_dir = tmp_path / "voice"
+    profile_dir.mkdir()
+    (profile_dir / "sample.wav").write_bytes(b"wav")
+    (profile_dir / "sample.txt").write_text("xin chào", encoding="utf-8")
+    prepared = []
+
+    def prepare_profile_prompt(info):
+        prepared.append(info["path"])
+        return {"prompt_wav": "prompt.wav", "prompt_text": "xin chào", "prompt_frames": 100,
+                "start_seconds": 0.5, "end_seconds": 2.5}
+
+    monkeypatch.setattr(main, "prepare_profile_prompt", prepare_profile_prompt)
+    registry.add("voice", {"path": str(profile_dir)})
+    artifacts = registry.get_artifacts("voice")
+    assert artifacts["prompt_seconds"] == pytest.approx(2.0)
+    registry.set_artifact("voice", "tokens", [1, 2, 3])
+    assert registry.get_artifacts("voice")["tokens"] == [1, 2, 3]
+    assert len(prepared) == 1
+
+    (profile_dir / "sample.wav").write_bytes(b"new sample")
+    assert "tokens" not in registry.get_artifacts("voice")
+    assert len(prepared) == 2
+
+    registry.remove("voice")
+    with pytest.raises(HTTPException) as error:
+        registry.get_artifacts("voice")
+    assert error.value.status_code == 404
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import main
+from main import RenderStore
+
+
+def make_record(n: int) -> dict:
+    return {"id": f"render_{n}", "timestamp": f"2025-01-01T00:00:{n:02d}", "text": f"text {n}",
+            "full_text_preview": f"text {n}", "profile_id": "voice", "audio_path": f"/data/{n}.flac",
+            "word_count": n, "processing_time": 1.5, "file_size": 100, "cache_ref": None}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "DATA_LOG_FILE", str(tmp_path / "data.json"))
+    return RenderStore(str(tmp_path / "db" / "renders.db"), retention=3)
+
+
+def test_add_and_get(store):
+    store.add(make_record(1))
+    assert store.get("render_1") == make_record(1)
+    assert store.get("missing") is None
+
+
+def test_sentence_timings_round_trip(store):
+    timings = [{"index": 1, "text": "b", "t": 2.0, "t_vocoder": 0.2, "wav_seconds": 3.0, "rtf": 0.6},
+               {"index": 0, "text": "a", "t": 1.0, "t_vocoder": 0.1, "wav_seconds": 2.0, "rtf": 0.5}]
+    store.add(make_record(1), timings)
+    assert store.get_sentence_timings("render_1") == sorted(timings, key=lambda t: t["index"])
+    assert store.get_sentence_timings("missing") == []
+
+
+def test_pages_are_newest_first(store):
+    for n in range(3):
+        store.add(make_record(n))
+    records, total = store.page(1, 2)
+    assert total == 3
+    assert [r["id"] for r in records] == ["render_2", "render_1"]
+    records, _ = store.page(2, 2)
+    assert [r["id"] for r in records] == ["render_0"]
+
+
+def test_retention_drops_the_oldest_records_and_their_timings(store):
+    for n in range(5):
+        store.add(make_record(n), [{"index": 0, "text": "a", "t": 1.0}])
+    records, total = store.page(1, 10)
+    assert total == 3
+    assert [r["id"] for r in records] == ["render_4", "render_3", "render_2"]
+    assert store.get("render_1") is None
+    assert store.get_sentence_timings("render_1") == []
+
+
+def test_legacy_json_log_is_migrated_once(store, tmp_path):
+    legacy_file = tmp_path / "data.json"
+    # The legacy log is newest first
+    legacy_file.write_text(json.dumps([make_record(2), make_record(1)]), encoding="utf-8")
+    records, total = store.page(1, 10)
+    assert total == 2
+    assert [r["id"] for r in records] == ["render_2", "render_1"]
+    assert not legacy_file.exists()
+    assert (tmp_path / "data.json.migrated").exists()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from main import (LIMITER_CEILING, LOUDNESS_MAX_GAIN, LOUDNESS_TARGET_RMS, SENTENCE_PAUSE_SECONDS,
+                  SegmentMerger, merge_audio_segments)
+
+SAMPLE_RATE = 24000
+
+
+def tone(seconds: float, amplitude: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def rms(audio: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+
+
+def test_segments_are_joined_with_pauses(tmp_path):
+    path = str(tmp_path / "out.wav")
+    duration = merge_audio_segments([tone(1.0, 0.1), tone(0.5, 0.1), tone(0.25, 0.1)], SAMPLE_RATE, path)
+    audio, sr = sf.read(path, dtype="float32")
+    assert sr == SAMPLE_RATE
+    assert len(audio) == int(1.75 * SAMPLE_RATE) + 2 * int(SENTENCE_PAUSE_SECONDS * SAMPLE_RATE)
+    assert duration == pytest.approx(len(audio) / SAMPLE_RATE)
+
+
+def test_empty_segments_are_skipped_and_nothing_to_merge_fails(tmp_path):
+    path = str(tmp_path / "out.wav")
+    merge_audio_segments([np.zeros(0, dtype=np.float32), tone(0.5, 0.1)], SAMPLE_RATE, path)
+    assert len(sf.read(path)[0]) == int(0.5 * SAMPLE_RATE)
+    with pytest.raises(Exception, match="No valid audio segments"):
+        merge_audio_segments([], SAMPLE_RATE, str(tmp_path / "empty.wav"))
+
+
+def test_loudness_follows_the_target(tmp_path):
+    path = str(tmp_path / "out.wav")
+    merge_audio_segments([tone(1.0, 0.05)], SAMPLE_RATE, path)
+    assert rms(sf.read(path, dtype="float32")[0]) == pytest.approx(LOUDNESS_TARGET_RMS, rel=0.01)
+
+
+def test_quiet_segments_are_boosted_at_most_max_gain(tmp_path):
+    path = str(tmp_path / "out.wav")
+    quiet = tone(1.0, 0.001)
+    merge_audio_segments([quiet], SAMPLE_RATE, path)
+    assert rms(sf.read(path, dtype="float32")[0]) == pytest.approx(rms(quiet) * LOUDNESS_MAX_GAIN, rel=0.01)
+
+
+def test_quieter_segment_raises_the_gain_gradually(tmp_path):
+    merger = SegmentMerger(str(tmp_path / "out.wav"), SAMPLE_RATE)
+    merger.add(tone(1.0, 0.2))
+    loud_gain = merger.gain
+    merger.add(tone(1.0, 0.05))
+    merger.close()
+    assert loud_gain < merger.gain < LOUDNESS_TARGET_RMS / rms(tone(1.0, 0.05))
+
+
+def test_peaks_are_limited_to_the_ceiling(tmp_path):
+    path = str(tmp_path / "out.wav")
+    audio = tone(1.0, 0.1)
+    audio[SAMPLE_RATE // 2] = 1.0  # A click well above the ceiling once normalized
+    merge_audio_segments([audio], SAMPLE_RATE, path)
+    assert np.abs(sf.read(path, dtype="float32")[0]).max() <= LIMITER_CEILING + 1e-4
+
+
+def test_limiter_leaves_the_far_end_of_the_segment_alone(tmp_path):
+    merger = SegmentMerger(str(tmp_path / "out.wav"), SAMPLE_RATE)
+    audio = np.full(merger.block * 10, 0.5, dtype=np.float32)
+    audio[-1] = 2.0  # Only the last block is over the ceiling
+    limited = merger._limit(audio)
+    merger.close()
+    # The first block is not a neighbour of the last one
+    np.testing.assert_array_equal(limited[:merger.block], audio[:merger.block])
+    assert np.abs(limited).max() <= LIMITER_CEILING + 1e-6
+
+
+def test_compressed_output_format(tmp_path):
+    path = str(tmp_path / "out.flac")
+    merge_audio_segments([tone(0.5, 0.1)], SAMPLE_RATE, path, output_format="flac")
+    assert sf.info(path).format == "FLAC"
@@ -0,0 +1,73 @@
+import pytest
+
+from main import (DEFAULT_FRAMES_PER_CHAR, merge_short_segments, prompt_frames_per_char,
+                  split_long_segment, split_vietnamese_sentences)
+
+
+def words(segments):
+    return " ".join(segments).split()
+
+
+def test_sentences_are_split_on_sentence_endings():
+    text = "Xin chào các bạn. Hôm nay trời đẹp! Bạn có khỏe không?"
+    assert split_vietnamese_sentences(text, frames_per_char=1.0, max_frames=100, min_frames=0) == [
+        "Xin chào các bạn.", "Hôm nay trời đẹp!", "Bạn có khỏe không?"
+    ]
+
+
+def test_missing_final_punctuation_is_added():
+    assert split_vietnamese_sentences("Xin chào các bạn") == ["Xin chào các bạn."]
+
+
+def test_long_sentence_is_split_at_commas_within_the_budget():
+    text = "Một hai ba bốn năm, sáu bảy tám chín mười, mười một mười hai mười ba."
+    segments = split_vietnamese_sentences(text, frames_per_char=1.0, max_frames=30, min_frames=0)
+    assert segments == ["Một hai ba bốn năm,", "sáu bảy tám chín mười,", "mười một mười hai mười ba."]
+    assert words(segments) == text.split()
+
+
+@pytest.mark.parametrize("frames_per_char", [0.5, 1.0, 2.0])
+def test_segments_respect_the_frame_budget(frames_per_char):
+    text = ("Trời hôm nay rất đẹp và chúng tôi đi dạo trong công viên rồi ghé quán cà phê "
+            "nhưng quán đã đóng cửa nên chúng tôi về nhà khi trời vừa tối.")
+    max_frames = 40
+    segments = split_vietnamese_sentences(text, frames_per_char=frames_per_char, max_frames=max_frames,
+                                          min_frames=0)
+    assert len(segments) > 1
+    assert all(len(s) * frames_per_char <= max_frames for s in segments)
+    assert words(segments) == text.split()
+
+
+def test_conjunctions_are_preferred_over_plain_spaces():
+    text = "chúng tôi đi dạo trong công viên nhưng quán đã đóng cửa"
+    assert split_long_segment(text, max_chars=35) == [
+        "chúng tôi đi dạo trong công viên", "nhưng quán đã đóng cửa"
+    ]
+
+
+def test_unsplittable_word_is_kept_whole():
+    assert split_long_segment("abcdefghij", max_chars=4) == ["abcdefghij"]
+
+
+def test_short_fragments_are_merged_with_their_neighbour():
+    segments = ["Vâng.", "Tôi hiểu rồi, cảm ơn bạn.", "Được."]
+    assert merge_short_segments(segments, min_chars=10, max_chars=100) == [
+        "Vâng. Tôi hiểu rồi, cảm ơn bạn. Được."
+    ]
+    # Merging never goes over the budget
+    assert merge_short_segments(segments, min_chars=10, max_chars=31) == [
+        "Vâng. Tôi hiểu rồi, cảm ơn bạn.", "Được."
+    ]
+
+
+def test_fragments_too_short_to_synthesize_are_dropped():
+    assert split_vietnamese_sentences("Xin chào các bạn. À. Tạm biệt nhé.", frames_per_char=1.0,
+                                      max_frames=100, min_frames=0) == ["Xin chào các bạn.", "Tạm biệt nhé."]
+
+
+def test_prompt_frames_per_char():
+    assert prompt_frames_per_char({"prompt_text": "a" * 100, "prompt_frames": 800}) == 8.0
+    # Clamped, and the default when the prompt says nothing
+    assert prompt_frames_per_char({"prompt_text": "a" * 100, "prompt_frames": 10}) == 3.0
+    assert prompt_frames_per_char({"prompt_text": "a", "prompt_frames": 800}) == 15.0
+    assert prompt_frames_per_char({}) == DEFAULT_FRAMES_PER_CHAR
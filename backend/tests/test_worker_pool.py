@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from worker_pool import WorkerPool  # noqa: E402
+
+
+@pytest.mark.parametrize("share_weights", [True, False])
+def test_pool_serves_a_render(tiny_model, share_weights):
+    pool = WorkerPool(1, tiny_model["engine_kwargs"], share_weights=share_weights)
+    try:
+        pool.start()
+        assert pool.capacity == 1
+        sentences = ["hello there.", "a second sentence.", "and a third one."]
+        events = []
+        wavs = list(pool.synthesize(sentences, tiny_model["prompt_text"], tiny_model["prompt_wav"],
+                                    progress=lambda event, **info: events.append(event)))
+    finally:
+        pool.close()
+    assert len(wavs) == len(sentences)
+    assert all(wav.dtype == np.float32 and len(wav) > 0 for wav in wavs)
+    assert events[0] == "start" and events[-1] == "finish"
+    assert events.count("sentence_end") == len(sentences)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Warm pool of inference worker processes.
+Each worker loads the InferenceEngine once, is pinned to its own core set and serves
+sentence batches over a pipe, so renders get process isolation without a cold start.
+Workers are recycled after a number of requests or when their RSS grows too large.
+With shared weights, the checkpoint is read once by the pool and every worker attaches
+to the same shared-memory tensors, so an extra worker costs little more than activations.
+"""
+
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import torch.multiprocessing as mp
+
+from engine import InferenceEngine, RenderStopped, SharedWeights
+
+WORKER_START_TIMEOUT = 600   # Seconds a new worker may take to load the model
+WORKER_POLL_INTERVAL = 0.5   # Seconds between stop checks while waiting for results
+WORKER_SPAWN_ATTEMPTS = 5    # Start attempts per slot before it is left empty until the next render
+WORKER_SPAWN_BACKOFF = 5     # Seconds before the first start retry, doubled after each failure
+WORKER_SPAWN_MAX_BACKOFF = 60
+
+
+def worker_main(conn, cancel_event, cores: List[int], engine_kwargs: Dict[str, Any],
+                shared_weights: Optional[SharedWeights] = None):
+    """Worker process: load the engine once, then serve jobs until told to exit"""
+    import torch
+    from lhotse.utils import fix_random_seed
+
+    if cores:
+        os.sched_setaffinity(0, cores)
+        torch.set_num_threads(len(cores))
+    torch.set_num_interop_threads(1)
+
+    engine = InferenceEngine(**engine_kwargs, shared_weights=shared_weights)
+    engine.load()
+    conn.send(("ready", {"pid": os.getpid(), "sampling_rate": engine.sampling_rate, "num_step": engine.num_step}))
+
+    prompt_key, prompt = None, None
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        prompt_text, prompt_wav, items = job
+        try:
+            # Consecutive jobs usually share the profile prompt
+            key = (prompt_text, prompt_wav, os.path.getmtime(prompt_wav))
+            if key != prompt_key:
+                prompt_key, prompt = key, engine.prepare_prompt(prompt_text, prompt_wav)
+
+            fix_random_seed(engine.seed)
+            for index, text in items:
+                wav = engine.synthesize_one(
+                    index, text, prompt,
+                    progress=lambda event, **info: conn.send(("progress", event, info)),
+                    should_stop=lambda: "Render cancelled" if cancel_event.is_set() else None
+                )
+                conn.send(("segment", index, wav))
+            conn.send(("done", None))
+        except RenderStopped as e:
+            conn.send(("stopped", str(e)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def process_rss_mb(pid: int) -> float:
+    """
+    Private resident memory of a process in MB (0 if unavailable). RssAnon excludes the
+    shared weight pages every worker maps, so it only grows with the worker's own state.
+    """
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        value = fields.get("RssAnon") or fields.get("VmRSS")
+        return int(value.split()[0]) / 1024 if value else 0.0
+    except (IOError, ValueError):
+        return 0.0
+
+
+class PoolWorker:
+    def __init__(self, slot: int, process, conn, cancel_event, info: Dict[str, Any]):
+        self.slot = slot
+        self.process = process
+        self.conn = conn
+        self.cancel_event = cancel_event
+        self.info = info
+        self.requests = 0
+        self.alive = True
+
+
+class WorkerPool:
+    """Keeps `size` warm workers and fans each render's sentences out across the idle ones"""
+    def __init__(self, size: int, engine_kwargs: Dict[str, Any], max_requests: int = 200,
+                 max_rss_mb: float = 0, share_weights: bool = True):
+        self.size = size
+        self.engine_kwargs = engine_kwargs
+        self.max_requests = max_requests
+        self.max_rss_mb = max_rss_mb
+        self.share_weights = share_weights
+        self.shared_weights = None
+        self.context = mp.get_context("spawn")  # Never fork a process that may hold CUDA state
+        self.idle = queue.Queue()
+        self.sampling_rate = 24000
+        self.num_step = 0
+        self.closed = False
+        self.core_sets = self._plan_cores(size)
+        self.failed_slots = set()  # Slots whose worker could not be started
+        self.slots_lock = threading.Lock()
+
+    @staticmethod
+    def _plan_cores(size: int) -> List[List[int]]:
+        """Split the cores available to this process into one contiguous set per worker"""
+        cores = sorted(os.sched_getaffinity(0))
+        per_worker = len(cores) // size
+        if per_worker == 0:
+            return [[] for _ in range(size)]  # More workers than cores: no pinning
+        return [cores[i * per_worker:(i + 1) * per_worker] for i in range(size)]
+
+    def start(self):
+        """Start all workers in parallel; returns once they are loaded"""
+        if self.share_weights and self.shared_weights is None:
+            # Kept for the pool's lifetime: recycled workers attach to the same buffers
+            self.shared_weights = InferenceEngine(**self.engine_kwargs).load_shared_weights()
+        threads = [threading.Thread(target=self._spawn, args=(slot,), daemon=True) for slot in range(self.size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    @property
+    def capacity(self) -> int:
+        """Slots with a worker (ready, busy or starting)"""
+        with self.slots_lock:
+            return self.size - len(self.failed_slots)
+
+    def _spawn(self, slot: int):
+        """Start the worker of `slot`, retrying with a bounded exponential backoff"""
+        delay = WORKER_SPAWN_BACKOFF
+        for attempt in range(1, WORKER_SPAWN_ATTEMPTS + 1):
+            if self.closed:
+                return
+            worker = self._start_worker(slot)
+            if worker is not None:
+                with self.slots_lock:
+                    self.failed_slots.discard(slot)
+                self.idle.put(worker)
+                return
+            if attempt < WORKER_SPAWN_ATTEMPTS:
+                print(f"[WARN] Retrying worker {slot} in {delay}s (attempt {attempt + 1}/{WORKER_SPAWN_ATTEMPTS})")
+                time.sleep(delay)
+                delay = min(delay * 2, WORKER_SPAWN_MAX_BACKOFF)
+        with self.slots_lock:
+            self.failed_slots.add(slot)
+        print(f"[ERROR] Worker {slot} failed to start {WORKER_SPAWN_ATTEMPTS} times, pool capacity reduced to "
+              f"{self.capacity}/{self.size} (the slot is retried on the next render)")
+
+    def _revive_failed_slots(self):
+        """Retry the slots given up by _spawn in the background"""
+        with self.slots_lock:
+            slots, self.failed_slots = self.failed_slots, set()
+        for slot in slots:
+            threading.Thread(target=self._spawn, args=(slot,), daemon=True).start()
+
+    def _start_worker(self, slot: int) -> Optional[PoolWorker]:
+        """One start attempt; None if the worker did not report ready"""
+        parent_conn, child_conn = self.context.Pipe()
+        cancel_event = self.context.Event()
+        process = self.context.Process(
+            target=worker_main,
+            args=(child_conn, cancel_event, self.core_sets[slot], self.engine_kwargs, self.shared_weights),
+            name=f"tts-worker-{slot}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        try:
+            if not parent_conn.poll(WORKER_START_TIMEOUT):
+                raise TimeoutError(f"no ready message after {WORKER_START_TIMEOUT}s")
+            kind, info = parent_conn.recv()
+        except (EOFError, OSError, TimeoutError) as e:
+            print(f"[ERROR] Worker {slot} failed to start: {e}")
+            process.kill()
+            parent_conn.close()
+            return None
+        self.sampling_rate = info["sampling_rate"]
+        self.num_step = info["num_step"]
+        print(f"[POOL] Worker {slot} ready (pid {info['pid']}, cores {self.core_sets[slot] or 'all'})")
+        return PoolWorker(slot, process, parent_conn, cancel_event, info)
+
+    def _retire(self, worker: PoolWorker, reason: str):
+        """Stop a worker and start its replacement in the background"""
+        print(f"[POOL] Recycling worker {worker.slot} (pid {worker.process.pid}): {reason}")
+        try:
+            worker.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        worker.process.join(timeout=5)
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.conn.close()
+        if not self.closed:
+            threading.Thread(target=self._spawn, args=(worker.slot,), daemon=True).start()
+
+    def _release(self, worker: PoolWorker):
+        worker.requests += 1
+        if not worker.alive:
+            self._retire(worker, "worker failed")
+        elif self.max_requests and worker.requests >= self.max_requests:
+            self._retire(worker, f"served {worker.requests} requests")
+        elif self.max_rss_mb and process_rss_mb(worker.process.pid) > self.max_rss_mb:
+            self._retire(worker, f"RSS above {self.max_rss_mb:.0f}MB")
+        else:
+            self.idle.put(worker)
+
+    def _acquire(self, max_workers: int) -> List[PoolWorker]:
+        """Block for one idle worker, then take any other idle ones (up to max_workers)"""
+        self._revive_failed_slots()
+        deadline = time.time() + WORKER_START_TIMEOUT
+        workers = []
+        while not workers:
+            try:
+                worker = self.idle.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                raise Exception(f"No inference worker available (pool capacity {self.capacity}/{self.size})")
+            if self._check_alive(worker):
+                workers.append(worker)
+        while len(workers) < max_workers:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._check_alive(worker):
+                workers.append(worker)
+        return workers
+
+    def _check_alive(self, worker: PoolWorker) -> bool:
+        """False (and the worker is replaced) if an idle worker died since its last job"""
+        if worker.process.is_alive():
+            return True
+        worker.alive = False
+        self._release(worker)
+        return False
+
+    def synthesize(self, sentences: List[str], prompt_text: str, prompt_wav: str,
+                   progress: Optional[Callable] = None,
+                   should_stop: Optional[Callable[[], Optional[str]]] = None) -> Iterator[np.ndarray]:
+        """
+        Yield one float32 waveform per sentence, in order. Sentences are interleaved across
+        the acquired workers so the first ones come back early enough to stream the merge.
+        """
+        workers = self._acquire(len(sentences))
+        by_conn = {w.conn: w for w in workers}
+        active = set()
+        pending = {}
+        next_index = 0
+        failure = None
+        try:
+            for k, worker in enumerate(workers):
+                worker.cancel_event.clear()
+                items = [(i, sentences[i]) for i in range(k, len(sentences), len(workers))]
+                try:
+                    worker.conn.send((prompt_text, prompt_wav, items))
+                except OSError as e:
+                    # Died while idle: its sentences cannot be served, fail the render and replace it
+                    worker.alive = False
+                    failure = ("error", f"worker {worker.slot} is gone ({type(e).__name__})")
+                    for other in active:
+                        other.cancel_event.set()
+                    break
+                active.add(worker)
+
+            if progress is not None:
+                progress("start", total=len(sentences), num_step=self.num_step)
+            while active:
+                for conn in wait([w.conn for w in active], timeout=WORKER_POLL_INTERVAL):
+                    worker = by_conn[conn]
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        message = ("error", f"worker {worker.slot} exited unexpectedly")
+                        worker.alive = False
+                    kind = message[0]
+                    if kind == "progress" and progress is not None:
+                        progress(message[1], **message[2])
+                    elif kind == "segment":
+                        pending[message[1]] = message[2]
+                    elif kind == "done":
+                        active.discard(worker)
+                    elif kind in ("stopped", "error"):
+                        active.discard(worker)
+                        if failure is None:
+                            failure = (kind, message[1])
+                            for other in active:
+                                other.cancel_event.set()
+
+                if failure is None and should_stop is not None:
+                    reason = should_stop()
+                    if reason:
+                        failure = ("stopped", reason)
+                        for worker in active:
+                            worker.cancel_event.set()
+
+                # Hand segments over in sentence order as soon as they are contiguous
+                while failure is None and next_index in pending:
+                    yield pending.pop(next_index)
+                    next_index += 1
+
+            if failure is not None:
+                kind, message = failure
+                if kind == "stopped":
+                    raise RenderStopped(message)
+                raise Exception(f"Inference worker failed: {message}")
+        finally:
+            if progress is not None:
+                progress("finish")
+            # Generator closed early: cancel and drain workers that are still busy
+            for worker in active:
+                worker.cancel_event.set()
+            deadline = time.time() + 30
+            while active and time.time() < deadline:
+                for conn in wait([w.conn for w in active], timeout=1):
+                    worker = by_conn[conn]
+                    try:
+                        if conn.recv()[0] in ("done", "stopped", "error"):
+                            active.discard(worker)
+                    except (EOFError, OSError):
+                        worker.alive = False
+                        active.discard(worker)
+            for worker in active:
+                worker.alive = False  # Did not finish in time, replace it
+            for worker in workers:
+                self._release(worker)
+
+    def close(self):
+        """Stop all idle workers (busy ones are stopped when released)"""
+        self.closed = True
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(worker, "shutdown")
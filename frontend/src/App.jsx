@@ -233,6 +233,10 @@ const translations = {
 
 // === UTILITY COMPONENTS === //
 
+// Renders are served in their stored format (flac by default), name downloads after it
+const AUDIO_EXTENSIONS = { 'audio/wav': 'wav', 'audio/flac': 'flac', 'audio/ogg': 'opus', 'audio/mpeg': 'mp3' };
+const audioExtension = (blob) => AUDIO_EXTENSIONS[blob.type] || 'wav';
+
 const LoadingSpinner = ({ size = 'default' }) => (
   <div className={`spinner ${size === 'small' ? 'spinner-small' : ''}`}></div>
 );
@@ -419,46 +423,7 @@ const VoiceProfileCard = ({ profileId, profile, isSelected, onSelect, onEdit, on
   );
 };
 
-const GPUMonitor = ({ t }) => {
-  const [gpuStatus, setGpuStatus] = useState({
-    temperature: 0,
-    utilization: 0,
-    memory_used: 0,
-    memory_total: 0,
-    status: "UNKNOWN"
-  });
-  const [renderStatus, setRenderStatus] = useState({
-    is_rendering: false,
-    current_sentence: 0,
-    total_sentences: 0,
-    estimated_time_remaining: 0,
-    elapsed_time: 0
-  });
-
-  useEffect(() => {
-    const interval = setInterval(async () => {
-      try {
-        // Get GPU status
-        const gpuResponse = await fetch('http://localhost:8000/gpu_status');
-        if (gpuResponse.ok) {
-          const gpuData = await gpuResponse.json();
-          setGpuStatus(gpuData);
-        }
-
-        // Get render status
-        const renderResponse = await fetch('http://localhost:8000/render_status');
-        if (renderResponse.ok) {
-          const renderData = await renderResponse.json();
-          setRenderStatus(renderData);
-        }
-      } catch (error) {
-        console.warn('Failed to fetch monitoring data:', error);
-      }
-    }, 5000); // Update every 5 seconds
-
-    return () => clearInterval(interval);
-  }, []);
-
+const GPUMonitor = ({ t, gpuStatus, renderStatus }) => {
   const handleEmergencyStop = async () => {
     try {
       await fetch('http://localhost:8000/stop_render', { method: 'POST' });
@@ -537,26 +502,9 @@ const GPUMonitor = ({ t }) => {
   );
 };
 
-const RenderStatusMonitor = ({ t, onEmergencyStop }) => {
-  const [renderStatus, setRenderStatus] = useState(null);
+const RenderStatusMonitor = ({ t, renderStatus, onEmergencyStop }) => {
   const [loading, setLoading] = useState(false);
 
-  useEffect(() => {
-    const fetchRenderStatus = async () => {
-      try {
-        const response = await fetch('http://localhost:8000/render_status');
-        const data = await response.json();
-        setRenderStatus(data);
-      } catch (error) {
-        console.error('Failed to fetch render status:', error);
-      }
-    };
-
-    // Poll render status every 2 seconds during processing
-    const interval = setInterval(fetchRenderStatus, 2000);
-    return () => clearInterval(interval);
-  }, []);
-
   const handleEmergencyStop = async () => {
     setLoading(true);
     try {
@@ -581,9 +529,9 @@ const RenderStatusMonitor = ({ t, onEmergencyStop }) => {
           <div className="flex justify-between text-white/80">
             <span>Status:</span>
             <span className={`font-semibold ${
-              renderStatus.is_processing ? 'text-yellow-400' : 'text-green-400'
+              renderStatus.is_rendering ? 'text-yellow-400' : 'text-green-400'
             }`}>
-              {renderStatus.is_processing ? 'Processing...' : 'Ready'}
+              {renderStatus.is_rendering ? 'Processing...' : 'Ready'}
             </span>
           </div>
           
@@ -601,13 +549,13 @@ const RenderStatusMonitor = ({ t, onEmergencyStop }) => {
           
           {renderStatus.estimated_time_remaining && (
             <div className="text-white/60 text-sm">
-              Estimated time: {renderStatus.estimated_time_remaining}s
+              Estimated time: {Math.round(renderStatus.estimated_time_remaining)}s
             </div>
           )}
         </div>
       )}
       
-      {renderStatus?.is_processing && (
+      {renderStatus?.is_rendering && (
         <button
           onClick={handleEmergencyStop}
           disabled={loading}
@@ -650,7 +598,7 @@ const RecentRenders = ({ t, recentRenders, loading, pagination, onPageChange, on
       const url = URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;
-      a.download = `render_${record.id}.wav`;
+      a.download = `render_${record.id}.${audioExtension(blob)}`;
       document.body.appendChild(a);
       a.click();
       document.body.removeChild(a);
@@ -785,6 +733,7 @@ function App() {
   const [profiles, setProfiles] = useState({});
   const [loading, setLoading] = useState(false);
   const [audio, setAudio] = useState(null);
+  const [audioExt, setAudioExt] = useState('wav');
   const [notification, setNotification] = useState(null);
   const [showAddProfile, setShowAddProfile] = useState(false);
   const [isPlaying, setIsPlaying] = useState(false);
@@ -805,6 +754,22 @@ function App() {
   // Rendering status monitoring
   const [isCurrentlyRendering, setIsCurrentlyRendering] = useState(false);
 
+  // Live monitoring data pushed by the backend event stream
+  const [gpuStatus, setGpuStatus] = useState({
+    temperature: 0,
+    utilization: 0,
+    memory_used: 0,
+    memory_total: 0,
+    status: "UNKNOWN"
+  });
+  const [renderStatus, setRenderStatus] = useState({
+    is_rendering: false,
+    current_sentence: 0,
+    total_sentences: 0,
+    estimated_time_remaining: 0,
+    elapsed_time: 0
+  });
+
   // Profile form state
   const [profileForm, setProfileForm] = useState({
     name: '',
@@ -867,6 +832,17 @@ function App() {
     loadRecentRenders();
   }, []);
 
+  // Subscribe once to the backend event stream (replaces per-component polling)
+  useEffect(() => {
+    const events = new EventSource('http://localhost:8000/events');
+    events.addEventListener('gpu_status', (e) => setGpuStatus(JSON.parse(e.data)));
+    events.addEventListener('render_status', (e) => setRenderStatus(JSON.parse(e.data)));
+    events.addEventListener('render_completed', () => loadRecentRenders());
+    events.onerror = () => console.warn('Event stream interrupted, reconnecting...');
+
+    return () => events.close();
+  }, []);
+
   // Audio event listeners
   useEffect(() => {
     if (audioRef.current) {
@@ -1008,11 +984,11 @@ function App() {
       const audioBlob = await response.blob();
       const audioUrl = URL.createObjectURL(audioBlob);
       setAudio(audioUrl);
+      setAudioExt(audioExtension(audioBlob));
       setLastGenerationTime(Math.round((Date.now() - startTime) / 1000));
       showNotification('success', t.speechGenerated);
       
-      // Reload recent renders after successful synthesis
-      await loadRecentRenders();
+      // Recent renders are reloaded by the render_completed event
       
     } catch (error) {
       showNotification('error', `${t.error}: ${error.message}`);
@@ -1092,6 +1068,7 @@ function App() {
       const blob = await response.blob();
       const audioUrl = URL.createObjectURL(blob);
       setAudio(audioUrl);
+      setAudioExt(audioExtension(blob));
     } catch (error) {
       showNotification('error', `Failed to play audio: ${error.message}`);
     }
@@ -1105,7 +1082,7 @@ function App() {
     if (audio) {
       const a = document.createElement('a');
       a.href = audio;
-      a.download = `vietnamese_speech_${Date.now()}.wav`;
+      a.download = `vietnamese_speech_${Date.now()}.${audioExt}`;
       a.click();
     }
   };
@@ -1324,10 +1301,10 @@ function App() {
           {/* Right Column - Monitoring & Statistics */}
           <div className="space-y-6">
             {/* GPU Status Monitor */}
-            <GPUMonitor t={t} />
+            <GPUMonitor t={t} gpuStatus={gpuStatus} renderStatus={renderStatus} />
 
             {/* Render Status Monitor */}
-            <RenderStatusMonitor t={t} onEmergencyStop={handleEmergencyStop} />
+            <RenderStatusMonitor t={t} renderStatus={renderStatus} onEmergencyStop={handleEmergencyStop} />
 
             {/* Recent Renders History */}
             <RecentRenders 